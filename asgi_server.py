@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+ASGI front end for the Grasshopper MCP Server
+Serves the MCPServer routes on asyncio with a non-blocking Grasshopper client
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from grasshopper_protocol import DEFAULT_MAX_FRAME_SIZE, ProtocolError, decode_frame, encode_frame
+from idempotency import IDEMPOTENCY_HEADER
+from mcp_server import BODY_NOT_OBJECT_ERROR, MCPServer, etag_matches
+from metrics import CONTENT_TYPE
+from tracing import PARENT_HEADER, TRACE_HEADER, parse_trace_headers
+
+logger = logging.getLogger(__name__)
+
+class AsyncGrasshopperTCPClient:
+    """asyncio-streams client for the Grasshopper MCP Component
+
+    Commands are tagged with a ``request_id`` and pipelined over a single
+    connection; a reader task resolves the future of each waiting request
+    when its response arrives. Any number of concurrent requests can wait
+    on Grasshopper without holding a thread each.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 8888,
+                 timeout: Optional[float] = 30.0, connect_timeout: float = 5.0,
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_frame_size = max_frame_size
+        self.connected = False
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._ids = itertools.count(1)
+        self._connects = 0
+        self._connect_failures = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Connection state, commands awaiting a response and lifetime connection totals"""
+        return {
+            "size": int(self.connected),
+            "in_flight": len(self._pending),
+            "connects": self._connects,
+            "reconnects": max(self._connects - 1, 0),
+            "connect_failures": self._connect_failures
+        }
+
+    async def connect(self) -> bool:
+        """Connect to Grasshopper MCP Component and start the reader task"""
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=self.max_frame_size),
+                    self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.error(f"Failed to connect to Grasshopper: {e}")
+                self._connect_failures += 1
+                return False
+            self._writer = writer
+            self.connected = True
+            self._connects += 1
+            self._reader_task = asyncio.ensure_future(self._read_loop(reader, writer))
+            logger.info(f"Connected to Grasshopper MCP Component at {self.host}:{self.port} (asyncio)")
+            return True
+
+    async def disconnect(self):
+        """Disconnect and fail every outstanding command"""
+        if self._writer is not None:
+            self._fail_connection(self._writer, "Disconnected from Grasshopper")
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+    async def send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a command to Grasshopper and wait for its response"""
+        if not self.connected and not await self.connect():
+            return {"success": False, "error": "Not connected to Grasshopper"}
+
+        request_id = str(next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        writer = self._writer
+        try:
+            writer.write(encode_frame(dict(command, request_id=request_id)))
+            await writer.drain()
+        except (OSError, RuntimeError) as e:
+            logger.error(f"Error sending command to Grasshopper: {e}")
+            self._fail_connection(writer, str(e))
+
+        try:
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            return {"success": False, "error": "Timed out waiting for Grasshopper response"}
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Route responses to their waiting futures until the connection drops"""
+        try:
+            while True:
+                try:
+                    frame = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError:
+                    raise ConnectionError(
+                        "Connection closed by Grasshopper before a complete response was received"
+                    )
+                except asyncio.LimitOverrunError:
+                    raise ProtocolError(f"Frame exceeds {self.max_frame_size} bytes")
+                response = decode_frame(frame[:-1])
+
+                request_id = response.pop("request_id", None)
+                if request_id is not None:
+                    future = self._pending.pop(str(request_id), None)
+                elif self._pending:
+                    _, future = self._pending.popitem(last=False)
+                else:
+                    future = None
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self._writer is writer:
+                logger.error(f"Grasshopper connection lost: {e}")
+            self._fail_connection(writer, str(e))
+
+    def _fail_connection(self, writer: asyncio.StreamWriter, error: str):
+        if writer is not self._writer:
+            return
+        self._writer = None
+        self.connected = False
+        writer.close()
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result({"success": False, "error": error})
+
+class MCPAsgiApp:
+    """Minimal ASGI application serving the MCPServer routes
+
+    Request handling reuses ``MCPServer``'s operation handlers through
+    ``handle_async``, so both front ends validate and respond identically.
+    """
+
+    CORS_HEADERS = [
+        (b"access-control-allow-origin", b"*"),
+    ]
+
+    def __init__(self, server: Optional[MCPServer] = None,
+                 grasshopper_client: Optional[AsyncGrasshopperTCPClient] = None):
+        self.server = server or MCPServer()
+        self.grasshopper_client = grasshopper_client or AsyncGrasshopperTCPClient(
+            self.server.grasshopper_client.host, self.server.grasshopper_client.port
+        )
+        # In ASGI mode the server is only driven through handle_async; release the
+        # threaded client's pooled connections before replacing it
+        self.server.grasshopper_client.disconnect()
+        self.server.grasshopper_client = self.grasshopper_client
+        self._routes: Dict[str, Tuple[list, str]] = {
+            rule: (methods, operation) for rule, methods, operation in self.server.ROUTES
+        }
+        # Jobs still run on worker threads, but their Grasshopper commands go through this loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server.jobs.runner = self._run_job
+
+    async def __call__(self, scope, receive, send):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if not await self.grasshopper_client.connect():
+                    logger.warning("Could not connect to Grasshopper MCP Component. Will retry on first request.")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.server.jobs.close()
+                await self.grasshopper_client.disconnect()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        status = 500
+
+        async def send_observed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self._route(scope, receive, send_observed)
+        finally:
+            route = scope["path"] if scope["path"] in self._routes else "unmatched"
+            self.server.observe_request(route, scope["method"], status, time.perf_counter() - start)
+
+    async def _route(self, scope, receive, send):
+        method = scope["method"]
+        route = self._routes.get(scope["path"])
+
+        if method == "OPTIONS":
+            # CORS preflight, matching flask_cors' permissive defaults
+            request_headers = dict(scope.get("headers") or [])
+            await self._send(send, 200, b"", extra_headers=[
+                (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                (b"access-control-allow-headers",
+                 request_headers.get(b"access-control-request-headers", b"*")),
+            ])
+            return
+        if route is None:
+            await self._send_json(send, {"success": False, "error": "Not found"}, 404)
+            return
+        methods, operation = route
+        if method not in methods:
+            await self._send_json(send, {"success": False, "error": "Method not allowed"}, 405)
+            return
+
+        if operation == "components":
+            await self._send_catalog(scope, send)
+            return
+        if operation == "metrics":
+            await self._send(send, 200, self.server.metrics.render().encode("utf-8"),
+                             content_type=CONTENT_TYPE.encode())
+            return
+
+        body = await self._read_body(receive)
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            await self._send_json(send, {"success": False, "error": BODY_NOT_OBJECT_ERROR}, 400)
+            return
+        if not data and scope.get("query_string"):
+            data = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id = parse_trace_headers(
+            *(headers.get(name.lower().encode(), b"").decode("latin-1") for name in (TRACE_HEADER, PARENT_HEADER))
+        )
+        with self.server.tracer.span(f"http {operation}", trace_id, parent_id) as span:
+            idempotency_key = headers.get(IDEMPOTENCY_HEADER.lower().encode())
+            payload, status = await self.server.handle_async(
+                operation, data, idempotency_key=idempotency_key.decode("latin-1") if idempotency_key else None
+            )
+            span.attributes["status"] = status
+        await self._send_json(send, payload, status,
+                              extra_headers=[(TRACE_HEADER.lower().encode(), span.trace_id.encode())])
+
+    def _run_job(self, operation: str, data: Dict[str, Any], cancel: threading.Event) -> Tuple[Dict[str, Any], int]:
+        """Job queue runner: drive the operation on the event loop and wait for it on the worker thread"""
+        future = asyncio.run_coroutine_threadsafe(self.server.handle_async(operation, data, cancel=cancel), self._loop)
+        return future.result()
+
+    async def _send_catalog(self, scope, send):
+        """Serve the pre-rendered catalog, honouring If-None-Match"""
+        body, etag = self.server.components_catalog()
+        if_none_match = dict(scope.get("headers") or []).get(b"if-none-match")
+        cache_headers = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+        if etag_matches(if_none_match.decode("latin-1") if if_none_match else None, etag):
+            await self._send(send, 304, b"", extra_headers=cache_headers)
+        else:
+            await self._send(send, 200, body, content_type=b"application/json", extra_headers=cache_headers)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _send_json(self, send, payload: Dict[str, Any], status: int, extra_headers: Optional[list] = None):
+        body = json.dumps(payload).encode("utf-8")
+        await self._send(send, status, body, content_type=b"application/json", extra_headers=extra_headers)
+
+    async def _send(self, send, status: int, body: bytes, content_type: Optional[bytes] = None,
+                    extra_headers: Optional[list] = None):
+        headers = [(b"content-length", str(len(body)).encode())] + self.CORS_HEADERS
+        if content_type:
+            headers.append((b"content-type", content_type))
+        headers.extend(extra_headers or [])
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+def create_app(grasshopper_host: str = "localhost", grasshopper_port: int = 8888) -> MCPAsgiApp:
+    """ASGI application factory, e.g. ``uvicorn --factory asgi_server:create_app``"""
+    return MCPAsgiApp(MCPServer(grasshopper_host, grasshopper_port))
+
+def serve_asgi(server: MCPServer, host: str = "0.0.0.0", port: int = 5000):
+    """Run the MCP server on uvicorn without the reloader or debugger"""
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("ASGI mode requires uvicorn: pip install uvicorn")
+
+    logger.info(f"Starting MCP Server (ASGI) on {host}:{port}")
+    logger.info(f"Grasshopper components loaded: {len(server.knowledge_base.components)}")
+    app = MCPAsgiApp(server)
+    uvicorn.run(app, host=host, port=port, lifespan="on", access_log=False)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for Grasshopper MCP Server
+Measures endpoint throughput/latency against the Grasshopper stand-in,
+plus micro-benchmarks of the component knowledge base
+"""
+
+import argparse
+import json
+import logging
+import math
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from component_factory import ComponentFactory
+from grasshopper_standin import CommandProfile, GrasshopperStandIn
+from mcp_server import MCPServer
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Regressions larger than this fraction are reported by --compare
+DEFAULT_THRESHOLD = 0.2
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    """Latency percentiles (milliseconds) and throughput for one run"""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "requests_per_second": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1e3, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1e3, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1e3, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3) if ordered else 0.0,
+    }
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, if the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class EndpointBenchmark:
+    """Drives MCP server endpoints at a fixed concurrency over keep-alive connections"""
+
+    def __init__(self, base_url: str, concurrency: int = 8, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> requests.Response:
+        return self.session.request(method, f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+
+    def run(self, method: str, path: str, payload_for: Callable[[int], Optional[Dict[str, Any]]],
+            requests_count: int, warmup: int = 0) -> Dict[str, Any]:
+        """Send ``requests_count`` requests and summarize them; ``warmup`` more are not measured"""
+        for index in range(warmup):
+            self.request(method, path, payload_for(index))
+
+        latencies: List[float] = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def one(index: int):
+            start = time.perf_counter()
+            try:
+                response = self.request(method, path, payload_for(index))
+                ok = response.status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            duration = time.perf_counter() - start
+            with lock:
+                latencies.append(duration)
+                if not ok:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(one, range(requests_count)))
+        return summarize(latencies, time.perf_counter() - started, errors[0])
+
+    def close(self):
+        self.session.close()
+
+def run_endpoint_benchmarks(base_url: str, requests_count: int, concurrency: int,
+                            warmup: int) -> Dict[str, Dict[str, Any]]:
+    """Benchmark /components, /create_component, /connect_components and /clear_canvas"""
+    bench = EndpointBenchmark(base_url, concurrency)
+    results = {}
+    try:
+        results["components"] = bench.run("GET", "/components", lambda i: None, requests_count, warmup)
+
+        results["create_component"] = bench.run(
+            "POST", "/create_component",
+            lambda i: {"component_name": "point", "parameters": {"X": float(i), "Y": 0.0, "Z": 0.0}},
+            requests_count, warmup
+        )
+
+        # Connections need both endpoints on the canvas
+        bench.request("POST", "/create_component", {"component_name": "circle", "parameters": {"Radius": 1.0}})
+        bench.request("POST", "/create_component", {
+            "component_name": "line", "parameters": {"Start": [0, 0, 0], "End": [1, 0, 0]}
+        })
+        results["connect_components"] = bench.run(
+            "POST", "/connect_components",
+            lambda i: {"source_component": "circle", "source_param": "Circle",
+                       "target_component": "line", "target_param": "Start"},
+            requests_count, warmup
+        )
+
+        results["clear_canvas"] = bench.run("POST", "/clear_canvas", lambda i: None, requests_count, warmup)
+    finally:
+        bench.close()
+    return results
+
+def time_calls(function: Callable[[], Any], iterations: int,
+               setup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Per-call timings in microseconds; ``setup`` runs untimed before each call"""
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    return {
+        "iterations": iterations,
+        "mean_us": round(total / iterations * 1e6, 3),
+        "p50_us": round(percentile(timings, 0.50) * 1e6, 3),
+        "p95_us": round(percentile(timings, 0.95) * 1e6, 3),
+        "ops_per_second": round(iterations / total, 1) if total > 0 else 0.0,
+    }
+
+def run_micro_benchmarks(iterations: int = 2000) -> Dict[str, Dict[str, Any]]:
+    """Benchmark ComponentFactory validation, search and catalog rendering"""
+    factory = ComponentFactory()
+    parameters = {"Radius": "2.5", "Plane": "XY"}
+    results = {
+        "validate_component_parameters": time_calls(
+            lambda: factory.validate_component_parameters("circle", parameters), iterations
+        ),
+        "search_components": time_calls(
+            lambda: factory.search_components("extrude a circle upward", 5), iterations
+        ),
+        "get_component_info_for_llm": time_calls(factory.get_component_info_for_llm, iterations),
+    }
+
+    # Re-registering every component drops all derived caches, untimed
+    def invalidate():
+        for name in list(factory.components):
+            factory.components[name] = factory.components[name]
+    results["get_component_info_for_llm_cold"] = time_calls(
+        factory.get_component_info_for_llm, max(iterations // 10, 1), setup=invalidate
+    )
+
+    queries = ["circle", "extrud", "surfce", "move geometry", "number slider"]
+    results["search_components_uncached"] = time_calls(
+        lambda: [factory.search_components(query) for query in queries],
+        max(iterations // 10, 1), setup=invalidate
+    )
+    return results
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Describe metrics that got worse than ``baseline`` by more than ``threshold``"""
+    regressions = []
+    for section, lower_is_better, higher_is_better in (
+        ("endpoints", ("p50_ms", "p95_ms", "p99_ms"), ("requests_per_second",)),
+        ("micro", ("mean_us", "p95_us"), ("ops_per_second",)),
+    ):
+        for name, metrics in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            for metric in lower_is_better + higher_is_better:
+                before, after = previous.get(metric), metrics.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if metric in higher_is_better:
+                    change = -change
+                if change > threshold:
+                    regressions.append(f"{section}.{name}.{metric}: {before} -> {after} ({change:+.0%} worse)")
+    return regressions
+
+def start_local_server(latency: float = 0.0, jitter: float = 0.0) -> Tuple[str, Callable[[], None]]:
+    """Start a stand-in and an MCP server on free ports; returns (base URL, stop)"""
+    from werkzeug.serving import make_server
+
+    standin = GrasshopperStandIn("127.0.0.1", 0, profile=CommandProfile(latency, jitter), seed=0)
+    standin_host, standin_port = standin.start()
+    server = MCPServer(standin_host, standin_port)
+    http_server = make_server("127.0.0.1", 0, server.app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, name="benchmark-server", daemon=True)
+    thread.start()
+
+    def stop():
+        http_server.shutdown()
+        server.jobs.close()
+        server.grasshopper_client.disconnect()
+        standin.stop()
+
+    return f"http://127.0.0.1:{http_server.server_port}", stop
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Grasshopper MCP Server benchmarks")
+    parser.add_argument("--url", help="benchmark a running MCP server instead of starting one with the stand-in")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per command, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stand-in jitter per command, in seconds")
+    parser.add_argument("--micro-iterations", type=int, default=2000)
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change reported as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    # mcp_server configures INFO logging on import; per-request logs would skew timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    results: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "target": args.url or "local stand-in",
+        },
+    }
+
+    if not args.skip_endpoints:
+        stop = None
+        base_url = args.url
+        if base_url is None:
+            base_url, stop = start_local_server(args.latency, args.jitter)
+        try:
+            results["endpoints"] = run_endpoint_benchmarks(base_url, args.requests, args.concurrency, args.warmup)
+        finally:
+            if stop is not None:
+                stop()
+        for name, summary in results["endpoints"].items():
+            print(f"{name:<20} {summary['requests_per_second']:>9.1f} req/s  "
+                  f"p50 {summary['p50_ms']:>8.3f} ms  p95 {summary['p95_ms']:>8.3f} ms  "
+                  f"p99 {summary['p99_ms']:>8.3f} ms  errors {summary['errors']}")
+
+    if not args.skip_micro:
+        results["micro"] = run_micro_benchmarks(args.micro_iterations)
+        for name, summary in results["micro"].items():
+            print(f"{name:<32} mean {summary['mean_us']:>10.3f} us  p95 {summary['p95_us']:>10.3f} us")
+
+    results["memory"] = {"peak_rss_mb": peak_rss_mb()}
+    print(f"peak RSS: {results['memory']['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
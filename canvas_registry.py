@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Canvas Registry for Grasshopper MCP Server
+Indexed record of the components and connections the server placed on the canvas
+"""
+
+import itertools
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class CanvasObject:
+    """A component placed on the canvas"""
+    guid: str
+    component_type: str           # knowledge base name, e.g. "circle"
+    alias: Optional[str] = None   # user-assigned name, unique on the canvas
+    sequence: int = 0             # creation order
+    parameters: Dict[str, Any] = field(default_factory=dict, compare=False)  # validated values last sent
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "guid": self.guid,
+            "component_type": self.component_type,
+            "alias": self.alias,
+            "parameters": self.parameters
+        }
+
+@dataclass(frozen=True)
+class Connection:
+    """A wire from an output parameter to an input parameter"""
+    source_guid: str
+    source_param: str
+    target_guid: str
+    target_param: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_guid": self.source_guid,
+            "source_param": self.source_param,
+            "target_guid": self.target_guid,
+            "target_param": self.target_param
+        }
+
+class CanvasSnapshot:
+    """Immutable view of the canvas at one version
+
+    Every lookup is a dict access. Snapshots are never modified after they
+    are published, so they can be read from any thread without locking.
+    """
+
+    __slots__ = ("version", "objects", "by_type", "by_alias", "outgoing", "incoming")
+
+    def __init__(self, version: int = 0, objects: Optional[Dict[str, CanvasObject]] = None,
+                 by_type: Optional[Dict[str, Dict[str, CanvasObject]]] = None,
+                 by_alias: Optional[Dict[str, str]] = None,
+                 outgoing: Optional[Dict[str, Tuple[Connection, ...]]] = None,
+                 incoming: Optional[Dict[str, Tuple[Connection, ...]]] = None):
+        self.version = version
+        self.objects = objects or {}      # guid -> object
+        self.by_type = by_type or {}      # component type -> {guid: object}, oldest first
+        self.by_alias = by_alias or {}    # alias -> guid
+        self.outgoing = outgoing or {}    # guid -> connections from its outputs
+        self.incoming = incoming or {}    # guid -> connections into its inputs
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def __contains__(self, guid: object) -> bool:
+        return guid in self.objects
+
+    def get(self, guid: str) -> Optional[CanvasObject]:
+        return self.objects.get(guid)
+
+    def by_alias_name(self, alias: str) -> Optional[CanvasObject]:
+        guid = self.by_alias.get(alias)
+        return self.objects.get(guid) if guid is not None else None
+
+    def of_type(self, component_type: str) -> List[CanvasObject]:
+        """Instances of a component type, oldest first"""
+        return list(self.by_type.get(component_type, {}).values())
+
+    def latest(self, component_type: str) -> Optional[CanvasObject]:
+        """Most recently created instance of a component type"""
+        instances = self.by_type.get(component_type)
+        if not instances:
+            return None
+        return next(reversed(instances.values()))
+
+    def resolve(self, reference: str) -> Optional[CanvasObject]:
+        """Look up a GUID, then an alias, then the latest instance of a component type"""
+        return self.objects.get(reference) or self.by_alias_name(reference) or self.latest(reference)
+
+    def connections_from(self, guid: str) -> Tuple[Connection, ...]:
+        return self.outgoing.get(guid, ())
+
+    def connections_to(self, guid: str) -> Tuple[Connection, ...]:
+        return self.incoming.get(guid, ())
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.outgoing.values())
+
+class CanvasTransaction:
+    """Pending changes to a canvas, published as one new snapshot
+
+    The base snapshot's indexes are shared until the transaction first
+    writes to one, and index buckets are copied the first time the
+    transaction changes them, so a change copies only the indexes and
+    buckets it touches.
+    """
+
+    def __init__(self, base: CanvasSnapshot, sequence: Iterator[int]):
+        self._sequence = sequence
+        self._version = base.version
+        self._objects = base.objects
+        self._by_type = base.by_type
+        self._by_alias = base.by_alias
+        self._outgoing = base.outgoing
+        self._incoming = base.incoming
+        self._own_indexes = set()  # attribute names of indexes that are already private copies
+        self._own_buckets = set()  # component types whose bucket is already a private copy
+        self.changed = False
+
+    def add(self, guid: str, component_type: str, alias: Optional[str] = None,
+            parameters: Optional[Dict[str, Any]] = None) -> CanvasObject:
+        """Record a created component; an alias already in use moves to it"""
+        if guid in self._objects:
+            self.remove(guid)
+        obj = CanvasObject(guid, component_type, alias or None, next(self._sequence), dict(parameters or {}))
+        self._writable("_objects")[guid] = obj
+        self._bucket(component_type)[guid] = obj
+        if obj.alias:
+            previous = self._objects.get(self._by_alias.get(obj.alias))
+            if previous is not None:
+                self._replace(previous, alias=None)
+            self._writable("_by_alias")[obj.alias] = guid
+        self.changed = True
+        return obj
+
+    def set_alias(self, guid: str, alias: Optional[str]) -> Optional[CanvasObject]:
+        obj = self._objects.get(guid)
+        if obj is None:
+            return None
+        by_alias = self._writable("_by_alias")
+        if obj.alias:
+            by_alias.pop(obj.alias, None)
+        if alias:
+            previous = self._objects.get(by_alias.get(alias))
+            if previous is not None and previous.guid != guid:
+                self._replace(previous, alias=None)
+            by_alias[alias] = guid
+        self.changed = True
+        return self._replace(obj, alias=alias or None)
+
+    def set_parameters(self, guid: str, parameters: Dict[str, Any]) -> Optional[CanvasObject]:
+        """Record updated parameter values, merged over the existing ones"""
+        obj = self._objects.get(guid)
+        if obj is None:
+            return None
+        self.changed = True
+        return self._replace(obj, parameters=dict(obj.parameters, **parameters))
+
+    def connect(self, source_guid: str, source_param: str, target_guid: str, target_param: str) -> Connection:
+        """Record a wire; recording the same wire twice keeps one"""
+        connection = Connection(source_guid, source_param, target_guid, target_param)
+        outgoing = self._outgoing.get(source_guid, ())
+        if connection not in outgoing:
+            self._writable("_outgoing")[source_guid] = outgoing + (connection,)
+            self._writable("_incoming")[target_guid] = self._incoming.get(target_guid, ()) + (connection,)
+            self.changed = True
+        return connection
+
+    def disconnect(self, connection: Connection) -> bool:
+        outgoing = self._outgoing.get(connection.source_guid, ())
+        if connection not in outgoing:
+            return False
+        self._set_adjacency(self._writable("_outgoing"), connection.source_guid,
+                            tuple(c for c in outgoing if c != connection))
+        self._set_adjacency(self._writable("_incoming"), connection.target_guid,
+                            tuple(c for c in self._incoming.get(connection.target_guid, ()) if c != connection))
+        self.changed = True
+        return True
+
+    def remove(self, guid: str) -> Optional[CanvasObject]:
+        """Forget a component and every wire attached to it"""
+        obj = self._objects.get(guid)
+        if obj is None:
+            return None
+        del self._writable("_objects")[guid]
+        bucket = self._bucket(obj.component_type)
+        bucket.pop(guid, None)
+        if not bucket:
+            del self._by_type[obj.component_type]
+            self._own_buckets.discard(obj.component_type)
+        if obj.alias and self._by_alias.get(obj.alias) == guid:
+            del self._writable("_by_alias")[obj.alias]
+        if guid in self._outgoing:
+            for connection in self._writable("_outgoing").pop(guid):
+                self._set_adjacency(self._writable("_incoming"), connection.target_guid,
+                                    tuple(c for c in self._incoming.get(connection.target_guid, ()) if c.source_guid != guid))
+        if guid in self._incoming:
+            for connection in self._writable("_incoming").pop(guid):
+                self._set_adjacency(self._writable("_outgoing"), connection.source_guid,
+                                    tuple(c for c in self._outgoing.get(connection.source_guid, ()) if c.target_guid != guid))
+        self.changed = True
+        return obj
+
+    def clear(self):
+        self._objects = {}
+        self._by_type = {}
+        self._by_alias = {}
+        self._outgoing = {}
+        self._incoming = {}
+        self._own_indexes = {"_objects", "_by_type", "_by_alias", "_outgoing", "_incoming"}
+        self._own_buckets = set()
+        self.changed = True
+
+    def snapshot(self) -> CanvasSnapshot:
+        """The canvas as it stands in this transaction"""
+        return CanvasSnapshot(self._version + 1 if self.changed else self._version, self._objects,
+                              self._by_type, self._by_alias, self._outgoing, self._incoming)
+
+    def _writable(self, index: str) -> Dict[str, Any]:
+        """The named top-level index, copied from the base snapshot on first write"""
+        if index not in self._own_indexes:
+            setattr(self, index, dict(getattr(self, index)))
+            self._own_indexes.add(index)
+        return getattr(self, index)
+
+    def _bucket(self, component_type: str) -> Dict[str, CanvasObject]:
+        if component_type not in self._own_buckets:
+            by_type = self._writable("_by_type")
+            by_type[component_type] = dict(by_type.get(component_type, {}))
+            self._own_buckets.add(component_type)
+        return self._by_type[component_type]
+
+    def _replace(self, obj: CanvasObject, **changes) -> CanvasObject:
+        updated = replace(obj, **changes)
+        self._writable("_objects")[obj.guid] = updated
+        self._bucket(obj.component_type)[obj.guid] = updated
+        return updated
+
+    @staticmethod
+    def _set_adjacency(index: Dict[str, Tuple[Connection, ...]], guid: str, connections: Tuple[Connection, ...]):
+        if connections:
+            index[guid] = connections
+        else:
+            index.pop(guid, None)
+
+class CanvasRegistry:
+    """Components and connections on the Grasshopper canvas, indexed for lookup
+
+    Objects can be found by GUID, by user-assigned alias or by component
+    type, and connections by either end. Readers take the current
+    ``snapshot`` without locking; writers are serialized and publish a new
+    snapshot when they finish, so readers never see a half-applied change.
+    """
+
+    def __init__(self):
+        self._snapshot = CanvasSnapshot()
+        self._write_lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def snapshot(self) -> CanvasSnapshot:
+        """The current canvas; unaffected by later changes"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def get(self, guid: str) -> Optional[CanvasObject]:
+        return self._snapshot.get(guid)
+
+    def resolve(self, reference: str) -> Optional[CanvasObject]:
+        return self._snapshot.resolve(reference)
+
+    def of_type(self, component_type: str) -> List[CanvasObject]:
+        return self._snapshot.of_type(component_type)
+
+    def connections_from(self, guid: str) -> Tuple[Connection, ...]:
+        return self._snapshot.connections_from(guid)
+
+    def connections_to(self, guid: str) -> Tuple[Connection, ...]:
+        return self._snapshot.connections_to(guid)
+
+    @contextmanager
+    def transaction(self) -> Iterator[CanvasTransaction]:
+        """Apply several changes and publish them together
+
+        Nothing is published if the block raises.
+        """
+        with self._write_lock:
+            transaction = CanvasTransaction(self._snapshot, self._sequence)
+            yield transaction
+            if transaction.changed:
+                self._snapshot = transaction.snapshot()
+
+    def add(self, guid: str, component_type: str, alias: Optional[str] = None,
+            parameters: Optional[Dict[str, Any]] = None) -> CanvasObject:
+        with self.transaction() as canvas:
+            return canvas.add(guid, component_type, alias, parameters)
+
+    def connect(self, source_guid: str, source_param: str, target_guid: str, target_param: str) -> Connection:
+        with self.transaction() as canvas:
+            return canvas.connect(source_guid, source_param, target_guid, target_param)
+
+    def remove(self, guid: str) -> Optional[CanvasObject]:
+        with self.transaction() as canvas:
+            return canvas.remove(guid)
+
+    def clear(self):
+        with self.transaction() as canvas:
+            canvas.clear()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Completion Cache for Grasshopper MCP Server
+Content-addressed cache of LM Studio chat completions
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Payload fields that determine a completion
+KEY_FIELDS = ("model", "messages", "tools", "tool_choice", "temperature", "top_p", "max_tokens", "seed", "stop")
+
+class CompletionCache:
+    """Two-tier cache of chat completion responses
+
+    Entries are keyed by a SHA-256 of the request fields that determine the
+    completion (model, messages, tools and sampling parameters). An
+    in-memory LRU tier sits in front of an optional SQLite file, so cached
+    completions survive restarts and can be shared between processes. Both
+    tiers are bounded by entry count and entries expire after ``ttl``
+    seconds.
+
+    Sampling with ``temperature`` above zero is not deterministic, so such
+    requests bypass the cache unless ``force`` is set.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600.0,
+                 path: Optional[str] = None, max_disk_entries: int = 10000, force: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.force = force
+
+        self._memory: OrderedDict = OrderedDict()  # key -> (created, response), least recently used first
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, accessed REAL NOT NULL, response TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+            self._db.commit()
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """Content hash of the fields of ``payload`` that determine the completion"""
+        material = {field: payload[field] for field in KEY_FIELDS if field in payload}
+        encoded = json.dumps(material, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def cacheable(self, payload: Dict[str, Any]) -> bool:
+        """Whether a request may be answered from the cache"""
+        if self.force or (payload.get("temperature") or 0) <= 0:
+            return True
+        with self._lock:
+            self._counters["bypassed"] += 1
+        return False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response for ``key``, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return copy.deepcopy(entry[1])
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, response FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    created, response = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        response = json.loads(response)
+                        self._remember(key, created, response)
+                        self._counters["disk_hits"] += 1
+                        return copy.deepcopy(response)
+                    self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """Store a response"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, copy.deepcopy(response))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions (key, created, accessed, response) VALUES (?, ?, ?, ?)",
+                    (key, now, now, json.dumps(response, separators=(',', ':')))
+                )
+                if self.ttl is not None:
+                    self._db.execute("DELETE FROM completions WHERE created < ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters, memory_entries=len(self._memory))
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            return stats
+
+    def close(self):
+        """Close the on-disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key: str, created: float, response: Dict[str, Any]):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -6,10 +6,16 @@ Handles the creation and management of Grasshopper components
 
 import json
 import logging
-from typing import Dict, Any, Optional, List
+import math
+import os
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Any, Optional, List, Set, Tuple, Callable, Iterator
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from component_index import ComponentSearchIndex, component_fields, definition_fields
+
 logger = logging.getLogger(__name__)
 
 class ParameterType(Enum):
@@ -52,12 +58,326 @@ class ComponentDefinition:
     icon_path: Optional[str] = None
     examples: List[str] = None
 
+SNAPSHOT_MAGIC = "grasshopper-component-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+
+def parameter_to_dict(param: Parameter) -> Dict[str, Any]:
+    """Convert a Parameter to plain JSON data"""
+    param_dict = asdict(param)
+    param_dict['param_type'] = param.param_type.value  # Convert enum to string
+    return param_dict
+
+def parameter_from_dict(data: Dict[str, Any]) -> Parameter:
+    """Build a Parameter from the data written by ``parameter_to_dict``"""
+    return Parameter(
+        name=data["name"],
+        internal_name=data.get("internal_name", data["name"]),
+        param_type=ParameterType(data["param_type"]),
+        description=data.get("description", ""),
+        required=data.get("required", False),
+        default_value=data.get("default_value"),
+        min_value=data.get("min_value"),
+        max_value=data.get("max_value")
+    )
+
+def component_to_dict(comp: "ComponentDefinition") -> Dict[str, Any]:
+    """Convert a ComponentDefinition to the knowledge base JSON format"""
+    return {
+        "name": comp.name,
+        "internal_name": comp.internal_name,
+        "category": comp.category,
+        "subcategory": comp.subcategory,
+        "description": comp.description,
+        "input_params": [parameter_to_dict(param) for param in comp.input_params],
+        "output_params": [parameter_to_dict(param) for param in comp.output_params],
+        "examples": comp.examples or []
+    }
+
+def component_from_dict(data: Dict[str, Any]) -> "ComponentDefinition":
+    """Build a ComponentDefinition from the knowledge base JSON format"""
+    try:
+        return ComponentDefinition(
+            name=data["name"],
+            internal_name=data["internal_name"],
+            category=data.get("category", ""),
+            subcategory=data.get("subcategory", ""),
+            description=data.get("description", ""),
+            input_params=[parameter_from_dict(param) for param in data.get("input_params", [])],
+            output_params=[parameter_from_dict(param) for param in data.get("output_params", [])],
+            icon_path=data.get("icon_path"),
+            examples=data.get("examples") or None
+        )
+    except (KeyError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid component definition {data.get('name', '?')!r}: {e}") from e
+
+_TRUE_STRINGS = frozenset({"true", "yes", "on", "1"})
+_FALSE_STRINGS = frozenset({"false", "no", "off", "0"})
+
+def _coerce_number(value: Any) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+def _coerce_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_STRINGS:
+            return True
+        if text in _FALSE_STRINGS:
+            return False
+    raise ValueError(value)
+
+def _coerce_text(value: Any) -> str:
+    if isinstance(value, (dict, list, tuple)) or value is None:
+        raise TypeError(value)
+    return value if isinstance(value, str) else str(value)
+
+def _coerce_vector3(value: Any) -> Any:
+    """Points and vectors: a named value ("Origin", "Z-axis"), [x, y(, z)] or {"x", "y"(, "z")}
+    
+    A list of such values is accepted for list inputs such as polyline vertices.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and value and all(isinstance(v, (list, tuple, dict, str)) for v in value):
+        return [_coerce_vector3(item) for item in value]
+    if isinstance(value, dict):
+        axes = {str(key).lower(): coordinate for key, coordinate in value.items()}
+        if not {"x", "y"} <= axes.keys() or not axes.keys() <= {"x", "y", "z"}:
+            raise ValueError(value)
+        value = [axes[axis] for axis in "xyz" if axis in axes]
+    if isinstance(value, (list, tuple)) and len(value) in (2, 3) and not any(isinstance(v, bool) for v in value):
+        coordinates = [_coerce_number(v) for v in value]
+        return coordinates + [0.0] * (3 - len(coordinates))
+    raise ValueError(value)
+
+def _coerce_plane(value: Any) -> Any:
+    """Planes: a named plane ("XY", "XZ", ...) or a structured definition"""
+    if isinstance(value, (str, dict)):
+        return value
+    raise ValueError(value)
+
+def _coerce_color(value: Any) -> Any:
+    """Colors: a name or "#RRGGBB" string, or [r, g, b(, a)] in 0-255"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)) and len(value) in (3, 4):
+        channels = [int(v) for v in value]
+        if all(0 <= channel <= 255 for channel in channels):
+            return channels
+    raise ValueError(value)
+
+def _coerce_reference(value: Any) -> Any:
+    """Geometry inputs normally arrive over a wire; values are passed through"""
+    return value
+
+# (coercion, error message suffix) per parameter type
+_COERCIONS: Dict[ParameterType, Tuple[Callable[[Any], Any], str]] = {
+    ParameterType.NUMBER: (_coerce_number, "must be a number"),
+    ParameterType.BOOLEAN: (_coerce_boolean, "must be a boolean"),
+    ParameterType.TEXT: (_coerce_text, "must be text"),
+    ParameterType.POINT: (_coerce_vector3, "must be a point name or [x, y, z]"),
+    ParameterType.VECTOR: (_coerce_vector3, "must be a vector name or [x, y, z]"),
+    ParameterType.PLANE: (_coerce_plane, "must be a plane name or definition"),
+    ParameterType.COLOR: (_coerce_color, "must be a color name or [r, g, b(, a)] in 0-255"),
+    ParameterType.CURVE: (_coerce_reference, ""),
+    ParameterType.SURFACE: (_coerce_reference, ""),
+    ParameterType.BREP: (_coerce_reference, ""),
+    ParameterType.MESH: (_coerce_reference, ""),
+    ParameterType.GEOMETRY: (_coerce_reference, ""),
+}
+
+def _compile_validator(comp: "ComponentDefinition") -> Callable[..., Dict[str, Any]]:
+    """Build a validator closure for one component definition
+    
+    Everything that depends only on the definition - coercion functions,
+    bounds, defaults and error strings - is resolved here once, so each
+    call only walks a flat tuple of steps.
+    """
+    steps = []
+    for param in comp.input_params:
+        coerce, type_message = _COERCIONS[param.param_type]
+        steps.append((
+            param.name,
+            coerce,
+            param.min_value,
+            param.max_value,
+            param.required,
+            param.default_value,
+            f"{param.name} {type_message}",
+            f"{param.name} must be >= {param.min_value}",
+            f"{param.name} must be <= {param.max_value}",
+            f"{param.name} must be a number " + " and ".join(
+                bound for bound in (param.min_value is not None and f">= {param.min_value}",
+                                    param.max_value is not None and f"<= {param.max_value}") if bound
+            ),
+            f"Required parameter '{param.name}' is missing",
+        ))
+    steps = tuple(steps)
+    no_wires = frozenset()
+    
+    def validate(parameters: Dict[str, Any], connected_inputs: Optional[Set[str]] = None) -> Dict[str, Any]:
+        if not isinstance(parameters, dict):
+            return {"error": "Parameters must be an object"}
+        wired = connected_inputs or no_wires
+        validated = {}
+        errors = []
+        
+        for (name, coerce, min_value, max_value, required, default,
+             type_error, min_error, max_error, range_error, missing_error) in steps:
+            if name in parameters:
+                try:
+                    value = coerce(parameters[name])
+                except (ValueError, TypeError):
+                    errors.append(type_error)
+                    continue
+                try:
+                    if min_value is not None and value < min_value:
+                        errors.append(min_error)
+                    if max_value is not None and value > max_value:
+                        errors.append(max_error)
+                except TypeError:
+                    # A bounded input given a value that does not compare with its bounds
+                    errors.append(range_error)
+                    continue
+                validated[name] = value
+            elif name in wired:
+                continue
+            elif required:
+                errors.append(missing_error)
+            elif default is not None:
+                validated[name] = default
+        
+        if errors:
+            return {"error": "; ".join(errors)}
+        return validated
+    
+    return validate
+
+class _Unparsed:
+    """A catalog entry whose ComponentDefinition has not been built yet"""
+    __slots__ = ("source", "start", "end")
+    
+    def __init__(self, source: Any, start: int = 0, end: int = 0):
+        self.source = source  # a dict, or bytes holding JSON at [start:end]
+        self.start = start
+        self.end = end
+    
+    def data(self) -> Dict[str, Any]:
+        """The definition as plain JSON data"""
+        if isinstance(self.source, dict):
+            return self.source
+        return json.loads(self.source[self.start:self.end])
+    
+    def parse(self) -> "ComponentDefinition":
+        return component_from_dict(self.data())
+
+class ComponentRegistry(MutableMapping):
+    """Component definitions by name, with change tracking
+    
+    Behaves like a dict. Every assignment or deletion bumps ``version`` and
+    notifies listeners with the affected name, so derived data (rendered
+    catalog text, search indexes, validators) can be cached and invalidated
+    cheaply. Definitions edited in place must be re-assigned to be noticed.
+    
+    Entries registered with ``add_unparsed`` are only turned into
+    ``ComponentDefinition`` objects the first time they are read, once even
+    when several threads read them at the same time; ``search_fields``
+    reads their searchable text without doing so.
+    """
+    
+    def __init__(self):
+        self._items: Dict[str, Any] = {}  # ComponentDefinition or _Unparsed
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()  # guards changes to _items
+        self.version = 0
+    
+    def __getitem__(self, name: str) -> ComponentDefinition:
+        comp = self._items[name]
+        if comp.__class__ is _Unparsed:
+            with self._lock:
+                comp = self._items[name]
+                if comp.__class__ is _Unparsed:
+                    comp = self._items[name] = comp.parse()
+        return comp
+    
+    def __setitem__(self, name: str, comp: ComponentDefinition):
+        with self._lock:
+            self._items[name] = comp
+        self._changed(name)
+    
+    def __delitem__(self, name: str):
+        with self._lock:
+            del self._items[name]
+        self._changed(name)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._items
+    
+    def get(self, name: str, default: Any = None) -> Optional[ComponentDefinition]:
+        if name in self._items:
+            return self[name]
+        return default
+    
+    def add_unparsed(self, name: str, source: Any, start: int = 0, end: int = 0):
+        """Register a definition to be parsed on first access
+        
+        ``source`` is either the definition as a dict (the format written by
+        ``export_knowledge_base``) or a bytes buffer holding that dict as
+        JSON between ``start`` and ``end``.
+        """
+        with self._lock:
+            self._items[name] = _Unparsed(source, start, end)
+        self._changed(name)
+    
+    def search_fields(self, name: str) -> Dict[str, str]:
+        """Searchable text of a definition per field, without parsing an unparsed one"""
+        comp = self._items[name]
+        if comp.__class__ is _Unparsed:
+            return definition_fields(name, comp.data())
+        return component_fields(name, comp)
+    
+    @property
+    def unparsed_count(self) -> int:
+        """Number of registered definitions not yet parsed"""
+        return sum(1 for comp in self._items.values() if comp.__class__ is _Unparsed)
+    
+    def add_listener(self, listener: Callable[[str], None]):
+        """Call ``listener(name)`` whenever a definition is added, replaced or removed"""
+        self._listeners.append(listener)
+    
+    def _changed(self, name: str):
+        self.version += 1
+        for listener in self._listeners:
+            listener(name)
+
 class ComponentFactory:
     """Factory for creating and managing Grasshopper component definitions"""
     
-    def __init__(self):
-        self.components: Dict[str, ComponentDefinition] = {}
-        self._load_default_components()
+    def __init__(self, catalog_paths: Optional[List[str]] = None, load_defaults: bool = True):
+        self.components = ComponentRegistry()
+        self._snippet_cache: Dict[str, str] = {}
+        self._catalog_cache: Optional[Tuple[int, str]] = None  # (registry version, text)
+        self._search_index: Optional[ComponentSearchIndex] = None  # built on first search
+        self._search_index_lock = threading.Lock()
+        self._validators: Dict[str, Callable[..., Dict[str, Any]]] = {}
+        self.components.add_listener(self._on_component_changed)
+        if load_defaults:
+            self._load_default_components()
+        for path in catalog_paths or []:
+            self.load_catalog(path)
     
     def _load_default_components(self):
         """Load default Grasshopper components"""
@@ -401,129 +721,236 @@ class ComponentFactory:
         """Get all components in a specific category"""
         return [comp for comp in self.components.values() if comp.category.lower() == category.lower()]
     
-    def search_components(self, query: str) -> List[ComponentDefinition]:
-        """Search components by name or description"""
-        query = query.lower()
-        results = []
-        
-        for comp in self.components.values():
-            if (query in comp.name.lower() or 
-                query in comp.description.lower() or
-                any(query in example.lower() for example in (comp.examples or []))):
-                results.append(comp)
-        
-        return results
+    def search_components(self, query: str, limit: Optional[int] = None) -> List[ComponentDefinition]:
+        """Search components by name, description, parameters and examples, best match first
+        
+        An empty query matches every component, in registration order.
+        """
+        if not query.strip():
+            return [self.components[name] for name in list(self.components)[:limit]]
+        return [self.components[name] for name, _ in self.rank_components(query, limit)]
+    
+    def rank_components(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Search components and return ``(name, score)`` pairs, best match first"""
+        index = self._get_search_index()
+        with self._search_index_lock:
+            return index.search(query, limit)
+    
+    def _get_search_index(self) -> ComponentSearchIndex:
+        """Build the search index on first use; it is kept current incrementally after that"""
+        if self._search_index is None:
+            with self._search_index_lock:
+                if self._search_index is None:
+                    index = ComponentSearchIndex()
+                    for name in list(self.components):
+                        index.add_fields(name, self.components.search_fields(name))
+                    self._search_index = index
+        return self._search_index
+    
+    @property
+    def catalog_version(self) -> int:
+        """Changes whenever a component definition is added, replaced or removed"""
+        return self.components.version
     
     def get_component_info_for_llm(self) -> str:
-        """Get component information formatted for LLM"""
-        info = "Available Grasshopper Components:\n\n"
+        """Get component information formatted for LLM
+        
+        The text is rendered once and reused until the registry changes.
+        """
+        version = self.components.version
+        cached = self._catalog_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
         
         # Group by category
-        categories = {}
-        for comp in self.components.values():
-            if comp.category not in categories:
-                categories[comp.category] = []
-            categories[comp.category].append(comp)
-        
-        for category, comps in categories.items():
-            info += f"## {category}\n\n"
-            for comp in comps:
-                info += f"### {comp.name} ({list(self.components.keys())[list(self.components.values()).index(comp)]})\n"
-                info += f"{comp.description}\n\n"
-                
-                if comp.input_params:
-                    info += "**Inputs:**\n"
-                    for param in comp.input_params:
-                        required = " (required)" if param.required else " (optional)"
-                        default = f" [default: {param.default_value}]" if param.default_value is not None else ""
-                        info += f"- {param.name} ({param.param_type.value}): {param.description}{required}{default}\n"
-                    info += "\n"
-                
-                if comp.output_params:
-                    info += "**Outputs:**\n"
-                    for param in comp.output_params:
-                        info += f"- {param.name} ({param.param_type.value}): {param.description}\n"
-                    info += "\n"
-                
-                if comp.examples:
-                    info += "**Examples:**\n"
-                    for example in comp.examples:
-                        info += f"- {example}\n"
-                    info += "\n"
-                
-                info += "---\n\n"
+        categories: Dict[str, List[str]] = {}
+        for name, comp in self.components.items():
+            categories.setdefault(comp.category, []).append(name)
         
+        parts = ["Available Grasshopper Components:\n\n"]
+        for category, names in categories.items():
+            parts.append(f"## {category}\n\n")
+            parts.extend(self.get_component_snippet(name) for name in names)
+        
+        info = "".join(parts)
+        self._catalog_cache = (version, info)
         return info
     
-    def validate_component_parameters(self, component_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate parameters for a component"""
-        comp = self.get_component(component_name)
-        if not comp:
-            return {"error": f"Unknown component: {component_name}"}
+    def select_components_for_llm(self, query: str, limit: int = 8) -> List[str]:
+        """Names of the components most relevant to ``query``, best match first"""
+        return [name for name, _ in self.rank_components(query, limit)]
+    
+    def get_component_info_for_query(self, names: List[str]) -> str:
+        """Get information on the given components formatted for LLM
+    
+        The prompt-sized counterpart of ``get_component_info_for_llm``, built
+        from the same cached per-component snippets.
+        """
+        parts = ["Relevant Grasshopper Components:\n\n"]
+        parts.extend(self.get_component_snippet(name) for name in names if name in self.components)
+        return "".join(parts)
+    
+    def get_component_snippet(self, name: str) -> str:
+        """Get the LLM-formatted description of a single component (cached)"""
+        snippet = self._snippet_cache.get(name)
+        if snippet is None:
+            snippet = self._render_component(name, self.components[name])
+            self._snippet_cache[name] = snippet
+        return snippet
+    
+    @staticmethod
+    def _render_component(name: str, comp: ComponentDefinition) -> str:
+        lines = [f"### {comp.name} ({name})", comp.description, ""]
         
-        validated = {}
-        errors = []
+        if comp.input_params:
+            lines.append("**Inputs:**")
+            for param in comp.input_params:
+                required = " (required)" if param.required else " (optional)"
+                default = f" [default: {param.default_value}]" if param.default_value is not None else ""
+                lines.append(f"- {param.name} ({param.param_type.value}): {param.description}{required}{default}")
+            lines.append("")
         
-        # Check all input parameters
-        for param in comp.input_params:
-            if param.name in parameters:
-                value = parameters[param.name]
-                
-                # Type validation (simplified)
-                if param.param_type == ParameterType.NUMBER:
-                    try:
-                        value = float(value)
-                        if param.min_value is not None and value < param.min_value:
-                            errors.append(f"{param.name} must be >= {param.min_value}")
-                        if param.max_value is not None and value > param.max_value:
-                            errors.append(f"{param.name} must be <= {param.max_value}")
-                    except (ValueError, TypeError):
-                        errors.append(f"{param.name} must be a number")
-                
-                validated[param.name] = value
-                
-            elif param.required:
-                errors.append(f"Required parameter '{param.name}' is missing")
-            elif param.default_value is not None:
-                validated[param.name] = param.default_value
+        if comp.output_params:
+            lines.append("**Outputs:**")
+            for param in comp.output_params:
+                lines.append(f"- {param.name} ({param.param_type.value}): {param.description}")
+            lines.append("")
         
-        if errors:
-            return {"error": "; ".join(errors)}
+        if comp.examples:
+            lines.append("**Examples:**")
+            for example in comp.examples:
+                lines.append(f"- {example}")
+            lines.append("")
         
-        return validated
+        lines.extend(["---", "", ""])
+        return "\n".join(lines)
+    
+    def _on_component_changed(self, name: str):
+        self._snippet_cache.pop(name, None)
+        self._validators.pop(name, None)
+        if self._search_index is not None:
+            with self._search_index_lock:
+                if name in self.components:
+                    self._search_index.add_fields(name, self.components.search_fields(name))
+                else:
+                    self._search_index.remove(name)
+    
+    def validate_component_parameters(self, component_name: str, parameters: Dict[str, Any],
+                                      connected_inputs: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Validate parameters for a component
+        
+        Values are coerced to their parameter type, numbers are range
+        checked and missing optional inputs get their default. Inputs named
+        in ``connected_inputs`` are fed by a wire, so they are neither
+        required nor filled with their default value.
+        """
+        validator = self.get_validator(component_name)
+        if validator is None:
+            return {"error": f"Unknown component: {component_name}"}
+        return validator(parameters, connected_inputs)
+    
+    def validate_component_parameters_bulk(self, component_name: str, parameter_sets: List[Dict[str, Any]],
+                                           connected_inputs: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Validate many parameter sets for one component, e.g. for a parameter sweep
+        
+        Returns one result per set, each shaped like the result of
+        ``validate_component_parameters``.
+        """
+        validator = self.get_validator(component_name)
+        if validator is None:
+            return [{"error": f"Unknown component: {component_name}"} for _ in parameter_sets]
+        return [validator(parameters, connected_inputs) for parameters in parameter_sets]
+    
+    def get_validator(self, component_name: str) -> Optional[Callable[..., Dict[str, Any]]]:
+        """Get the compiled parameter validator for a component (built on first use)"""
+        name = component_name.lower()
+        validator = self._validators.get(name)
+        if validator is None:
+            comp = self.components.get(name)
+            if comp is None:
+                return None
+            validator = _compile_validator(comp)
+            self._validators[name] = validator
+        return validator
     
     def export_knowledge_base(self, file_path: str):
         """Export component knowledge base to JSON file"""
-        data = {}
-        for name, comp in self.components.items():
-            # Convert ParameterType enum to string
-            input_params = []
-            for param in comp.input_params:
-                param_dict = asdict(param)
-                param_dict['param_type'] = param.param_type.value  # Convert enum to string
-                input_params.append(param_dict)
-            
-            output_params = []
-            for param in comp.output_params:
-                param_dict = asdict(param)
-                param_dict['param_type'] = param.param_type.value  # Convert enum to string
-                output_params.append(param_dict)
-            
-            data[name] = {
-                "name": comp.name,
-                "internal_name": comp.internal_name,
-                "category": comp.category,
-                "subcategory": comp.subcategory,
-                "description": comp.description,
-                "input_params": input_params,
-                "output_params": output_params,
-                "examples": comp.examples or []
-            }
+        data = {name: component_to_dict(comp) for name, comp in self.components.items()}
         
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         logger.info(f"Exported component knowledge base to {file_path}")
+    
+    def export_snapshot(self, file_path: str):
+        """Export the knowledge base as a snapshot for fast, lazy loading
+        
+        The first line is a JSON header mapping each component name to the
+        byte range of its compact JSON definition in the rest of the file,
+        so loading only has to parse the header.
+        """
+        entries = []
+        index = {}
+        offset = 0
+        for name, comp in self.components.items():
+            entry = json.dumps(component_to_dict(comp), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            index[name] = [offset, len(entry)]
+            entries.append(entry)
+            offset += len(entry)
+        
+        header = {"format": SNAPSHOT_MAGIC, "version": SNAPSHOT_VERSION, "index": index}
+        with open(file_path, 'wb') as f:
+            f.write(json.dumps(header, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n')
+            f.writelines(entries)
+        
+        logger.info(f"Exported component snapshot to {file_path}")
+    
+    def load_catalog(self, path: str) -> int:
+        """Register components from a catalog file or directory
+        
+        Accepts JSON files in the ``export_knowledge_base`` format, snapshot
+        files written by ``export_snapshot`` (``*.snapshot``), or a directory
+        of either, loaded in file name order. Definitions are parsed lazily
+        on first use; components with an existing name are replaced.
+        Returns the number of components registered.
+        """
+        if os.path.isdir(path):
+            count = 0
+            for entry in sorted(os.listdir(path)):
+                if entry.endswith(".json") or entry.endswith(SNAPSHOT_SUFFIX):
+                    count += self.load_catalog(os.path.join(path, entry))
+            return count
+        
+        if path.endswith(SNAPSHOT_SUFFIX):
+            count = self._load_snapshot(path)
+        else:
+            count = self._load_json_catalog(path)
+        logger.info(f"Registered {count} component definitions from {path}")
+        return count
+    
+    def _load_json_catalog(self, path: str) -> int:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: catalog must be a JSON object of name -> definition")
+        for name, definition in data.items():
+            self.components.add_unparsed(name.lower(), definition)
+        return len(data)
+    
+    def _load_snapshot(self, path: str) -> int:
+        with open(path, 'rb') as f:
+            buffer = f.read()
+        header_end = buffer.find(b'\n')
+        header = json.loads(buffer[:header_end]) if header_end >= 0 else None
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path}: not a component snapshot")
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path}: unsupported snapshot version {header.get('version')}")
+        
+        base = header_end + 1
+        for name, (offset, length) in header["index"].items():
+            self.components.add_unparsed(name.lower(), buffer, base + offset, base + offset + length)
+        return len(header["index"])
 
 def main():
     """Demo of component factory"""
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Component Search Index for Grasshopper MCP Server
+BM25-ranked inverted index with prefix and typo tolerance
+"""
+
+import math
+import re
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:  # component_factory imports this module
+    from component_factory import ComponentDefinition
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset({
+    "a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"
+})
+
+# Relative weight of a term occurrence in each field
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 1.0,
+    "description": 1.0,
+    "params": 0.5,
+    "examples": 0.5,
+}
+
+# Score multiplier for query terms matched other than exactly
+PREFIX_MATCH_WEIGHT = 0.8
+FUZZY_MATCH_WEIGHT = 0.6
+
+# Distinct queries whose ranking is kept until the index changes
+RESULT_CACHE_SIZE = 256
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens, without stop words"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def component_fields(name: str, comp: "ComponentDefinition") -> Dict[str, str]:
+    """Searchable text of a component definition, per field"""
+    return {
+        "name": f"{name} {comp.name} {comp.internal_name}",
+        "category": f"{comp.category} {comp.subcategory}",
+        "description": comp.description,
+        "params": " ".join(param.name for param in comp.input_params + comp.output_params),
+        "examples": " ".join(comp.examples or []),
+    }
+
+def definition_fields(name: str, data: Dict[str, Any]) -> Dict[str, str]:
+    """Searchable text of a definition in the knowledge base JSON format
+
+    Matches ``component_fields`` for the same definition, without building
+    the ``ComponentDefinition``.
+    """
+    params = [param for param in (data.get("input_params") or []) + (data.get("output_params") or [])
+              if isinstance(param, dict)]
+    return {
+        "name": f"{name} {data.get('name', '')} {data.get('internal_name', '')}",
+        "category": f"{data.get('category', '')} {data.get('subcategory', '')}",
+        "description": str(data.get("description", "")),
+        "params": " ".join(str(param.get("name", "")) for param in params),
+        "examples": " ".join(str(example) for example in data.get("examples") or []),
+    }
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class ComponentSearchIndex:
+    """Inverted index over component definitions, ranked with BM25
+
+    Each component is a document made of weighted fields (name, category,
+    description, parameter names, examples). Query terms that are not in the
+    vocabulary are expanded to vocabulary terms they prefix (via a sorted
+    term list) and to terms within a small edit distance (via a trigram
+    index), at reduced weight. Components can be added and removed
+    incrementally; no operation rescans the whole catalog.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = {}   # term -> {name: weighted tf}
+        self._documents: Dict[str, Dict[str, float]] = {}  # name -> {term: weighted tf}
+        self._lengths: Dict[str, float] = {}
+        self._order: Dict[str, int] = {}  # registration order, for stable ties
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._next_order = 0
+        # Derived from the current documents; dropped on every add/remove
+        self._norms: Optional[Dict[str, float]] = None
+        self._results: "OrderedDict[Tuple[str, ...], List[Tuple[str, float]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, name: str, comp: "ComponentDefinition"):
+        """Index (or re-index) a component under its registry name"""
+        self.add_fields(name, component_fields(name, comp))
+
+    def add_fields(self, name: str, fields: Dict[str, str]):
+        """Index (or re-index) a component from its searchable text per field"""
+        if name in self._documents:
+            self.remove(name)
+        self._invalidate()
+
+        terms: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        self._documents[name] = terms
+        self._lengths[name] = sum(terms.values())
+        self._total_length += self._lengths[name]
+        self._order[name] = self._next_order
+        self._next_order += 1
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+                for trigram in _trigrams(term):
+                    self._trigram_index.setdefault(trigram, set()).add(term)
+            postings[name] = frequency
+
+    def remove(self, name: str):
+        """Drop a component from the index"""
+        terms = self._documents.pop(name, None)
+        if terms is None:
+            return
+        self._invalidate()
+        self._total_length -= self._lengths.pop(name)
+        del self._order[name]
+        for term in terms:
+            postings = self._postings[term]
+            del postings[name]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+                for trigram in _trigrams(term):
+                    self._trigram_index[trigram].discard(term)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return ``(name, score)`` pairs, best match first"""
+        key = tuple(sorted(set(tokenize(query))))
+        ranked = self._results.get(key)
+        if ranked is None:
+            ranked = self._rank(key)
+            self._results[key] = ranked
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+        return ranked[:limit] if limit is not None else list(ranked)
+
+    def _rank(self, tokens: Tuple[str, ...]) -> List[Tuple[str, float]]:
+        if not self._documents:
+            return []
+        if self._norms is None:
+            average_length = self._total_length / len(self._documents)
+            self._norms = {
+                name: self.k1 * (1.0 - self.b + self.b * length / average_length)
+                for name, length in self._lengths.items()
+            }
+
+        norms = self._norms
+        count = len(self._documents)
+        scores: Dict[str, float] = {}
+        for token in tokens:
+            for term, match_weight in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1.0 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = match_weight * idf * (self.k1 + 1.0)
+                for name, frequency in postings.items():
+                    scores[name] = scores.get(name, 0.0) + weight * frequency / (frequency + norms[name])
+
+        order = self._order
+        return sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))
+
+    def _invalidate(self):
+        self._norms = None
+        self._results.clear()
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary terms a query token should match, with their weights"""
+        if token in self._postings:
+            return [(token, 1.0)]
+
+        expansions: Dict[str, float] = {}
+        if len(token) >= 2:
+            vocabulary = self._vocabulary
+            for position in range(bisect_left(vocabulary, token), len(vocabulary)):
+                if not vocabulary[position].startswith(token):
+                    break
+                expansions[vocabulary[position]] = PREFIX_MATCH_WEIGHT
+
+        if len(token) >= 3:
+            limit = 1 if len(token) <= 4 else 2
+            token_trigrams = _trigrams(token)
+            shared: Dict[str, int] = {}
+            for trigram in token_trigrams:
+                for term in self._trigram_index.get(trigram, ()):
+                    shared[term] = shared.get(term, 0) + 1
+            for term, overlap in shared.items():
+                if term in expansions:
+                    continue
+                # A padded term of length n has at most n distinct trigrams
+                similarity = 2.0 * overlap / (len(token_trigrams) + len(term))
+                if similarity >= 0.4 and _edit_distance(token, term, limit) <= limit:
+                    expansions[term] = FUZZY_MATCH_WEIGHT
+
+        return list(expansions.items())
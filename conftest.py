@@ -0,0 +1,38 @@
+"""
+Shared pytest fixtures: a Grasshopper stand-in and an MCP server connected to it
+"""
+
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from grasshopper_standin import GrasshopperStandIn
+from mcp_server import MCPServer
+from metrics import MetricsRegistry
+
+@pytest.fixture
+def standin():
+    """Stand-in accepting every component type, on a free port"""
+    standin = GrasshopperStandIn("localhost", 0, supported_components=None)
+    standin.start()
+    yield standin
+    standin.stop()
+
+@pytest.fixture
+def server(standin):
+    """MCP server using a connection pool to the stand-in"""
+    host, port = standin.address
+    server = MCPServer(host, port, metrics=MetricsRegistry())
+    yield server
+    server.jobs.close()
+    server.grasshopper_client.disconnect()
+
+@pytest.fixture
+def base_url(server):
+    """The server's Flask app served over HTTP on a free port"""
+    http = make_server("localhost", 0, server.app, threaded=True)
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{http.server_port}"
+    http.shutdown()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Graph Builder for Grasshopper MCP Server
+Validates declarative node/edge definitions and schedules them for execution
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+from component_factory import ComponentFactory, ComponentDefinition, Parameter
+
+@dataclass
+class GraphNode:
+    """A component instance in a declarative graph"""
+    id: str
+    component: str
+    parameters: Dict[str, Any]
+
+@dataclass
+class GraphEdge:
+    """A wire from an output parameter to an input parameter"""
+    source: str
+    source_param: str
+    target: str
+    target_param: str
+
+@dataclass
+class GraphPlan:
+    """A validated graph in execution order"""
+    nodes: List[GraphNode]   # topologically sorted
+    edges: List[GraphEdge]   # ordered by target node position, parameter names canonical
+
+    @property
+    def order(self) -> List[str]:
+        return [node.id for node in self.nodes]
+
+    def to_operations(self, clear: bool = False) -> List[Dict[str, Any]]:
+        """Express the plan as ``/batch`` operations"""
+        operations = [{"op": "clear_canvas"}] if clear else []
+        for node in self.nodes:
+            operations.append({
+                "op": "create_component",
+                "ref": node.id,
+                "component_name": node.component,
+                "parameters": node.parameters
+            })
+        for edge in self.edges:
+            operations.append({
+                "op": "connect_components",
+                "source_component": edge.source,
+                "source_param": edge.source_param,
+                "target_component": edge.target,
+                "target_param": edge.target_param
+            })
+        return operations
+
+def _find_param(params: List[Parameter], name: str) -> Optional[Parameter]:
+    """Match a parameter by name or nickname, case-insensitively"""
+    name = name.lower()
+    for param in params:
+        if param.name.lower() == name or param.internal_name.lower() == name:
+            return param
+    return None
+
+def _parse(data: Dict[str, Any]) -> Tuple[List[GraphNode], List[GraphEdge], List[str]]:
+    errors = []
+    nodes = []
+    edges = []
+
+    raw_nodes = data.get("nodes")
+    raw_edges = data.get("edges", [])
+    if not isinstance(raw_nodes, list) or not raw_nodes:
+        return [], [], ["'nodes' must be a non-empty list"]
+    if not isinstance(raw_edges, list):
+        return [], [], ["'edges' must be a list"]
+
+    for index, raw in enumerate(raw_nodes):
+        if not isinstance(raw, dict) or not raw.get("id") or not raw.get("component"):
+            errors.append(f"node {index}: 'id' and 'component' are required")
+            continue
+        parameters = raw.get("parameters", {})
+        if not isinstance(parameters, dict):
+            errors.append(f"node {raw['id']}: 'parameters' must be an object")
+            continue
+        nodes.append(GraphNode(str(raw["id"]).lower(), str(raw["component"]).lower(), parameters))
+
+    for index, raw in enumerate(raw_edges):
+        fields = ("source", "source_param", "target", "target_param")
+        if not isinstance(raw, dict) or not all(raw.get(field) for field in fields):
+            errors.append(f"edge {index}: {', '.join(repr(f) for f in fields)} are required")
+            continue
+        edges.append(GraphEdge(
+            str(raw["source"]).lower(), str(raw["source_param"]),
+            str(raw["target"]).lower(), str(raw["target_param"])
+        ))
+
+    return nodes, edges, errors
+
+def _topological_sort(nodes: List[GraphNode], edges: List[GraphEdge]) -> Tuple[List[GraphNode], List[str]]:
+    """Kahn's algorithm; ties keep the order nodes were declared in"""
+    position = {node.id: index for index, node in enumerate(nodes)}
+    indegree = {node.id: 0 for node in nodes}
+    successors: Dict[str, List[str]] = {node.id: [] for node in nodes}
+    for edge in edges:
+        successors[edge.source].append(edge.target)
+        indegree[edge.target] += 1
+
+    ready = [position[node_id] for node_id, degree in indegree.items() if degree == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        node = nodes[heapq.heappop(ready)]
+        ordered.append(node)
+        for successor in successors[node.id]:
+            indegree[successor] -= 1
+            if indegree[successor] == 0:
+                heapq.heappush(ready, position[successor])
+
+    if len(ordered) < len(nodes):
+        cyclic = sorted(node_id for node_id, degree in indegree.items() if degree > 0)
+        return [], [f"Graph contains a cycle through: {', '.join(cyclic)}"]
+    return ordered, []
+
+def plan_graph(factory: ComponentFactory, data: Dict[str, Any]) -> Tuple[Optional[GraphPlan], List[str]]:
+    """Validate a graph definition and put it in execution order
+
+    ``data`` has the form::
+
+        {"nodes": [{"id": "p", "component": "point", "parameters": {"X": 1}}, ...],
+         "edges": [{"source": "p", "source_param": "Point",
+                    "target": "c", "target_param": "Plane"}, ...]}
+
+    Component names come from ``ComponentFactory``; parameter names are
+    checked against ``output_params`` (sources) and ``input_params``
+    (targets). All problems are collected and returned together. Parameter
+    values are validated when the plan is dispatched as a batch.
+    """
+    nodes, edges, errors = _parse(data)
+    if errors:
+        return None, errors
+
+    definitions: Dict[str, ComponentDefinition] = {}
+    for node in nodes:
+        if node.id in definitions:
+            errors.append(f"node {node.id}: duplicate id")
+            continue
+        definition = factory.get_component(node.component)
+        if definition is None:
+            errors.append(f"node {node.id}: Unknown component: {node.component}")
+            continue
+        definitions[node.id] = definition
+    if errors:
+        return None, errors
+
+    resolved_edges = []
+    for edge in edges:
+        label = f"edge {edge.source}.{edge.source_param} -> {edge.target}.{edge.target_param}"
+        if edge.source not in definitions or edge.target not in definitions:
+            errors.append(f"{label}: unknown node")
+            continue
+        source_param = _find_param(definitions[edge.source].output_params, edge.source_param)
+        target_param = _find_param(definitions[edge.target].input_params, edge.target_param)
+        if source_param is None:
+            errors.append(f"{label}: {definitions[edge.source].name} has no output '{edge.source_param}'")
+        if target_param is None:
+            errors.append(f"{label}: {definitions[edge.target].name} has no input '{edge.target_param}'")
+        if source_param is not None and target_param is not None:
+            resolved_edges.append(GraphEdge(edge.source, source_param.name, edge.target, target_param.name))
+    if errors:
+        return None, errors
+
+    ordered, errors = _topological_sort(nodes, resolved_edges)
+    if errors:
+        return None, errors
+
+    position = {node.id: index for index, node in enumerate(ordered)}
+    resolved_edges.sort(key=lambda edge: position[edge.target])
+    return GraphPlan(ordered, resolved_edges), []
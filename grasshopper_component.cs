@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.Drawing;
 using System.IO;
 using System.Net;
@@ -26,6 +27,7 @@ namespace GrasshopperMCP
         private bool _isListening = false;
         private int _port = 8888;
         private Dictionary<string, IGH_DocumentObject> _createdComponents;
+        private readonly object _documentLock = new object();
 
         public GH_MCPComponent()
             : base("MCP Bridge", "MCP",
@@ -122,11 +124,12 @@ namespace GrasshopperMCP
             {
                 try
                 {
-                    using (TcpClient client = _tcpListener.AcceptTcpClient())
-                    {
-                        Thread clientThread = new Thread(new ParameterizedThreadStart(HandleClientComm));
-                        clientThread.Start(client);
-                    }
+                    // The connection is owned (and closed) by HandleClientComm so that
+                    // the MCP Server can keep it open across many commands.
+                    TcpClient client = _tcpListener.AcceptTcpClient();
+                    Thread clientThread = new Thread(new ParameterizedThreadStart(HandleClientComm));
+                    clientThread.IsBackground = true;
+                    clientThread.Start(client);
                 }
                 catch (Exception ex)
                 {
@@ -143,64 +146,250 @@ namespace GrasshopperMCP
             TcpClient tcpClient = (TcpClient)client;
             NetworkStream clientStream = tcpClient.GetStream();
 
-            byte[] message = new byte[4096];
-            int bytesRead;
+            // Commands are newline-delimited JSON frames. A single Read() may return
+            // part of a command or several commands at once, so read whole lines.
+            StreamReader reader = new StreamReader(clientStream, new UTF8Encoding(false));
+            StreamWriter writer = new StreamWriter(clientStream, new UTF8Encoding(false)) { NewLine = "\n" };
+            object writeLock = new object();
 
             while (true)
             {
-                bytesRead = 0;
+                string jsonMessage;
 
                 try
                 {
-                    bytesRead = clientStream.Read(message, 0, 4096);
+                    jsonMessage = reader.ReadLine();
                 }
                 catch
                 {
                     break;
                 }
 
-                if (bytesRead == 0)
+                if (jsonMessage == null)
                 {
                     break;
                 }
 
-                string jsonMessage = Encoding.UTF8.GetString(message, 0, bytesRead);
-                string response = ProcessCommand(jsonMessage);
+                if (jsonMessage.Trim().Length == 0)
+                {
+                    continue;
+                }
+
+                JObject command;
+                try
+                {
+                    command = JObject.Parse(jsonMessage);
+                }
+                catch (Exception ex)
+                {
+                    if (!WriteResponse(writer, writeLock, JsonConvert.SerializeObject(new { success = false, error = ex.Message })))
+                    {
+                        break;
+                    }
+                    continue;
+                }
 
-                byte[] responseBytes = Encoding.UTF8.GetBytes(response + "\n");
-                clientStream.Write(responseBytes, 0, responseBytes.Length);
-                clientStream.Flush();
+                // Commands tagged with a request_id may be answered out of order, so they
+                // are dispatched to the thread pool and the next command is read right
+                // away. Untagged commands keep the original strict request/response order.
+                if (command["request_id"] != null)
+                {
+                    ThreadPool.QueueUserWorkItem(_ => WriteResponse(writer, writeLock, ProcessCommand(command)));
+                }
+                else if (!WriteResponse(writer, writeLock, ProcessCommand(command)))
+                {
+                    break;
+                }
             }
 
             tcpClient.Close();
         }
 
-        private string ProcessCommand(string jsonCommand)
+        private bool WriteResponse(StreamWriter writer, object writeLock, string response)
+        {
+            lock (writeLock)
+            {
+                try
+                {
+                    writer.WriteLine(response);
+                    writer.Flush();
+                    return true;
+                }
+                catch
+                {
+                    return false;
+                }
+            }
+        }
+
+        private string ProcessCommand(JObject command)
         {
+            Stopwatch stopwatch = Stopwatch.StartNew();
+            string requestId = command["request_id"]?.ToString();
+            string traceId = command["trace_id"]?.ToString();
             try
             {
-                JObject command = JObject.Parse(jsonCommand);
-                string commandType = command["command"]?.ToString();
+                return TagResponse(DispatchCommand(command), requestId, traceId, stopwatch);
+            }
+            catch (Exception ex)
+            {
+                return TagResponse(JsonConvert.SerializeObject(new { success = false, error = ex.Message }), requestId, traceId, stopwatch);
+            }
+        }
+
+        private string DispatchCommand(JObject command)
+        {
+            string commandType = command["command"]?.ToString();
+
+            if (commandType == "ping")
+            {
+                return JsonConvert.SerializeObject(new { success = true, message = "pong" });
+            }
 
+            // Pipelined commands run concurrently; document edits must not
+            lock (_documentLock)
+            {
                 switch (commandType)
                 {
                     case "create_component":
                         return CreateComponent(command);
                     case "connect_parameters":
                         return ConnectParameters(command);
+                    case "disconnect_parameters":
+                        return DisconnectParameters(command);
+                    case "remove_component":
+                        return RemoveComponent(command);
+                    case "set_parameters":
+                        return SetParameters(command);
                     case "clear_canvas":
                         return ClearCanvas();
+                    case "batch":
+                        return Batch(command);
                     default:
                         return JsonConvert.SerializeObject(new { success = false, error = "Unknown command: " + commandType });
                 }
             }
+        }
+
+        private string TagResponse(string response, string requestId, string traceId, Stopwatch stopwatch)
+        {
+            if (requestId == null && traceId == null)
+            {
+                return response;
+            }
+
+            // Every response is a serialized JSON object, so the tags are spliced in
+            // before its closing brace rather than parsing the response again
+            StringBuilder tags = new StringBuilder();
+            if (requestId != null)
+            {
+                tags.Append(",\"request_id\":").Append(JsonConvert.ToString(requestId));
+            }
+            // Traced commands report the time spent here, including waiting for the document lock
+            if (traceId != null)
+            {
+                tags.Append(",\"trace_id\":").Append(JsonConvert.ToString(traceId));
+                tags.Append(",\"elapsed_ms\":").Append(JsonConvert.ToString(stopwatch.Elapsed.TotalMilliseconds));
+            }
+
+            int end = response.LastIndexOf('}');
+            string body = response.Substring(0, end);
+            if (body.TrimEnd().EndsWith("{"))
+            {
+                tags.Remove(0, 1);  // empty object: no leading comma
+            }
+            return body + tags.ToString() + response.Substring(end);
+        }
+
+        private string Batch(JObject command)
+        {
+            try
+            {
+                JArray operations = command["operations"] as JArray ?? new JArray();
+                JArray results = new JArray();
+                Dictionary<string, string> refs = new Dictionary<string, string>();
+                bool stopOnError = command["stop_on_error"]?.ToObject<bool>() ?? true;
+                bool allSucceeded = true;
+                bool documentChanged = false;
+
+                foreach (JToken token in operations)
+                {
+                    JObject operation = token as JObject;
+                    if (!allSucceeded && stopOnError)
+                    {
+                        results.Add(JObject.FromObject(new { success = false, error = "Skipped after earlier failure" }));
+                        continue;
+                    }
+
+                    string result;
+                    string operationType = operation?["command"]?.ToString();
+                    switch (operationType)
+                    {
+                        case "create_component":
+                            result = CreateComponent(operation, false);
+                            break;
+                        case "connect_parameters":
+                            // Endpoints created earlier in this batch are addressed by ref
+                            ResolveRef(operation, refs, "source");
+                            ResolveRef(operation, refs, "target");
+                            result = ConnectParameters(operation);
+                            break;
+                        case "disconnect_parameters":
+                            result = DisconnectParameters(operation);
+                            break;
+                        case "remove_component":
+                            result = RemoveComponent(operation, false);
+                            break;
+                        case "set_parameters":
+                            result = SetParameters(operation, false);
+                            break;
+                        case "clear_canvas":
+                            refs.Clear();
+                            result = ClearCanvas(false);
+                            break;
+                        default:
+                            result = JsonConvert.SerializeObject(new { success = false, error = "Unknown command: " + operationType });
+                            break;
+                    }
+
+                    JObject parsed = JObject.Parse(result);
+                    bool succeeded = parsed["success"]?.ToObject<bool>() ?? false;
+                    if (succeeded && operationType != "connect_parameters" && operationType != "disconnect_parameters")
+                    {
+                        documentChanged = true;
+                    }
+                    if (succeeded && operationType == "create_component" && operation["ref"] != null)
+                    {
+                        refs[operation["ref"].ToString()] = parsed["component_guid"]?.ToString();
+                    }
+                    allSucceeded &= succeeded;
+                    results.Add(parsed);
+                }
+
+                // One recompute for the whole batch instead of one per operation
+                if (documentChanged)
+                {
+                    OnPingDocument().NewSolution(false);
+                }
+
+                return JsonConvert.SerializeObject(new { success = allSucceeded, results = results });
+            }
             catch (Exception ex)
             {
                 return JsonConvert.SerializeObject(new { success = false, error = ex.Message });
             }
         }
 
-        private string CreateComponent(JObject command)
+        private void ResolveRef(JObject operation, Dictionary<string, string> refs, string end)
+        {
+            string reference = operation[end + "_ref"]?.ToString();
+            if (reference != null && refs.ContainsKey(reference))
+            {
+                operation[end + "_component_guid"] = refs[reference];
+            }
+        }
+
+        private string CreateComponent(JObject command, bool solve = true)
         {
             try
             {
@@ -233,7 +422,10 @@ namespace GrasshopperMCP
                     _createdComponents[componentGuid] = newComponent;
 
                     // Trigger solution
-                    OnPingDocument().NewSolution(false);
+                    if (solve)
+                    {
+                        OnPingDocument().NewSolution(false);
+                    }
 
                     return JsonConvert.SerializeObject(new 
                     { 
@@ -340,7 +532,105 @@ namespace GrasshopperMCP
             }
         }
 
-        private string ClearCanvas()
+        private string DisconnectParameters(JObject command)
+        {
+            try
+            {
+                string sourceGuid = command["source_component_guid"]?.ToString();
+                string targetGuid = command["target_component_guid"]?.ToString();
+                string sourceParam = command["source_parameter_name"]?.ToString();
+                string targetParam = command["target_parameter_name"]?.ToString();
+
+                if (_createdComponents.ContainsKey(sourceGuid) && _createdComponents.ContainsKey(targetGuid))
+                {
+                    // Placeholder, like ConnectParameters: no wires exist between the stand-in objects
+
+                    return JsonConvert.SerializeObject(new 
+                    { 
+                        success = true, 
+                        message = $"Disconnected {sourceParam} from {targetParam}"
+                    });
+                }
+                else
+                {
+                    return JsonConvert.SerializeObject(new { success = false, error = "Component not found" });
+                }
+            }
+            catch (Exception ex)
+            {
+                return JsonConvert.SerializeObject(new { success = false, error = ex.Message });
+            }
+        }
+
+        private string RemoveComponent(JObject command, bool solve = true)
+        {
+            try
+            {
+                string componentGuid = command["component_guid"]?.ToString();
+                if (componentGuid == null || !_createdComponents.ContainsKey(componentGuid))
+                {
+                    return JsonConvert.SerializeObject(new { success = false, error = "Component not found" });
+                }
+
+                // Removing the object also removes its wires
+                OnPingDocument().RemoveObject(_createdComponents[componentGuid], false);
+                _createdComponents.Remove(componentGuid);
+
+                if (solve)
+                {
+                    OnPingDocument().NewSolution(false);
+                }
+
+                return JsonConvert.SerializeObject(new { success = true, message = "Component removed" });
+            }
+            catch (Exception ex)
+            {
+                return JsonConvert.SerializeObject(new { success = false, error = ex.Message });
+            }
+        }
+
+        private string SetParameters(JObject command, bool solve = true)
+        {
+            try
+            {
+                string componentGuid = command["component_guid"]?.ToString();
+                JObject parameters = command["parameters"] as JObject ?? new JObject();
+                if (componentGuid == null || !_createdComponents.ContainsKey(componentGuid))
+                {
+                    return JsonConvert.SerializeObject(new { success = false, error = "Component not found" });
+                }
+
+                // Update the placeholder objects made by the Create*Component methods in place
+                IGH_DocumentObject component = _createdComponents[componentGuid];
+                GH_NumberSlider slider = component as GH_NumberSlider;
+                GH_Panel panel = component as GH_Panel;
+                if (slider != null && parameters["Radius"] != null)
+                {
+                    slider.Slider.Value = (decimal)parameters["Radius"].ToObject<double>();
+                }
+                else if (panel != null && panel.NickName == "Point")
+                {
+                    double x = parameters["X"]?.ToObject<double>() ?? 0.0;
+                    double y = parameters["Y"]?.ToObject<double>() ?? 0.0;
+                    double z = parameters["Z"]?.ToObject<double>() ?? 0.0;
+                    panel.UserText = $"Point({x},{y},{z})";
+                }
+                (component as IGH_ActiveObject)?.ExpireSolution(false);
+
+                if (solve)
+                {
+                    OnPingDocument().NewSolution(false);
+                }
+
+                return JsonConvert.SerializeObject(new { success = true, message = "Parameters updated" });
+            }
+            catch (Exception ex)
+            {
+                return JsonConvert.SerializeObject(new { success = false, error = ex.Message });
+            }
+        }
+
+        private string ClearCanvas(bool solve = true)
         {
             try
             {
@@ -352,7 +642,10 @@ namespace GrasshopperMCP
                 _createdComponents.Clear();
 
                 // Trigger solution
-                OnPingDocument().NewSolution(false);
+                if (solve)
+                {
+                    OnPingDocument().NewSolution(false);
+                }
 
                 return JsonConvert.SerializeObject(new { success = true, message = "Canvas cleared" });
             }
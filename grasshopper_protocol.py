@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Wire protocol for the Grasshopper MCP Component
+Newline-delimited JSON frames over a TCP stream
+"""
+
+import json
+from typing import Dict, Any
+
+FRAME_DELIMITER = b'\n'
+DEFAULT_READ_SIZE = 64 * 1024
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+class ProtocolError(Exception):
+    """Raised when the byte stream does not contain a valid frame"""
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    """Encode a message as a single frame.
+
+    ``json.dumps`` escapes control characters inside strings, so the encoded
+    body never contains a raw newline and the delimiter is unambiguous.
+    """
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + FRAME_DELIMITER
+
+def decode_frame(frame: bytes) -> Dict[str, Any]:
+    """Decode a frame body (without its delimiter) into a message"""
+    try:
+        message = json.loads(frame)
+    except ValueError as e:
+        raise ProtocolError(f"Invalid JSON frame: {e}") from e
+    if not isinstance(message, dict):
+        raise ProtocolError("Frame does not contain a JSON object")
+    return message
+
+class FrameReader:
+    """Streaming frame reader with a reusable receive buffer
+
+    Data is received with ``recv_into`` straight into a ``bytearray`` that
+    grows geometrically and is compacted in place, so reading a frame of n
+    bytes costs O(n) regardless of how many ``recv`` calls it takes. The
+    delimiter search resumes where the previous one stopped, and any bytes
+    received after the end of a frame stay buffered for the next call. Once
+    a large frame has been consumed the buffer goes back to ``read_size``,
+    so one big response does not pin its memory for the connection's life.
+    """
+
+    def __init__(self, sock, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 read_size: int = DEFAULT_READ_SIZE):
+        self._sock = sock
+        self.max_frame_size = max_frame_size
+        self.read_size = read_size
+        self._buffer = bytearray(read_size)
+        self._start = 0  # first unconsumed byte
+        self._end = 0    # one past the last received byte
+        self._scan = 0   # no delimiter in [_start, _scan)
+
+    @property
+    def buffered(self) -> int:
+        """Number of received bytes not yet returned as part of a frame"""
+        return self._end - self._start
+
+    def read_frame(self) -> bytes:
+        """Block until a complete frame is available and return its body.
+
+        Raises ``ConnectionError`` if the peer closes the connection before
+        the delimiter arrives and ``ProtocolError`` if the frame exceeds
+        ``max_frame_size``.
+        """
+        while True:
+            index = self._buffer.find(FRAME_DELIMITER, self._scan, self._end)
+            if index >= 0:
+                if index - self._start > self.max_frame_size:
+                    raise ProtocolError(f"Frame exceeds {self.max_frame_size} bytes")
+                frame = bytes(self._buffer[self._start:index])
+                self._start = self._scan = index + 1
+                if self._start == self._end:
+                    self._start = self._end = self._scan = 0
+                    if len(self._buffer) > self.read_size:
+                        self._buffer = bytearray(self.read_size)
+                return frame
+
+            self._scan = self._end
+            if self._end - self._start > self.max_frame_size:
+                raise ProtocolError(f"Frame exceeds {self.max_frame_size} bytes")
+            self._fill()
+
+    def read_message(self) -> Dict[str, Any]:
+        """Read and decode the next frame"""
+        return decode_frame(self.read_frame())
+
+    def _fill(self):
+        """Receive more data into the free tail of the buffer"""
+        if len(self._buffer) - self._end < self.read_size:
+            self._make_room()
+
+        with memoryview(self._buffer) as view:
+            with view[self._end:] as tail:
+                received = self._sock.recv_into(tail)
+        if received == 0:
+            raise ConnectionError(
+                "Connection closed by Grasshopper before a complete response was received"
+            )
+        self._end += received
+
+    def _make_room(self):
+        pending = self._end - self._start
+        if self._start:
+            # Slide the partial frame to the front of the buffer
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        if len(self._buffer) - self._end < self.read_size:
+            # Doubling keeps the total copy cost linear in the frame size
+            self._buffer.extend(bytes(max(len(self._buffer), self.read_size)))
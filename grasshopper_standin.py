@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Grasshopper Stand-in Server
+A Python TCP server that speaks the Grasshopper MCP Component protocol,
+for running and load-testing the MCP Server without Rhino
+"""
+
+import argparse
+import logging
+import random
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+
+from grasshopper_protocol import DEFAULT_MAX_FRAME_SIZE, FrameReader, ProtocolError, decode_frame, encode_frame
+
+logger = logging.getLogger(__name__)
+
+# Component types GH_MCPComponent.CreateComponent knows how to build
+SUPPORTED_COMPONENTS = frozenset({"GH_Circle", "GH_Point", "GH_Line"})
+
+@dataclass
+class CommandProfile:
+    """Simulated cost and unreliability of a command type"""
+    latency: float = 0.0          # seconds added to every command
+    jitter: float = 0.0           # up to this many seconds more, uniformly distributed
+    failure_rate: float = 0.0     # probability of an error response without touching the canvas
+    disconnect_rate: float = 0.0  # probability of dropping the connection instead of responding
+
+class InjectedDisconnect(Exception):
+    """Raised by ``process_command`` when the connection should be dropped"""
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Reads command frames from one client connection"""
+
+    def handle(self):
+        standin: "GrasshopperStandIn" = self.server.standin
+        reader = FrameReader(self.request, standin.max_frame_size)
+        write_lock = threading.Lock()
+
+        def reply(command: Dict[str, Any]) -> bool:
+            """Send the response to ``command``; False once the connection is unusable"""
+            try:
+                response = encode_frame(standin.process_command(command))
+            except InjectedDisconnect:
+                try:
+                    self.request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return False
+            with write_lock:
+                try:
+                    self.request.sendall(response)
+                except OSError:
+                    return False
+            return True
+
+        # Mirrors HandleClientComm in the C# bridge: a failed read or an
+        # untagged response that cannot be written closes the connection,
+        # while a line that is not JSON gets an error response.
+        while True:
+            try:
+                frame = reader.read_frame()
+            except (ProtocolError, ConnectionError, OSError):
+                # An oversized frame leaves the stream out of sync, so it ends the connection too
+                break
+            if not frame.strip():
+                continue
+            try:
+                command = decode_frame(frame)
+            except ProtocolError as e:
+                if not reply({"command": None, "_error": str(e)}):
+                    break
+                continue
+
+            # Same rule as the C# bridge: tagged commands may complete out of order
+            if "request_id" in command:
+                standin.executor.submit(reply, command)
+            elif not reply(command):
+                break
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class GrasshopperStandIn:
+    """In-memory stand-in for GH_MCPComponent
+
+    ``profile`` applies to every command and ``command_profiles`` overrides
+    it per command type (``create_component``, ``batch``, ...). Latency is
+    spent while holding the document lock, as the real component solves on
+    Rhino's single UI thread, so concurrent commands queue up behind each
+    other just as they would in Grasshopper. Pass ``seed`` for repeatable
+    jitter and fault injection. A frame longer than ``max_frame_size``
+    closes the connection, as a failed read does in the bridge.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 8888, workers: int = 8,
+                 supported_components: Optional[Iterable[str]] = SUPPORTED_COMPONENTS,
+                 profile: Optional[CommandProfile] = None,
+                 command_profiles: Optional[Dict[str, CommandProfile]] = None,
+                 seed: Optional[int] = None, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE):
+        self.host = host
+        self.port = port
+        self.max_frame_size = max_frame_size
+        self.supported_components = (
+            frozenset(supported_components) if supported_components is not None else None
+        )
+        self.profile = profile or CommandProfile()
+        self.command_profiles = dict(command_profiles or {})
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="standin")
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.connections: List[Tuple[str, str, str, str]] = []  # (source guid, param, target guid, param)
+        self._document_lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._counters = {"commands": 0, "injected_failures": 0, "injected_disconnects": 0}
+        self._server: Optional[_ThreadingServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Bound (host, port); the port is resolved when started with port 0"""
+        if self._server is None:
+            return self.host, self.port
+        return self._server.server_address[:2]
+
+    def start(self) -> Tuple[str, int]:
+        """Start serving on a background thread and return the bound address"""
+        self._server = _ThreadingServer((self.host, self.port), _ConnectionHandler)
+        self._server.standin = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        logger.info(f"Grasshopper stand-in listening on {self.address[0]}:{self.address[1]}")
+        return self.address
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.executor.shutdown(wait=False)
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """Commands processed, faults injected and current canvas size"""
+        with self._random_lock:
+            stats = dict(self._counters)
+        stats["components"] = len(self.components)
+        stats["connections"] = len(self.connections)
+        return stats
+
+    def process_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one command and return its response, mirroring ProcessCommand"""
+        started = time.perf_counter()
+        response = self._dispatch(command)
+        if "request_id" in command:
+            response["request_id"] = command["request_id"]
+        if "trace_id" in command:
+            response["trace_id"] = command["trace_id"]
+            response["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return response
+
+    def _draw_faults(self, command_type: Optional[str]) -> Tuple[float, bool, bool]:
+        """Pick (delay, fail, disconnect) for one command from its profile"""
+        profile = self.command_profiles.get(command_type, self.profile)
+        with self._random_lock:
+            self._counters["commands"] += 1
+            delay = profile.latency + (self._random.uniform(0.0, profile.jitter) if profile.jitter else 0.0)
+            disconnect = profile.disconnect_rate > 0 and self._random.random() < profile.disconnect_rate
+            fail = not disconnect and profile.failure_rate > 0 and self._random.random() < profile.failure_rate
+            if disconnect:
+                self._counters["injected_disconnects"] += 1
+            elif fail:
+                self._counters["injected_failures"] += 1
+        return delay, fail, disconnect
+
+    def _dispatch(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        if "_error" in command:
+            return {"success": False, "error": command["_error"]}
+
+        command_type = command.get("command")
+        delay, fail, disconnect = self._draw_faults(command_type)
+        if disconnect:
+            raise InjectedDisconnect(command_type)
+
+        if command_type == "ping":
+            if delay:
+                time.sleep(delay)
+            return {"success": True, "message": "pong"} if not fail else self._injected_failure(command_type)
+
+        with self._document_lock:
+            if delay:
+                time.sleep(delay)
+            if fail:
+                return self._injected_failure(command_type)
+            if command_type == "create_component":
+                return self._create_component(command)
+            elif command_type == "connect_parameters":
+                return self._connect_parameters(command)
+            elif command_type == "disconnect_parameters":
+                return self._disconnect_parameters(command)
+            elif command_type == "remove_component":
+                return self._remove_component(command)
+            elif command_type == "set_parameters":
+                return self._set_parameters(command)
+            elif command_type == "clear_canvas":
+                return self._clear_canvas()
+            elif command_type == "batch":
+                return self._batch(command)
+            else:
+                return {"success": False, "error": f"Unknown command: {command_type}"}
+
+    @staticmethod
+    def _injected_failure(command_type: Optional[str]) -> Dict[str, Any]:
+        return {"success": False, "error": f"Injected failure in {command_type}"}
+
+    def _batch(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        refs: Dict[str, str] = {}
+        results = []
+        stop_on_error = command.get("stop_on_error", True)
+        all_succeeded = True
+
+        for operation in command.get("operations") or []:
+            if not all_succeeded and stop_on_error:
+                results.append({"success": False, "error": "Skipped after earlier failure"})
+                continue
+
+            operation_type = operation.get("command")
+            if operation_type == "create_component":
+                result = self._create_component(operation)
+                if result["success"] and operation.get("ref") is not None:
+                    refs[operation["ref"]] = result["component_guid"]
+            elif operation_type == "connect_parameters":
+                operation = dict(operation)
+                for end in ("source", "target"):
+                    reference = operation.get(f"{end}_ref")
+                    if reference in refs:
+                        operation[f"{end}_component_guid"] = refs[reference]
+                result = self._connect_parameters(operation)
+            elif operation_type == "disconnect_parameters":
+                result = self._disconnect_parameters(operation)
+            elif operation_type == "remove_component":
+                result = self._remove_component(operation)
+            elif operation_type == "set_parameters":
+                result = self._set_parameters(operation)
+            elif operation_type == "clear_canvas":
+                refs.clear()
+                result = self._clear_canvas()
+            else:
+                result = {"success": False, "error": f"Unknown command: {operation_type}"}
+
+            all_succeeded &= bool(result.get("success"))
+            results.append(result)
+
+        return {"success": all_succeeded, "results": results}
+
+    def _create_component(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        component_name = command.get("component_name")
+        if self.supported_components is not None and component_name not in self.supported_components:
+            return {"success": False, "error": f"Unsupported component: {component_name}"}
+
+        component_guid = str(uuid.uuid4())
+        self.components[component_guid] = {
+            "component_name": component_name,
+            "parameters": dict(command.get("parameters") or {})
+        }
+        return {
+            "success": True,
+            "component_guid": component_guid,
+            "component_name": component_name,
+            "message": "Component created successfully"
+        }
+
+    def _connect_parameters(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        source_guid = command.get("source_component_guid")
+        target_guid = command.get("target_component_guid")
+        if source_guid not in self.components or target_guid not in self.components:
+            return {"success": False, "error": "Component not found"}
+        self.connections.append((
+            source_guid, command.get("source_parameter_name"),
+            target_guid, command.get("target_parameter_name")
+        ))
+        return {
+            "success": True,
+            "message": f"Connected {command.get('source_parameter_name')} to {command.get('target_parameter_name')}"
+        }
+
+    def _disconnect_parameters(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        connection = (
+            command.get("source_component_guid"), command.get("source_parameter_name"),
+            command.get("target_component_guid"), command.get("target_parameter_name")
+        )
+        if connection not in self.connections:
+            return {"success": False, "error": "Connection not found"}
+        self.connections.remove(connection)
+        return {
+            "success": True,
+            "message": f"Disconnected {command.get('source_parameter_name')} from {command.get('target_parameter_name')}"
+        }
+
+    def _remove_component(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        component_guid = command.get("component_guid")
+        if self.components.pop(component_guid, None) is None:
+            return {"success": False, "error": "Component not found"}
+        # Removing a component drops its wires, as in Grasshopper
+        self.connections = [c for c in self.connections if component_guid not in (c[0], c[2])]
+        return {"success": True, "message": "Component removed"}
+
+    def _set_parameters(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        component = self.components.get(command.get("component_guid"))
+        if component is None:
+            return {"success": False, "error": "Component not found"}
+        component["parameters"].update(command.get("parameters") or {})
+        return {"success": True, "message": "Parameters updated"}
+
+    def _clear_canvas(self) -> Dict[str, Any]:
+        self.components.clear()
+        self.connections.clear()
+        return {"success": True, "message": "Canvas cleared"}
+
+def main():
+    """Run the stand-in server from the command line"""
+    parser = argparse.ArgumentParser(description="Grasshopper MCP Component stand-in server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--workers", type=int, default=8, help="threads for pipelined commands")
+    parser.add_argument("--accept-all", action="store_true",
+                        help="accept every component type instead of only those the C# bridge supports")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every command")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per command")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of an injected error response")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0,
+                        help="probability of dropping the connection instead of responding")
+    parser.add_argument("--command-latency", action="append", default=[], metavar="COMMAND=SECONDS",
+                        help="latency for one command type, e.g. create_component=0.05; repeatable")
+    parser.add_argument("--seed", type=int, help="random seed for jitter and fault injection")
+    args = parser.parse_args()
+
+    profile = CommandProfile(args.latency, args.jitter, args.failure_rate, args.disconnect_rate)
+    command_profiles = {}
+    for entry in args.command_latency:
+        command_type, _, seconds = entry.partition("=")
+        command_profiles[command_type] = CommandProfile(
+            float(seconds), args.jitter, args.failure_rate, args.disconnect_rate
+        )
+
+    logging.basicConfig(level=logging.INFO)
+    standin = GrasshopperStandIn(
+        args.host, args.port, workers=args.workers,
+        supported_components=None if args.accept_all else SUPPORTED_COMPONENTS,
+        profile=profile, command_profiles=command_profiles, seed=args.seed
+    )
+    standin.serve_forever()
+
+if __name__ == "__main__":
+    main()
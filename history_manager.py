@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Conversation History Manager for Grasshopper MCP Server
+Keeps the LLM chat history within a prompt token budget
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in English text and JSON
+CHARS_PER_TOKEN = 4
+
+# Per-message framing added by chat templates (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Keys of a tool result that are worth keeping once the result is old
+RESULT_SUMMARY_KEYS = ("success", "error", "component_guid")
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text`` without a tokenizer"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class HistoryManager:
+    """Compacts a chat history in place to fit a token budget
+
+    The leading system prompt is always kept. When the history is over
+    budget, tool results older than the last ``keep_turns`` turns are first
+    reduced to their essential fields; if that is not enough, whole turns
+    (a user message and everything up to the next one) are dropped from the
+    start. What dropped turns did to the canvas is kept as short notes in a
+    system message after the prompt, so the model still knows which
+    components exist. The latest turn is never dropped.
+    """
+
+    def __init__(self, max_tokens: int = 4096, keep_turns: int = 2, max_notes: int = 50,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.max_notes = max_notes
+        self.token_counter = token_counter
+        self.canvas_notes: List[str] = []
+        self._notes_message: Optional[Dict[str, Any]] = None
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        """Estimated prompt tokens for one message"""
+        text = message.get("content") or ""
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function") or {}
+            text += (function.get("name") or "") + (function.get("arguments") or "")
+        return self.token_counter(text) + MESSAGE_OVERHEAD_TOKENS
+
+    def count_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Estimated prompt tokens for a list of messages"""
+        return sum(self.message_tokens(message) for message in messages)
+
+    def compact(self, messages: List[Dict[str, Any]]) -> int:
+        """Compact ``messages`` in place; returns the estimated token count afterwards"""
+        total = self.count_tokens(messages)
+        if total <= self.max_tokens:
+            return total
+        before = total
+
+        turns = self._turn_starts(messages)
+        recent = turns[-self.keep_turns] if len(turns) >= self.keep_turns else len(messages)
+        first = turns[0] if turns else len(messages)
+        for index in range(first, recent):
+            message = messages[index]
+            if message.get("role") == "tool":
+                total -= self.message_tokens(message)
+                message["content"] = self._summarize_result(message.get("content"))
+                total += self.message_tokens(message)
+
+        dropped_turns = 0
+        while total > self.max_tokens and len(turns) > 1:
+            start, end = turns[0], turns[1]
+            dropped = messages[start:end]
+            del messages[start:end]
+            self._record_canvas_changes(dropped)
+            dropped_turns += 1
+            self._update_notes_message(messages)
+            total = self.count_tokens(messages)
+            turns = self._turn_starts(messages)
+
+        logger.info(f"Compacted conversation history from ~{before} to ~{total} tokens "
+                    f"({dropped_turns} turns summarized)")
+        return total
+
+    @staticmethod
+    def _turn_starts(messages: List[Dict[str, Any]]) -> List[int]:
+        return [index for index, message in enumerate(messages) if message.get("role") == "user"]
+
+    @staticmethod
+    def _summarize_result(content: Optional[str]) -> str:
+        try:
+            result = json.loads(content or "")
+        except ValueError:
+            return content or ""
+        if not isinstance(result, dict):
+            return content
+        return json.dumps({key: result[key] for key in RESULT_SUMMARY_KEYS if key in result},
+                          separators=(',', ':'))
+
+    def _record_canvas_changes(self, messages: List[Dict[str, Any]]):
+        """Turn the successful tool calls in ``messages`` into canvas notes"""
+        results: Dict[str, Dict[str, Any]] = {}
+        for message in messages:
+            if message.get("role") == "tool":
+                try:
+                    result = json.loads(message.get("content") or "")
+                except ValueError:
+                    continue
+                if isinstance(result, dict):
+                    results[message.get("tool_call_id")] = result
+
+        for message in messages:
+            for tool_call in message.get("tool_calls") or []:
+                if not results.get(tool_call.get("id"), {}).get("success"):
+                    continue
+                function = tool_call.get("function") or {}
+                try:
+                    arguments = json.loads(function.get("arguments") or "{}")
+                except ValueError:
+                    continue
+                self._add_note(function.get("name"), arguments if isinstance(arguments, dict) else {})
+
+        del self.canvas_notes[:-self.max_notes]
+
+    def _add_note(self, function_name: Optional[str], arguments: Dict[str, Any]):
+        if function_name == "create_grasshopper_component":
+            self.canvas_notes.append("- created " + self._component_note(
+                arguments.get("component_name"), arguments.get("alias"), arguments.get("parameters")
+            ))
+        elif function_name == "connect_grasshopper_components":
+            self.canvas_notes.append(
+                f"- connected {arguments.get('source_component')}.{arguments.get('source_param')} -> "
+                f"{arguments.get('target_component')}.{arguments.get('target_param')}"
+            )
+        elif function_name == "clear_grasshopper_canvas":
+            self.canvas_notes = ["- cleared the canvas"]
+        elif function_name == "sync_grasshopper_canvas":
+            # A sync replaces the whole canvas, so it supersedes every earlier note
+            nodes = [node for node in arguments.get("nodes") or [] if isinstance(node, dict)]
+            edges = [edge for edge in arguments.get("edges") or [] if isinstance(edge, dict)]
+            self.canvas_notes = ["- synced the canvas to this definition:"]
+            self.canvas_notes.extend(
+                "  - " + self._component_note(node.get("component"), node.get("id"), node.get("parameters"))
+                for node in nodes
+            )
+            self.canvas_notes.extend(
+                f"  - {edge.get('source')}.{edge.get('source_param')} -> {edge.get('target')}.{edge.get('target_param')}"
+                for edge in edges
+            )
+        elif function_name:
+            self.canvas_notes.append(f"- called {function_name}")
+
+    @staticmethod
+    def _component_note(component_name: Optional[str], alias: Optional[str], parameters: Any) -> str:
+        values = ", ".join(f"{name}={value}" for name, value in parameters.items()) if isinstance(parameters, dict) else ""
+        return (f"{component_name}" + (f" as {alias}" if alias else "")
+                + (f" ({values})" if values else ""))
+
+    def _update_notes_message(self, messages: List[Dict[str, Any]]):
+        """Keep the canvas notes in a system message right after the system prompt"""
+        if not self.canvas_notes:
+            return
+        content = "Canvas changes from earlier in this conversation:\n" + "\n".join(self.canvas_notes)
+        if self._notes_message is None or not any(message is self._notes_message for message in messages):
+            self._notes_message = {"role": "system", "content": content}
+            messages.insert(1 if messages and messages[0].get("role") == "system" else 0, self._notes_message)
+        else:
+            self._notes_message["content"] = content
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Idempotency Keys for Grasshopper MCP Server
+Recent request keys and their responses, so a resent request runs only once
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+
+# HTTP header carrying the key; a JSON body may send it as "idempotency_key" instead
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+class IdempotencyKeyReused(ValueError):
+    """A key was sent again with a different request"""
+
+class _Entry(NamedTuple):
+    created: float
+    fingerprint: str
+    result: Future  # resolves to (payload, status)
+
+class IdempotencyStore:
+    """Bounded table of recent idempotency keys and the responses they produced
+
+    The first request with a key claims it and runs; a repeat that arrives
+    while it is running waits for its result, and one that arrives later is
+    answered from the table. Only successful responses are kept, so a
+    failed request can be retried with the same key. Entries expire
+    ``ttl`` seconds after they were claimed, and the oldest are evicted
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # claim order, so oldest first
+        self._lock = threading.Lock()
+        self._counters = {"claims": 0, "replays": 0, "conflicts": 0}
+
+    @staticmethod
+    def fingerprint(operation: str, data: Dict[str, Any]) -> str:
+        """Content hash of a request, to tell a resend from a different request under the same key"""
+        encoded = json.dumps([operation, data], sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[Future, bool]:
+        """Look up ``key``, claiming it if it is new
+
+        Returns the future of the key's result and whether the caller owns
+        it; an owner must ``finish`` or ``abandon`` the key. Raises
+        ``IdempotencyKeyReused`` if the key belongs to a different request.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    self._counters["conflicts"] += 1
+                    raise IdempotencyKeyReused(f"Idempotency key {key!r} was already used for a different request")
+                self._counters["replays"] += 1
+                return entry.result, False
+
+            result: Future = Future()
+            result.set_running_or_notify_cancel()
+            self._entries[key] = _Entry(now, fingerprint, result)
+            self._counters["claims"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return result, True
+
+    def finish(self, key: str, result: Future, payload: Dict[str, Any], status: int):
+        """Publish the owner's response to waiting repeats, remembering it if it succeeded"""
+        if status >= 400 or payload.get("success") is False:
+            self._forget(key, result)
+        result.set_result((copy.deepcopy(payload), status))
+
+    def abandon(self, key: str, result: Future, error: BaseException):
+        """Forget a key whose request did not complete, failing any repeats waiting on it"""
+        self._forget(key, result)
+        if not result.done():
+            result.set_exception(error)
+
+    @staticmethod
+    def replay(result: Future) -> Tuple[Dict[str, Any], int]:
+        """Copy of a resolved result, safe for the caller to modify"""
+        payload, status = result.result()
+        return copy.deepcopy(payload), status
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Claim/replay/conflict counters and the number of remembered keys"""
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+    def _forget(self, key: str, result: Future):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.result is result:
+                del self._entries[key]
+
+    def _evict_expired(self, now: float):
+        if self.ttl is None:
+            return
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if now - entry.created <= self.ttl:
+                break
+            self._entries.popitem(last=False)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Job Queue for Grasshopper MCP Server
+Runs long operations on worker threads so clients submit them and poll for the result
+"""
+
+import contextvars
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Runs (operation, data, cancel event) and returns (payload, HTTP status)
+Runner = Callable[[str, Dict[str, Any], threading.Event], Tuple[Dict[str, Any], int]]
+
+class JobQueueFull(RuntimeError):
+    """The queue already holds ``max_queued`` jobs waiting for a worker"""
+
+@dataclass
+class Job:
+    """One submitted operation and, once finished, its response"""
+    job_id: str
+    operation: str
+    data: Dict[str, Any]
+    submitted: float                     # wall clock, seconds since the epoch
+    state: str = QUEUED
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    http_status: Optional[int] = None
+    cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        job = {
+            "job_id": self.job_id,
+            "operation": self.operation,
+            "state": self.state,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "cancel_requested": self.cancel.is_set()
+        }
+        if include_result:
+            job["result"] = self.result
+            job["http_status"] = self.http_status
+        return job
+
+class JobQueue:
+    """Worker pool running submitted operations, with status, cancellation and retention limits
+
+    At most ``max_queued`` jobs wait for one of ``workers`` threads; further
+    submissions raise ``JobQueueFull``. Finished jobs and their results are
+    kept for ``retention`` seconds, and only the newest ``max_jobs`` of them.
+
+    A queued job is cancelled at once. A running job is asked to stop
+    through its ``cancel`` event, which the runner checks between
+    Grasshopper commands; a command already sent still completes.
+    """
+
+    def __init__(self, runner: Runner, workers: int = 4, max_queued: int = 100,
+                 max_jobs: int = 1000, retention: Optional[float] = 3600.0):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self.retention = retention
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()  # submission order
+        self._lock = threading.Lock()
+        self._counts = {QUEUED: 0, RUNNING: 0}
+        self._totals = {"submitted": 0, SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    def submit(self, operation: str, data: Dict[str, Any]) -> Job:
+        """Queue an operation; it inherits the caller's trace"""
+        with self._lock:
+            if self._counts[QUEUED] >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+            self._evict_locked(time.time())
+            job = Job(secrets.token_hex(8), operation, data, time.time())
+            self._jobs[job.job_id] = job
+            self._counts[QUEUED] += 1
+            self._totals["submitted"] += 1
+            job.future = self._executor.submit(contextvars.copy_context().run, self._execute, job)
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """Retained jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job or ask a running one to stop; returns the job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return job
+            job.cancel.set()
+            if job.state == QUEUED:
+                self._finish_locked(job, CANCELLED, {"success": False, "error": "Cancelled"}, 409)
+                job.future.cancel()
+            return job
+
+    def stats(self) -> Dict[str, int]:
+        """Queued and running jobs, retained jobs and lifetime totals"""
+        with self._lock:
+            return dict(self._totals, queued=self._counts[QUEUED], running=self._counts[RUNNING],
+                        retained=len(self._jobs))
+
+    def close(self):
+        """Cancel queued jobs and stop the workers once running jobs finish"""
+        for job in self.jobs():
+            if job.state == QUEUED:
+                self.cancel(job.job_id)
+        self._executor.shutdown(wait=False)
+
+    def _execute(self, job: Job):
+        with self._lock:
+            if job.state != QUEUED:
+                return
+            job.state = RUNNING
+            job.started = time.time()
+            self._counts[QUEUED] -= 1
+            self._counts[RUNNING] += 1
+
+        try:
+            payload, status = self.runner(job.operation, job.data, job.cancel)
+        except Exception as e:
+            payload, status = {"success": False, "error": str(e)}, 500
+
+        if status < 400 and payload.get("success", True):
+            state = SUCCEEDED
+        elif job.cancel.is_set():
+            state = CANCELLED
+        else:
+            state = FAILED
+        with self._lock:
+            self._finish_locked(job, state, payload, status)
+
+    def _finish_locked(self, job: Job, state: str, payload: Dict[str, Any], status: int):
+        self._counts[job.state] -= 1
+        job.state = state
+        job.finished = time.time()
+        job.result = payload
+        job.http_status = status
+        self._totals[state] += 1
+
+    def _evict_locked(self, now: float):
+        """Drop finished jobs past the retention time or beyond ``max_jobs``"""
+        excess = len(self._jobs) - self.max_jobs + 1  # room for the job being submitted
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is None:
+                continue
+            if excess > 0 or (self.retention is not None and now - job.finished > self.retention):
+                del self._jobs[job_id]
+                excess -= 1
@@ -4,23 +4,134 @@ LM Studio Client for Grasshopper MCP Server
 Handles communication with LM Studio API
 """
 
+import contextvars
 import json
 import logging
+import threading
+import time
+import uuid
 import requests
-from typing import Dict, Any, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Iterable, Iterator, Tuple, Callable
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from completion_cache import CompletionCache
+from component_factory import ComponentFactory
+from history_manager import HistoryManager
+from idempotency import IDEMPOTENCY_HEADER
+from metrics import REGISTRY, MetricsRegistry
+from tracing import TRACER, Tracer, trace_headers
+
+if TYPE_CHECKING:  # only needed for the in-process transport
+    from mcp_server import MCPServer
 
 logger = logging.getLogger(__name__)
 
+# Transient upstream statuses worth retrying
+RETRY_STATUSES = (502, 503, 504)
+
+# MCP operations that build whole definitions and may wait on a heavy Grasshopper solve;
+# HTTPTransport runs them as jobs. Single creates and connects stay plain requests and
+# only continue as a job when the request times out
+JOB_OPERATIONS = ("batch", "build_graph", "sync_canvas")
+
+# Generation throughput buckets, tokens per second
+TOKENS_PER_SECOND_BUCKETS = (1, 2.5, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+
+class StatusRetry(Retry):
+    """Retry that also retries ``status_forcelist`` responses for ``status_methods``
+    
+    Those methods are retried on connection failures and on the listed
+    statuses, but not on read errors, where the request may have run.
+    """
+    
+    def __init__(self, *args, status_methods: Iterable[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.status_methods = frozenset(method.upper() for method in status_methods)
+    
+    def new(self, **kw) -> "StatusRetry":
+        retry = super().new(**kw)
+        retry.status_methods = self.status_methods
+        return retry
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() in self.status_methods and status_code in (self.status_forcelist or ()):
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+def create_session(pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                   retry_methods: Optional[Iterable[str]] = None,
+                   status_methods: Iterable[str] = ()) -> requests.Session:
+    """Create a keep-alive HTTP session with a bounded connection pool and retries
+    
+    Failed connection attempts are retried for every method, since nothing
+    was sent. Read errors and 502/503/504 responses are retried only for
+    ``retry_methods`` (urllib3's idempotent defaults when not given), with
+    exponential backoff between attempts; ``status_methods`` are retried on
+    those statuses but not on read errors.
+    """
+    retry = StatusRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(retry_methods) if retry_methods is not None else Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+        status_methods=status_methods
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 class LMStudioClient:
     """Client for communicating with LM Studio API"""
     
-    def __init__(self, base_url: str = "http://localhost:1234", api_key: str = "lm-studio"):
+    def __init__(self, base_url: str = "http://localhost:1234", api_key: str = "lm-studio",
+                 pool_size: int = 4, max_retries: int = 3, backoff_factor: float = 0.5,
+                 temperature: float = 0.7, max_tokens: int = 1000, cache: Optional[CompletionCache] = None,
+                 metrics: Optional[MetricsRegistry] = None, tracer: Optional[Tracer] = None):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        # Inference is expensive and not idempotent: a read timeout may mean the completion
+        # is still running, so POSTs are retried only when LM Studio did not take them
+        self.session = create_session(pool_size, max_retries, backoff_factor, status_methods={"POST"})
+        self.session.headers.update(self.headers)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        # Optional; see CompletionCache for which requests it answers
+        self.cache = cache
+        
+        self.metrics = metrics or REGISTRY
+        self._request_duration = self.metrics.histogram(
+            "lmstudio_request_duration_seconds", "LM Studio completion latency", ("operation",)
+        )
+        self._time_to_first_token = self.metrics.histogram(
+            "lmstudio_time_to_first_token_seconds", "Delay before the first streamed token"
+        )
+        self._tokens_per_second = self.metrics.histogram(
+            "lmstudio_tokens_per_second", "Completion tokens generated per second", ("operation",),
+            buckets=TOKENS_PER_SECOND_BUCKETS
+        )
+        self._prompt_tokens = self.metrics.counter(
+            "lmstudio_prompt_tokens_total", "Prompt tokens sent to LM Studio"
+        )
+        self._completion_tokens = self.metrics.counter(
+            "lmstudio_completion_tokens_total", "Completion tokens received from LM Studio"
+        )
+        self._request_failures = self.metrics.counter(
+            "lmstudio_request_failures_total", "LM Studio requests that failed", ("operation",)
+        )
+        self.tracer = tracer or TRACER
         
         # Define available tools for Grasshopper operations
         self.tools = [
@@ -46,6 +157,10 @@ class LMStudioClient:
                                     "Z": {"type": "number", "description": "Z coordinate"},
                                     "Plane": {"type": "string", "description": "Plane (e.g., 'XY', 'XZ', 'YZ')"}
                                 }
+                            },
+                            "alias": {
+                                "type": "string",
+                                "description": "Optional unique name for this instance, to connect it later when there are several of the same component"
                             }
                         },
                         "required": ["component_name"]
@@ -62,7 +177,7 @@ class LMStudioClient:
                         "properties": {
                             "source_component": {
                                 "type": "string",
-                                "description": "Name of the source component"
+                                "description": "Alias of the source component, or its name for the latest one created"
                             },
                             "source_param": {
                                 "type": "string",
@@ -70,7 +185,7 @@ class LMStudioClient:
                             },
                             "target_component": {
                                 "type": "string",
-                                "description": "Name of the target component"
+                                "description": "Alias of the target component, or its name for the latest one created"
                             },
                             "target_param": {
                                 "type": "string",
@@ -91,41 +206,179 @@ class LMStudioClient:
                         "properties": {}
                     }
                 }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "sync_grasshopper_canvas",
+                    "description": "Make the canvas match a whole definition; only the differences from the current canvas are applied. Reuse node ids to edit existing components",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "nodes": {
+                                "type": "array",
+                                "description": "Components, e.g. {\"id\": \"c1\", \"component\": \"circle\", \"parameters\": {\"Radius\": 5}}",
+                                "items": {"type": "object"}
+                            },
+                            "edges": {
+                                "type": "array",
+                                "description": "Wires, e.g. {\"source\": \"p1\", \"source_param\": \"Point\", \"target\": \"l1\", \"target_param\": \"Start\"}",
+                                "items": {"type": "object"}
+                            }
+                        },
+                        "required": ["nodes"]
+                    }
+                }
             }
         ]
     
     def chat_completion(self, messages: List[Dict[str, str]], model: str = "gpt-oss-20b") -> Dict[str, Any]:
-        """Send a chat completion request to LM Studio"""
+        """Send a chat completion request to LM Studio, answering from the cache if possible"""
+        with self.tracer.span("lmstudio chat_completion") as span:
+            payload = self._completion_payload(messages, model)
+            cache_key = None
+            if self.cache is not None and self.cache.cacheable(payload):
+                cache_key = self.cache.key(payload)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span.attributes["cached"] = True
+                    return cached
+            
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/v1/chat/completions",
+                    json=payload,
+                    timeout=30
+                )
+                
+                response.raise_for_status()
+                result = response.json()
+                usage = result.get("usage") or {}
+                span.attributes.update(usage)
+                self._observe_completion("chat_completion", time.perf_counter() - start,
+                                         usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+                if cache_key is not None:
+                    self.cache.put(cache_key, result)
+                return result
+                
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error communicating with LM Studio: {e}")
+                self._request_failures.inc(operation="chat_completion")
+                return {"error": str(e)}
+    
+    def stream_chat_completion(self, messages: List[Dict[str, str]],
+                               model: str = "gpt-oss-20b") -> Iterator[Dict[str, Any]]:
+        """Send a streaming chat completion request to LM Studio
+        
+        Yields each server-sent chunk as it arrives, or a final
+        ``{"error": ...}`` if the request or the stream fails. The timeout
+        applies between chunks, not to the whole response.
+        
+        Streams share the cache with ``chat_completion``: a cached
+        completion is replayed as a single chunk, and a stream that
+        finishes cleanly is stored as the equivalent non-streaming response.
+        
+        Without a ``usage`` chunk, each chunk carrying content or tool call
+        deltas is counted as one completion token.
+        """
+        payload = self._completion_payload(messages, model)
+        span = self.tracer.start_span("lmstudio stream_chat_completion")
         try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "tools": self.tools,
-                "tool_choice": "auto",
-                "temperature": 0.7,
-                "max_tokens": 1000
-            }
+            cache_key = None
+            if self.cache is not None and self.cache.cacheable(payload):
+                cache_key = self.cache.key(payload)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span.attributes["cached"] = True
+                    yield completion_as_chunk(cached)
+                    return
             
-            response = requests.post(
-                f"{self.base_url}/v1/chat/completions",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            payload["stream"] = True
+            start = time.perf_counter()
+            first_token = None
+            prompt_tokens = completion_tokens = 0
+            usage = None
+            assembled = StreamedMessage() if cache_key is not None else None
+            try:
+                with self.session.post(
+                    f"{self.base_url}/v1/chat/completions",
+                    json=payload,
+                    stream=True,
+                    timeout=30
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if not line.startswith(b"data:"):
+                            continue  # blank separators, comments and other SSE fields
+                        data = line[5:].strip()
+                        if data == b"[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        for choice in chunk.get("choices") or []:
+                            delta = choice.get("delta") or {}
+                            if delta.get("content") or delta.get("tool_calls"):
+                                completion_tokens += 1
+                                if first_token is None:
+                                    first_token = time.perf_counter() - start
+                        usage = chunk.get("usage") or usage
+                        if assembled is not None:
+                            assembled.add(chunk)
+                        yield chunk
             
-            response.raise_for_status()
-            return response.json()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error communicating with LM Studio: {e}")
+                self._request_failures.inc(operation="stream_chat_completion")
+                span.attributes["error"] = str(e)
+                yield {"error": str(e)}
+                return
+            except ValueError as e:
+                logger.error(f"Invalid chunk in LM Studio stream: {e}")
+                self._request_failures.inc(operation="stream_chat_completion")
+                span.attributes["error"] = f"Invalid chunk in stream: {e}"
+                yield {"error": f"Invalid chunk in stream: {e}"}
+                return
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error communicating with LM Studio: {e}")
-            return {"error": str(e)}
+            if usage:
+                prompt_tokens = usage.get("prompt_tokens", 0)
+                completion_tokens = usage.get("completion_tokens", completion_tokens)
+            if first_token is not None:
+                self._time_to_first_token.observe(first_token)
+            self._observe_completion("stream_chat_completion", time.perf_counter() - start,
+                                     prompt_tokens, completion_tokens)
+            span.attributes.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                   time_to_first_token=first_token)
+            if assembled is not None:
+                assembled.finish()
+                self.cache.put(cache_key, {
+                    "choices": [{"index": 0, "message": assembled.message, "finish_reason": assembled.finish_reason}],
+                    "usage": usage or {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+                })
+        finally:
+            self.tracer.end_span(span)
+    
+    def _observe_completion(self, operation: str, duration: float, prompt_tokens: int, completion_tokens: int):
+        self._request_duration.observe(duration, operation=operation)
+        self._prompt_tokens.inc(prompt_tokens)
+        self._completion_tokens.inc(completion_tokens)
+        if completion_tokens and duration > 0:
+            self._tokens_per_second.observe(completion_tokens / duration, operation=operation)
+    
+    def _completion_payload(self, messages: List[Dict[str, str]], model: str) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "tools": self.tools,
+            "tool_choice": "auto",
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
     
     def get_available_models(self) -> List[str]:
         """Get list of available models from LM Studio"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/v1/models",
-                headers=self.headers,
                 timeout=10
             )
             
@@ -144,136 +397,558 @@ class LMStudioClient:
             return len(models) > 0
         except:
             return False
+    
+    def close(self):
+        """Close pooled connections to LM Studio"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+class HTTPTransport:
+    """Calls MCP server operations over HTTP
+    
+    Each call sends a fresh ``Idempotency-Key``, which the session's
+    retries resend unchanged, so the server runs a call at most once.
+    Operations in ``job_operations`` are submitted to the server's job
+    queue and polled, so a slow solve is bounded by ``job_timeout`` rather
+    than the per-request ``timeout``. Other operations are plain requests;
+    one that times out is resubmitted as a job under the same idempotency
+    key, so the job waits for the original request instead of running the
+    operation again.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:5000", session: Optional[requests.Session] = None,
+                 timeout: float = 10, tracer: Optional[Tracer] = None,
+                 job_operations: Iterable[str] = JOB_OPERATIONS, job_timeout: float = 300,
+                 poll_interval: float = 0.01, max_poll_interval: float = 1.0):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.tracer = tracer or TRACER
+        self.job_operations = frozenset(job_operations)
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+    
+    def call(self, operation: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run an operation on the server; returns the server's JSON payload"""
+        with self.tracer.span(f"mcp {operation}"):
+            if operation in self.job_operations:
+                return self._call_as_job(operation, data)
+            idempotency_key = uuid.uuid4().hex
+            try:
+                return self._request("POST", operation, data, idempotency_key)
+            except requests.exceptions.RequestException as e:
+                if not _timed_out(e) or operation in ("submit_job", "cancel_job"):
+                    return {"success": False, "error": f"MCP Server error: {e}"}
+                logger.info(f"{operation} timed out after {self.timeout} s; waiting for it as a job")
+                return self._call_as_job(operation, dict(data or {}, idempotency_key=idempotency_key))
+    
+    def _call_as_job(self, operation: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Submit an operation as a job and poll, backing off, until it finishes"""
+        submitted = self._request("POST", "submit_job", {"operation": operation, "data": data or {}})
+        job = submitted.get("job")
+        if not submitted.get("success") or not job:
+            return submitted
+        
+        deadline = time.monotonic() + self.job_timeout
+        interval = self.poll_interval
+        while job["state"] in ("queued", "running"):
+            if time.monotonic() >= deadline:
+                self._request("POST", "cancel_job", {"job_id": job["job_id"]})
+                return {"success": False, "error": f"MCP Server error: {operation} did not finish in {self.job_timeout} s"}
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            status = self._request("GET", "job_status", {"job_id": job["job_id"]})
+            if not status.get("success") or not status.get("job"):
+                return status
+            job = status["job"]
+        return job["result"]
+    
+    def _request(self, method: str, operation: str, data: Optional[Dict[str, Any]],
+                 idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """POST ``data`` as JSON, or GET it as query parameters
+        
+        With an ``idempotency_key``, request errors are raised for the
+        caller to handle instead of being returned as an error payload.
+        """
+        try:
+            if method == "GET":
+                response = self.session.get(
+                    f"{self.base_url}/{operation}",
+                    params=data,
+                    headers=trace_headers(),
+                    timeout=self.timeout
+                )
+            else:
+                response = self.session.post(
+                    f"{self.base_url}/{operation}",
+                    json=data,
+                    headers=dict(trace_headers(), **{IDEMPOTENCY_HEADER: idempotency_key or uuid.uuid4().hex}),
+                    timeout=self.timeout
+                )
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = None
+            # Error statuses carry the same payload the server produced in-process
+            if isinstance(payload, dict):
+                return payload
+            response.raise_for_status()
+            return {"success": False, "error": f"MCP Server error: unexpected response from {operation}"}
+        
+        except requests.exceptions.RequestException as e:
+            if idempotency_key is not None:
+                raise
+            return {"success": False, "error": f"MCP Server error: {e}"}
+
+def _timed_out(error: requests.exceptions.RequestException) -> bool:
+    """Whether a request failed waiting for the response, after any retries"""
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return True
+    # Exhausted read retries surface as a ConnectionError wrapping urllib3's MaxRetryError
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(reason, ReadTimeoutError)
+
+class InProcessTransport:
+    """Calls an ``MCPServer`` running in the same process, skipping HTTP
+    
+    Operations go straight to ``MCPServer.handle``, the code behind the
+    HTTP routes, so results are the same as over ``HTTPTransport``.
+    """
+    
+    def __init__(self, server: "MCPServer"):
+        self.server = server
+    
+    def call(self, operation: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload, _ = self.server.handle(operation, data or {})
+        return payload
+
+def _arguments_complete(arguments: str) -> bool:
+    """Whether streamed tool-call arguments already form a whole JSON object"""
+    if not arguments.rstrip().endswith("}"):
+        return False
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except ValueError:
+        return False
+
+def completion_as_chunk(response: Dict[str, Any]) -> Dict[str, Any]:
+    """A non-streaming completion as the single chunk that would stream it"""
+    choice = (response.get("choices") or [{}])[0]
+    message = choice.get("message") or {}
+    delta: Dict[str, Any] = {"role": "assistant", "content": message.get("content")}
+    if message.get("tool_calls"):
+        delta["tool_calls"] = [dict(tool_call, index=index) for index, tool_call in enumerate(message["tool_calls"])]
+    return {
+        "choices": [{"index": 0, "delta": delta, "finish_reason": choice.get("finish_reason") or "stop"}],
+        "usage": response.get("usage")
+    }
+
+class StreamedMessage:
+    """Assembles an assistant message from streamed chat completion chunks
+    
+    Tool calls arrive as fragments keyed by ``index``. A call is complete
+    once its arguments parse as a JSON object, a later call starts or the
+    stream finishes; ``add`` and ``finish`` report each completed call
+    exactly once, in order.
+    """
+    
+    def __init__(self):
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.finish_reason: Optional[str] = None
+        self._content: List[str] = []
+        self._completed = 0
+        self._finished = False
+    
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+    
+    @property
+    def message(self) -> Dict[str, Any]:
+        """The assembled message, in the form a non-streaming completion returns"""
+        message: Dict[str, Any] = {"role": "assistant", "content": self.content or None}
+        if self.tool_calls:
+            message["tool_calls"] = self.tool_calls
+        return message
+    
+    def add(self, chunk: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Apply one chunk; returns its text and any tool calls it completed"""
+        choice = (chunk.get("choices") or [{}])[0]
+        delta = choice.get("delta") or {}
+        
+        text = delta.get("content") or ""
+        if text:
+            self._content.append(text)
+        
+        for fragment in delta.get("tool_calls") or []:
+            index = fragment.get("index")
+            if index is None:
+                index = len(self.tool_calls) if fragment.get("id") else max(len(self.tool_calls) - 1, 0)
+            while len(self.tool_calls) <= index:
+                self.tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            call = self.tool_calls[index]
+            if fragment.get("id"):
+                call["id"] = fragment["id"]
+            function = fragment.get("function") or {}
+            call["function"]["name"] += function.get("name") or ""
+            call["function"]["arguments"] += function.get("arguments") or ""
+        
+        if choice.get("finish_reason"):
+            self.finish_reason = choice["finish_reason"]
+            self._finished = True
+        return text, self._take_completed()
+    
+    def finish(self) -> List[Dict[str, Any]]:
+        """Mark the stream as ended; returns tool calls not reported yet"""
+        self._finished = True
+        return self._take_completed()
+    
+    def _take_completed(self) -> List[Dict[str, Any]]:
+        completed = []
+        while self._completed < len(self.tool_calls):
+            call = self.tool_calls[self._completed]
+            later_call_started = self._completed + 1 < len(self.tool_calls)
+            if not (self._finished or later_call_started or
+                    (call["function"]["name"] and _arguments_complete(call["function"]["arguments"]))):
+                break
+            completed.append(call)
+            self._completed += 1
+        return completed
+
+class ToolCallScheduler:
+    """Runs tool calls on a worker pool, ordering only those that depend on each other
+    
+    Creating components is independent unless two calls create the same
+    component name or alias (the MCP server maps names to the latest
+    instance). A connect waits for the creation of both components it
+    names, if they were created in the same turn, and a later create of
+    either name waits for the connect, so the name still refers to the
+    component the connect meant. Clearing the canvas, or any other call,
+    waits for everything before it and everything after it waits for it.
+    Calls must be submitted in the order the model issued them.
+    """
+    
+    def __init__(self, executor: ThreadPoolExecutor, execute: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.executor = executor
+        self.execute = execute
+        self._barrier: Optional[Future] = None
+        self._since_barrier: List[Future] = []
+        self._creates: Dict[str, Future] = {}  # component name or alias -> latest create
+        self._readers: Dict[str, List[Future]] = {}  # component name or alias -> calls resolving it since
+    
+    def submit(self, tool_call: Dict[str, Any]) -> Future:
+        """Schedule a tool call; the future resolves to its result"""
+        function_name = tool_call["function"]["name"]
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        except ValueError:
+            arguments = None
+        if not isinstance(arguments, dict):
+            arguments = None
+        
+        dependencies = [self._barrier]
+        if function_name == "create_grasshopper_component" and arguments is not None:
+            names = {str(arguments.get(key) or "").lower() for key in ("component_name", "alias")} - {""}
+            for name in names:
+                dependencies.append(self._creates.get(name))
+                dependencies.extend(self._readers.pop(name, ()))
+            future = self._submit(tool_call, dependencies)
+            for name in names:
+                self._creates[name] = future
+        elif function_name == "connect_grasshopper_components" and arguments is not None:
+            names = {str(arguments.get(end, "")).lower() for end in ("source_component", "target_component")}
+            dependencies.extend(self._creates.get(name) for name in names)
+            future = self._submit(tool_call, dependencies)
+            for name in names:
+                readers = self._readers.setdefault(name, [])
+                readers[:] = [reader for reader in readers if not reader.done()]
+                readers.append(future)
+        else:
+            future = self._submit(tool_call, dependencies + self._since_barrier)
+            self._barrier = future
+            self._since_barrier = []
+            self._creates = {}
+            self._readers = {}
+            return future
+        
+        self._since_barrier.append(future)
+        return future
+    
+    def _submit(self, tool_call: Dict[str, Any], dependencies: List[Optional[Future]]) -> Future:
+        """Start the call once every dependency has finished, without holding a worker meanwhile"""
+        # Run in the submitter's context so the call is traced under its turn
+        context = contextvars.copy_context()
+        waiting = [future for future in dependencies if future is not None and not future.done()]
+        if not waiting:
+            return self.executor.submit(context.run, self.execute, tool_call)
+        
+        result: Future = Future()
+        lock = threading.Lock()
+        remaining = [len(waiting)]
+        
+        def start(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            # A failed call does not block the ones after it
+            self.executor.submit(context.run, self.execute, tool_call).add_done_callback(
+                lambda done: result.set_exception(done.exception()) if done.exception()
+                else result.set_result(done.result())
+            )
+        
+        for future in waiting:
+            future.add_done_callback(start)
+        return result
 
 class GrasshopperLLMInterface:
-    """High-level interface for LLM-driven Grasshopper operations"""
+    """High-level interface for LLM-driven Grasshopper operations
+    
+    Rather than the whole component catalog, the prompt carries only the
+    components most relevant to the latest user message, picked from the
+    knowledge base's search index. Prompt size therefore stays roughly
+    constant however many components are registered. The selection goes in
+    a system message after the user message rather than in the system
+    prompt, so the start of the history never changes and LM Studio can
+    reuse its cached prefix from one turn to the next.
+    """
+    
+    SYSTEM_PROMPT = """You are an AI assistant that helps users create parametric designs in Grasshopper. 
+            You have access to tools that can create and connect Grasshopper components.
+            The components relevant to each request are described after the request.
+            
+            When users ask you to create designs, use the available tools to create the appropriate components and connections.
+            Always explain what you're doing and ask for clarification if needed."""
     
-    def __init__(self, lm_studio_client: LMStudioClient, mcp_server_url: str = "http://localhost:5000"):
+    def __init__(self, lm_studio_client: LMStudioClient, mcp_server_url: str = "http://localhost:5000",
+                 component_factory: Optional[ComponentFactory] = None, prompt_components: int = 8,
+                 pool_size: int = 4, max_retries: int = 3, tool_workers: int = 4,
+                 max_history_tokens: int = 4096, transport: Optional[Any] = None,
+                 tracer: Optional[Tracer] = None):
         self.lm_client = lm_studio_client
         self.mcp_server_url = mcp_server_url.rstrip('/')
+        # Every MCP call carries an idempotency key, so a retried POST cannot apply twice
+        self.session = create_session(pool_size, max_retries,
+                                      retry_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"})
+        self.tracer = tracer or TRACER
+        # Trace of the latest turn; its spans are in self.tracer.spans(trace_id)
+        self.last_trace_id: Optional[str] = None
+        # HTTPTransport, or InProcessTransport when the MCP server shares this process
+        self.transport = transport or HTTPTransport(self.mcp_server_url, self.session, tracer=self.tracer)
+        # Independent tool calls run concurrently; see ToolCallScheduler
+        self._tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="tool-call")
+        self.component_factory = component_factory or ComponentFactory()
+        self.prompt_components = prompt_components
         self.conversation_history: List[Dict[str, str]] = []
+        self.history_manager = HistoryManager(max_history_tokens)
         
-        # Add system message with Grasshopper context
+        # Components described to the model; kept when a message matches none
+        self.prompt_component_names: List[str] = self.component_factory.list_components()[:prompt_components]
+        self._components_message: Optional[Dict[str, str]] = None
+        
+        # Add system message with Grasshopper context; it never changes afterwards
         self.conversation_history.append({
             "role": "system",
-            "content": """You are an AI assistant that helps users create parametric designs in Grasshopper. 
-            You have access to tools that can create and connect Grasshopper components.
-            
-            Available components:
-            - circle: Creates a circle (parameters: Radius, Plane)
-            - point: Creates a point (parameters: X, Y, Z)
-            - line: Creates a line (parameters: Start, End)
-            - extrude: Extrudes geometry (parameters: Base, Direction)
-            
-            When users ask you to create designs, use the available tools to create the appropriate components and connections.
-            Always explain what you're doing and ask for clarification if needed."""
+            "content": self.SYSTEM_PROMPT
         })
     
+    def _select_components(self, user_input: str):
+        """Describe the components relevant to ``user_input`` after the user message
+        
+        The history holds one description: when the selection changes (or
+        the description was compacted away) the old one is removed and the
+        new one follows the latest user message.
+        """
+        with self.tracer.span("select components"):
+            names = self.component_factory.select_components_for_llm(user_input, self.prompt_components)
+            changed = bool(names) and names != self.prompt_component_names
+            if changed:
+                self.prompt_component_names = names
+            position = next((index for index, message in enumerate(self.conversation_history)
+                             if message is self._components_message), None)
+            if changed or position is None:
+                if position is not None:
+                    del self.conversation_history[position]
+                self._components_message = {
+                    "role": "system",
+                    "content": self.component_factory.get_component_info_for_query(self.prompt_component_names)
+                }
+                self.conversation_history.append(self._components_message)
+    
+    def _compacted_history(self) -> List[Dict[str, str]]:
+        """The conversation history, compacted to the prompt token budget"""
+        with self.tracer.span("compact history"):
+            self.history_manager.compact(self.conversation_history)
+        return self.conversation_history
+    
     def process_user_input(self, user_input: str) -> str:
         """Process user input and execute Grasshopper operations"""
-        # Add user message to conversation
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_input
-        })
-        
-        # Get LLM response
-        response = self.lm_client.chat_completion(self.conversation_history)
-        
-        if "error" in response:
-            return f"Error communicating with LM Studio: {response['error']}"
-        
-        # Process the response
-        choice = response.get("choices", [{}])[0]
-        message = choice.get("message", {})
-        
-        # Add assistant message to conversation
-        self.conversation_history.append(message)
+        with self.tracer.span("turn") as turn:
+            self.last_trace_id = turn.trace_id
+            # Add user message to conversation
+            self.conversation_history.append({
+                "role": "user",
+                "content": user_input
+            })
+            self._select_components(user_input)
+            
+            # Get LLM response
+            response = self.lm_client.chat_completion(self._compacted_history())
+            
+            if "error" in response:
+                return f"Error communicating with LM Studio: {response['error']}"
+            
+            # Process the response
+            choice = response.get("choices", [{}])[0]
+            message = choice.get("message", {})
+            
+            # Add assistant message to conversation
+            self.conversation_history.append(message)
+            
+            # Check if LLM wants to use tools
+            tool_calls = message.get("tool_calls", [])
+            if tool_calls:
+                scheduler = ToolCallScheduler(self._tool_executor, self._execute_tool_call)
+                futures = [scheduler.submit(tool_call) for tool_call in tool_calls]
+                tool_results = [future.result() for future in futures]
+                
+                # Add tool results to conversation
+                for i, result in enumerate(tool_results):
+                    self.conversation_history.append({
+                        "role": "tool",
+                        "tool_call_id": tool_calls[i]["id"],
+                        "content": json.dumps(result)
+                    })
+                
+                # Get final response from LLM
+                final_response = self.lm_client.chat_completion(self._compacted_history())
+                if "error" not in final_response:
+                    final_message = final_response.get("choices", [{}])[0].get("message", {})
+                    self.conversation_history.append(final_message)
+                    return final_message.get("content", "Operation completed.")
+            
+            return message.get("content", "I'm not sure how to help with that.")
+    
+    def process_user_input_stream(self, user_input: str) -> Iterator[str]:
+        """Process user input, yielding the response text as it is generated
         
-        # Check if LLM wants to use tools
-        tool_calls = message.get("tool_calls", [])
-        if tool_calls:
-            tool_results = []
-            for tool_call in tool_calls:
-                result = self._execute_tool_call(tool_call)
-                tool_results.append(result)
+        Each tool call is sent to the MCP server as soon as its arguments
+        are complete, while the model is still generating the rest of the
+        message, so the canvas updates during the response.
+        """
+        with self.tracer.span("turn", streamed=True) as turn:
+            self.last_trace_id = turn.trace_id
+            # Add user message to conversation
+            self.conversation_history.append({
+                "role": "user",
+                "content": user_input
+            })
+            self._select_components(user_input)
             
-            # Add tool results to conversation
-            for i, result in enumerate(tool_results):
+            message = StreamedMessage()
+            scheduler = ToolCallScheduler(self._tool_executor, self._execute_tool_call)
+            dispatched = []  # (tool call, future result)
+            error = None
+            for chunk in self.lm_client.stream_chat_completion(self._compacted_history()):
+                if "error" in chunk:
+                    error = chunk["error"]
+                    break
+                text, completed = message.add(chunk)
+                if text:
+                    yield text
+                for tool_call in completed:
+                    dispatched.append((tool_call, scheduler.submit(tool_call)))
+            if error is None:
+                for tool_call in message.finish():
+                    dispatched.append((tool_call, scheduler.submit(tool_call)))
+            
+            # Record what actually ran: calls still incomplete when a stream fails were never sent
+            if error is None or message.content or dispatched:
+                assistant_message: Dict[str, Any] = {"role": "assistant", "content": message.content or None}
+                if dispatched:
+                    assistant_message["tool_calls"] = [tool_call for tool_call, _ in dispatched]
+                self.conversation_history.append(assistant_message)
+            
+            # Add tool results to conversation, once every dispatched call has finished
+            for tool_call, result in dispatched:
                 self.conversation_history.append({
                     "role": "tool",
-                    "tool_call_id": tool_calls[i]["id"],
-                    "content": json.dumps(result)
+                    "tool_call_id": tool_call["id"],
+                    "content": json.dumps(result.result())
                 })
             
-            # Get final response from LLM
-            final_response = self.lm_client.chat_completion(self.conversation_history)
-            if "error" not in final_response:
-                final_message = final_response.get("choices", [{}])[0].get("message", {})
-                self.conversation_history.append(final_message)
-                return final_message.get("content", "Operation completed.")
-        
-        return message.get("content", "I'm not sure how to help with that.")
+            if error is not None:
+                yield f"Error communicating with LM Studio: {error}"
+                return
+            if not dispatched:
+                if not message.content:
+                    yield "I'm not sure how to help with that."
+                return
+            
+            # Stream final response from LLM
+            final_message = StreamedMessage()
+            for chunk in self.lm_client.stream_chat_completion(self._compacted_history()):
+                if "error" in chunk:
+                    error = chunk["error"]
+                    break
+                text, _ = final_message.add(chunk)
+                if text:
+                    yield text
+            if error is not None:
+                # Keep the text the user already saw; the unfinished message is not sent again
+                if final_message.content:
+                    self.conversation_history.append({"role": "assistant", "content": final_message.content})
+                yield f"Error communicating with LM Studio: {error}"
+                return
+            final_message.finish()
+            self.conversation_history.append(final_message.message)
+            if not final_message.content:
+                yield "Operation completed."
+    
+    def close(self):
+        """Close pooled connections to the MCP server"""
+        self._tool_executor.shutdown(wait=True)
+        self.session.close()
     
     def _execute_tool_call(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool call"""
         function_name = tool_call["function"]["name"]
-        arguments = json.loads(tool_call["function"]["arguments"])
         
-        try:
-            if function_name == "create_grasshopper_component":
-                return self._create_component(arguments)
-            elif function_name == "connect_grasshopper_components":
-                return self._connect_components(arguments)
-            elif function_name == "clear_grasshopper_canvas":
-                return self._clear_canvas()
-            else:
-                return {"success": False, "error": f"Unknown function: {function_name}"}
-        
-        except Exception as e:
-            logger.error(f"Error executing tool call {function_name}: {e}")
-            return {"success": False, "error": str(e)}
+        with self.tracer.span(f"tool {function_name}"):
+            try:
+                arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+                if function_name == "create_grasshopper_component":
+                    return self._create_component(arguments)
+                elif function_name == "connect_grasshopper_components":
+                    return self._connect_components(arguments)
+                elif function_name == "clear_grasshopper_canvas":
+                    return self._clear_canvas()
+                elif function_name == "sync_grasshopper_canvas":
+                    return self._sync_canvas(arguments)
+                else:
+                    return {"success": False, "error": f"Unknown function: {function_name}"}
+            
+            except Exception as e:
+                logger.error(f"Error executing tool call {function_name}: {e}")
+                return {"success": False, "error": str(e)}
     
     def _create_component(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Create a Grasshopper component"""
-        try:
-            response = requests.post(
-                f"{self.mcp_server_url}/create_component",
-                json=arguments,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"success": False, "error": f"MCP Server error: {e}"}
+        return self.transport.call("create_component", arguments)
     
     def _connect_components(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Connect Grasshopper components"""
-        try:
-            response = requests.post(
-                f"{self.mcp_server_url}/connect_components",
-                json=arguments,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"success": False, "error": f"MCP Server error: {e}"}
+        return self.transport.call("connect_components", arguments)
     
     def _clear_canvas(self) -> Dict[str, Any]:
         """Clear Grasshopper canvas"""
-        try:
-            response = requests.post(
-                f"{self.mcp_server_url}/clear_canvas",
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        
-        except requests.exceptions.RequestException as e:
-            return {"success": False, "error": f"MCP Server error: {e}"}
+        return self.transport.call("clear_canvas")
+    
+    def _sync_canvas(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring the Grasshopper canvas to a desired definition"""
+        return self.transport.call("sync_canvas", arguments)
 
 def main():
     """Demo of LM Studio client"""
@@ -296,8 +971,13 @@ def main():
             break
         
         if user_input:
-            response = interface.process_user_input(user_input)
-            print(f"Assistant: {response}")
+            print("Assistant: ", end="", flush=True)
+            for text in interface.process_user_input_stream(user_input):
+                print(text, end="", flush=True)
+            print()
+    
+    interface.close()
+    lm_client.close()
 
 if __name__ == "__main__":
     main()
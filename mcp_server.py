@@ -4,18 +4,39 @@ Grasshopper MCP Server
 A Model Context Protocol server that bridges LM Studio and Grasshopper
 """
 
+import argparse
+import asyncio
+import hashlib
 import json
+import inspect
+import itertools
+import select
 import socket
 import threading
 import time
 import logging
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List, Set, Tuple
 from dataclasses import dataclass
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import requests
 
+from canvas_registry import CanvasRegistry, Connection
 from component_factory import ComponentFactory
+from graph_builder import plan_graph
+from grasshopper_protocol import FrameReader, encode_frame, decode_frame
+from idempotency import IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, IdempotencyKeyReused, IdempotencyStore
+from jobs import FINISHED_STATES, JobQueue, JobQueueFull
+from metrics import CONTENT_TYPE, REGISTRY, MetricsRegistry
+from tracing import PARENT_HEADER, TRACE_HEADER, TRACER, Span, Tracer, new_span_id, parse_trace_headers
+
+# Error for a request body that parses as JSON but not as an object; shared by both front ends
+BODY_NOT_OBJECT_ERROR = "Request body must be a JSON object"
+
+# Sentinel for a parameter the canvas registry has no value for
+_MISSING = object()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,35 +52,74 @@ class ComponentInfo:
     output_params: Dict[str, Any]
     guid: Optional[str] = None
 
+@dataclass
+class BatchPlan:
+    """A validated batch, ready to send to Grasshopper"""
+    command: Dict[str, Any]
+    component_names: List[Optional[str]]  # knowledge base name per operation, creates only
+    aliases: List[Optional[str]]          # alias per operation, creates only
+
 class GrasshopperTCPClient:
     """TCP client for communicating with Grasshopper MCP Component"""
     
-    def __init__(self, host: str = "localhost", port: int = 8888):
+    def __init__(self, host: str = "localhost", port: int = 8888, timeout: Optional[float] = 30.0):
         self.host = host
         self.port = port
+        self.timeout = timeout
         self.socket = None
         self.connected = False
+        self.last_used = 0.0
+        self._reader: Optional[FrameReader] = None
     
     def connect(self) -> bool:
         """Connect to Grasshopper MCP Component"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.host, self.port))
+            self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reader = FrameReader(self.socket)
             self.connected = True
+            self.last_used = time.monotonic()
             logger.info(f"Connected to Grasshopper MCP Component at {self.host}:{self.port}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Grasshopper: {e}")
+            self.socket = None
+            self._reader = None
             self.connected = False
             return False
     
     def disconnect(self):
         """Disconnect from Grasshopper MCP Component"""
         if self.socket:
-            self.socket.close()
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+            self._reader = None
             self.connected = False
             logger.info("Disconnected from Grasshopper MCP Component")
     
+    def is_alive(self) -> bool:
+        """Cheap liveness check that does not send anything over the socket.
+        
+        An idle connection should never be readable; if it is, the peer has
+        either closed it or sent unsolicited data, and it cannot be reused.
+        """
+        if not self.connected or self.socket is None:
+            return False
+        try:
+            readable, _, _ = select.select([self.socket], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+    
+    def ping(self) -> bool:
+        """Round-trip a ping command to verify the connection end to end"""
+        response = self.send_command({"command": "ping"})
+        # Older bridge builds answer "Unknown command" - still a live peer
+        return self.connected and isinstance(response, dict) and "success" in response
+    
     def send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
         """Send a command to Grasshopper and receive response"""
         if not self.connected:
@@ -67,34 +127,349 @@ class GrasshopperTCPClient:
                 return {"success": False, "error": "Not connected to Grasshopper"}
         
         try:
-            # Send command as JSON
-            command_json = json.dumps(command)
-            self.socket.send(command_json.encode('utf-8') + b'\n')
+            self.socket.sendall(encode_frame(command))
+            response = decode_frame(self._reader.read_frame())
+            self.last_used = time.monotonic()
+            return response
             
-            # Receive response
-            response_data = b''
+        except Exception as e:
+            logger.error(f"Error sending command to Grasshopper: {e}")
+            self.disconnect()
+            return {"success": False, "error": str(e)}
+
+class GrasshopperConnectionPool:
+    """Bounded pool of persistent connections to the Grasshopper MCP Component
+    
+    Exposes the same ``connect``/``send_command``/``connected`` surface as
+    ``GrasshopperTCPClient`` so it can be used as a drop-in replacement by
+    ``MCPServer``. Each command checks a connection out for the duration of a
+    single request/response exchange, so concurrent Flask request threads
+    never interleave bytes on the same socket.
+    """
+    
+    def __init__(self, host: str = "localhost", port: int = 8888, max_size: int = 4,
+                 idle_timeout: float = 60.0, probe_interval: float = 15.0,
+                 checkout_timeout: float = 10.0, timeout: Optional[float] = 30.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.probe_interval = probe_interval
+        self.checkout_timeout = checkout_timeout
+        self.timeout = timeout
+        
+        self._idle: deque = deque()  # least recently used on the left
+        self._size = 0  # idle + checked out connections
+        self._cond = threading.Condition()
+        self._closed = False
+        # Lifetime totals; a reconnect is a connection opened to replace a lost one
+        self._connects = 0
+        self._connect_failures = 0
+        self._lost = 0
+        self._reconnects = 0
+    
+    @property
+    def connected(self) -> bool:
+        """True while the pool holds at least one established connection"""
+        with self._cond:
+            return self._size > 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Current pool occupancy"""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "connects": self._connects,
+                "reconnects": self._reconnects,
+                "connect_failures": self._connect_failures
+            }
+    
+    def connect(self) -> bool:
+        """Warm up one connection; returns False if Grasshopper is unreachable"""
+        try:
+            client = self.checkout(self.checkout_timeout)
+        except (ConnectionError, TimeoutError) as e:
+            logger.warning(f"Could not warm Grasshopper connection pool: {e}")
+            return False
+        self.checkin(client)
+        return True
+    
+    def checkout(self, timeout: Optional[float] = None) -> GrasshopperTCPClient:
+        """Take a healthy connection from the pool, opening one if there is room
+        
+        Blocks for up to ``timeout`` seconds when every connection is in use.
+        Raises ``ConnectionError`` if Grasshopper cannot be reached and
+        ``TimeoutError`` if no connection became available in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        client = None
+        with self._cond:
             while True:
-                chunk = self.socket.recv(1024)
-                if not chunk:
+                if self._closed:
+                    raise ConnectionError("Grasshopper connection pool is closed")
+                self._evict_idle_locked()
+                if self._idle:
+                    client = self._idle.pop()  # warmest connection first
                     break
-                response_data += chunk
-                if b'\n' in response_data:
+                if self._size < self.max_size:
+                    self._size += 1  # reserve a slot, connect outside the lock
                     break
-            
-            response_json = response_data.decode('utf-8').strip()
-            response = json.loads(response_json)
-            return response
-            
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a Grasshopper connection")
+                self._cond.wait(remaining)
+        
+        if client is not None and self._probe(client):
+            return client
+        
+        # Either a fresh slot or a stale connection that failed its probe
+        if client is None:
+            client = GrasshopperTCPClient(self.host, self.port, timeout=self.timeout)
+        else:
+            client.disconnect()
+            with self._cond:
+                self._lost += 1
+        if not client.connect():
+            with self._cond:
+                self._connect_failures += 1
+            self._release_slot()
+            raise ConnectionError(f"Could not connect to Grasshopper at {self.host}:{self.port}")
+        with self._cond:
+            self._connects += 1
+            if self._reconnects < self._lost:
+                self._reconnects += 1
+        return client
+    
+    def checkin(self, client: GrasshopperTCPClient):
+        """Return a connection to the pool; broken connections are discarded"""
+        with self._cond:
+            if client.connected and not self._closed:
+                self._idle.append(client)
+                self._cond.notify()
+                return
+            if not client.connected:
+                self._lost += 1
+        client.disconnect()
+        self._release_slot()
+    
+    def send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a command over a pooled connection and receive the response"""
+        try:
+            client = self.checkout(self.checkout_timeout)
+        except (ConnectionError, TimeoutError) as e:
+            return {"success": False, "error": str(e)}
+        try:
+            return client.send_command(command)
+        finally:
+            self.checkin(client)
+    
+    def disconnect(self):
+        """Close all idle connections; checked-out connections close on checkin"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for client in idle:
+            client.disconnect()
+    
+    def close(self):
+        """Close the pool permanently"""
+        with self._cond:
+            self._closed = True
+        self.disconnect()
+    
+    def _probe(self, client: GrasshopperTCPClient) -> bool:
+        """Health-check a connection taken from the idle list"""
+        if not client.is_alive():
+            return False
+        if time.monotonic() - client.last_used >= self.probe_interval:
+            return client.ping()
+        return True
+    
+    def _evict_idle_locked(self):
+        """Close connections that have sat idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0].last_used < cutoff:
+            client = self._idle.popleft()
+            self._size -= 1
+            client.disconnect()
+    
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+class MultiplexedGrasshopperClient:
+    """Single Grasshopper connection that carries many in-flight commands
+    
+    Every command is tagged with a ``request_id`` that the bridge echoes back
+    in its response. A background reader thread matches responses to the
+    futures of waiting callers, so commands from many threads are pipelined
+    over one socket instead of paying a full round trip each. Responses
+    without a ``request_id`` (older bridge builds, which answer strictly in
+    order) are matched to the oldest outstanding command.
+    """
+    
+    def __init__(self, host: str = "localhost", port: int = 8888,
+                 timeout: Optional[float] = 30.0, connect_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.socket = None
+        self.connected = False
+        
+        self._pending: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()  # guards _pending and connection state
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._connects = 0
+        self._connect_failures = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Connection state, commands awaiting a response and lifetime connection totals"""
+        with self._lock:
+            return {
+                "size": int(self.connected),
+                "in_flight": len(self._pending),
+                "connects": self._connects,
+                "reconnects": max(self._connects - 1, 0),
+                "connect_failures": self._connect_failures
+            }
+    
+    def connect(self) -> bool:
+        """Connect to Grasshopper MCP Component and start the reader thread"""
+        with self._lock:
+            if self.connected:
+                return True
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(None)  # per-command timeouts are enforced on the futures
+            except Exception as e:
+                logger.error(f"Failed to connect to Grasshopper: {e}")
+                self._connect_failures += 1
+                return False
+            self.socket = sock
+            self.connected = True
+            self._connects += 1
+        
+        reader = threading.Thread(
+            target=self._read_loop, args=(sock, FrameReader(sock)),
+            name="grasshopper-reader", daemon=True
+        )
+        reader.start()
+        logger.info(f"Connected to Grasshopper MCP Component at {self.host}:{self.port} (multiplexed)")
+        return True
+    
+    def disconnect(self):
+        """Disconnect and fail every outstanding command"""
+        self._fail_connection(self.socket, "Disconnected from Grasshopper")
+    
+    def submit(self, command: Dict[str, Any]) -> Future:
+        """Send a command without waiting; the future resolves to the response"""
+        future: Future = Future()
+        if not self.connected and not self.connect():
+            future.set_result({"success": False, "error": "Not connected to Grasshopper"})
+            return future
+        
+        request_id = str(next(self._ids))
+        tagged = dict(command, request_id=request_id)
+        with self._lock:
+            sock = self.socket
+            if sock is not None:
+                self._pending[request_id] = future
+        if sock is None:
+            # The connection dropped since the check above
+            future.set_result({"success": False, "error": "Not connected to Grasshopper"})
+            return future
+        try:
+            with self._send_lock:
+                sock.sendall(encode_frame(tagged))
         except Exception as e:
             logger.error(f"Error sending command to Grasshopper: {e}")
+            self._fail_connection(sock, str(e))
+            # Already failed if the connection was still current; otherwise it was never answered
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self._resolve(future, {"success": False, "error": str(e)})
+        return future
+    
+    def send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a command to Grasshopper and wait for its response"""
+        return self._wait(self.submit(command), timeout)
+    
+    def send_many(self, commands: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Pipeline several independent commands and return responses in order"""
+        futures = [self.submit(command) for command in commands]
+        return [self._wait(future, timeout) for future in futures]
+    
+    def _wait(self, future: Future, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                for request_id, pending in list(self._pending.items()):
+                    if pending is future:
+                        del self._pending[request_id]
+            return {"success": False, "error": "Timed out waiting for Grasshopper response"}
+    
+    def _read_loop(self, sock, reader: FrameReader):
+        """Route responses to their waiting futures until the connection drops"""
+        try:
+            while True:
+                response = reader.read_message()
+                with self._lock:
+                    request_id = response.pop("request_id", None)
+                    if request_id is not None:
+                        future = self._pending.pop(str(request_id), None)
+                    elif self._pending:
+                        _, future = self._pending.popitem(last=False)
+                    else:
+                        future = None
+                if future is None:
+                    logger.debug(f"Dropping response for unknown or expired request {request_id}")
+                    continue
+                self._resolve(future, response)
+        except Exception as e:
+            if self.socket is sock:
+                logger.error(f"Grasshopper connection lost: {e}")
+            self._fail_connection(sock, str(e))
+    
+    def _fail_connection(self, sock, error: str):
+        with self._lock:
+            if sock is None or sock is not self.socket:
+                return
+            self.socket = None
             self.connected = False
-            return {"success": False, "error": str(e)}
+            pending = list(self._pending.values())
+            self._pending.clear()
+        try:
+            sock.close()
+        except OSError:
+            pass
+        for future in pending:
+            self._resolve(future, {"success": False, "error": error})
+    
+    @staticmethod
+    def _resolve(future: Future, response: Dict[str, Any]):
+        """Resolve a command's future unless the reader or a failure got there first"""
+        try:
+            future.set_result(response)
+        except InvalidStateError:
+            pass
 
 class ComponentKnowledgeBase:
     """Knowledge base for Grasshopper components - wrapper around ComponentFactory"""
     
-    def __init__(self):
-        self.factory = ComponentFactory()
+    def __init__(self, catalog_paths: Optional[List[str]] = None):
+        self.factory = ComponentFactory(catalog_paths)
     
     def get_component(self, name: str) -> Optional[Any]:
         """Get component information by name"""
@@ -108,158 +483,827 @@ class ComponentKnowledgeBase:
         """Get component information formatted for LLM"""
         return self.factory.get_component_info_for_llm()
     
+    @property
+    def catalog_version(self) -> int:
+        """Changes whenever the component catalog changes"""
+        return self.factory.catalog_version
+    
     @property
     def components(self) -> Dict[str, Any]:
         """Get all components"""
         return self.factory.components
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
 class MCPServer:
     """Main MCP Server class"""
     
-    def __init__(self):
+    def __init__(self, grasshopper_host: str = "localhost", grasshopper_port: int = 8888,
+                 pool_size: int = 4, multiplex: bool = False,
+                 catalog_paths: Optional[List[str]] = None,
+                 metrics: Optional[MetricsRegistry] = None, tracer: Optional[Tracer] = None,
+                 idempotency: Optional[IdempotencyStore] = None, job_workers: int = 4):
         self.app = Flask(__name__)
         CORS(self.app)  # Enable CORS for all routes
         
-        self.grasshopper_client = GrasshopperTCPClient()
-        self.knowledge_base = ComponentKnowledgeBase()
-        self.created_components: Dict[str, str] = {}  # name -> guid mapping
+        if multiplex:
+            # One pipelined connection; requires a bridge that echoes request_id
+            self.grasshopper_client = MultiplexedGrasshopperClient(grasshopper_host, grasshopper_port)
+        else:
+            self.grasshopper_client = GrasshopperConnectionPool(
+                grasshopper_host, grasshopper_port, max_size=pool_size
+            )
+        self.knowledge_base = ComponentKnowledgeBase(catalog_paths)
+        self.canvas = CanvasRegistry()  # what this server has placed on the canvas
+        self._catalog_response: Optional[Tuple[int, Dict[str, Any], bytes, str]] = None
+        self.idempotency = idempotency or IdempotencyStore()  # recent idempotency keys and responses
+        self._idempotent_operations = {operation for _, methods, operation in self.ROUTES if 'POST' in methods}
+        # Long operations can run on the job queue instead of a request thread
+        self.jobs = JobQueue(self._run_job, workers=job_workers)
+        self._job_operations = self._idempotent_operations - {'submit_job', 'cancel_job'}
+        
+        self.metrics = metrics or REGISTRY
+        self._requests_total = self.metrics.counter(
+            "mcp_http_requests_total", "HTTP requests handled", ("route", "method", "status")
+        )
+        self._request_duration = self.metrics.histogram(
+            "mcp_http_request_duration_seconds", "HTTP request latency", ("route",)
+        )
+        self._command_duration = self.metrics.histogram(
+            "grasshopper_command_duration_seconds", "Grasshopper TCP round-trip time", ("command",)
+        )
+        self._command_failures = self.metrics.counter(
+            "grasshopper_command_failures_total", "Grasshopper commands that did not succeed", ("command",)
+        )
+        self._idempotent_replays = self.metrics.counter(
+            "mcp_idempotent_replays_total", "Requests answered from an earlier response with the same idempotency key",
+            ("operation",)
+        )
+        # Keyed per server: several servers may share a registry
+        self.metrics.add_collector(f"grasshopper_connection:{id(self)}", self._connection_metrics)
+        self.tracer = tracer or TRACER
         
         self._setup_routes()
     
+    # (rule, HTTP methods, operation) - shared by the Flask and ASGI front ends
+    ROUTES = [
+        ('/health', ['GET'], 'health'),
+        ('/components', ['GET'], 'components'),
+        ('/create_component', ['POST'], 'create_component'),
+        ('/connect_components', ['POST'], 'connect_components'),
+        ('/clear_canvas', ['POST'], 'clear_canvas'),
+        ('/batch', ['POST'], 'batch'),
+        ('/build_graph', ['POST'], 'build_graph'),
+        ('/sync_canvas', ['POST'], 'sync_canvas'),
+        ('/submit_job', ['POST'], 'submit_job'),
+        ('/job_status', ['GET'], 'job_status'),
+        ('/cancel_job', ['POST'], 'cancel_job'),
+        ('/jobs', ['GET'], 'jobs'),
+        ('/metrics', ['GET'], 'metrics'),
+    ]
+    
+    # Connection stats exported as gauges and as counters respectively
+    CONNECTION_GAUGES = ("max_size", "size", "idle", "in_use", "in_flight")
+    CONNECTION_COUNTERS = ("connects", "reconnects", "connect_failures")
+    
     def _setup_routes(self):
         """Setup Flask routes"""
+        for rule, methods, operation in self.ROUTES:
+            if operation == 'components':
+                view = self._flask_catalog_response
+            elif operation == 'metrics':
+                view = self._flask_metrics_response
+            else:
+                view = lambda operation=operation: self._flask_response(operation)
+            self.app.add_url_rule(rule, operation, view, methods=methods)
+        self.app.before_request(self._start_request_timer)
+        self.app.after_request(self._record_request)
+    
+    def _start_request_timer(self):
+        request.environ['mcp.request_start'] = time.perf_counter()
+    
+    def _record_request(self, response):
+        start = request.environ.get('mcp.request_start')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            self.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+        return response
+    
+    def observe_request(self, route: str, method: str, status: int, duration: float):
+        """Record one HTTP request; called by the Flask and ASGI front ends"""
+        self._requests_total.inc(route=route, method=method, status=status)
+        self._request_duration.observe(duration, route=route)
+    
+    def observe_command(self, command: Dict[str, Any], response: Dict[str, Any], duration: float,
+                        span: Optional[Span] = None):
+        """Record one Grasshopper round trip
+        
+        A bridge that received a ``trace_id`` reports its own processing time
+        as ``elapsed_ms``; it is recorded as a child of ``span`` and removed
+        from the response.
+        """
+        command_type = command.get("command", "unknown")
+        self._command_duration.observe(duration, command=command_type)
+        if not response.get("success"):
+            self._command_failures.inc(command=command_type)
         
-        @self.app.route('/health', methods=['GET'])
-        def health_check():
-            """Health check endpoint"""
-            return jsonify({
-                "status": "healthy",
-                "grasshopper_connected": self.grasshopper_client.connected,
-                "components_loaded": len(self.knowledge_base.components)
-            })
-        
-        @self.app.route('/components', methods=['GET'])
-        def list_components():
-            """List available components"""
-            return jsonify({
+        response.pop("trace_id", None)
+        elapsed_ms = response.pop("elapsed_ms", None)
+        if span is not None and isinstance(elapsed_ms, (int, float)):
+            elapsed = elapsed_ms / 1000
+            span.attributes["bridge_seconds"] = elapsed
+            # Only the duration is known; assume the network time is split evenly
+            start = span.start + max(duration - elapsed, 0.0) / 2
+            self.tracer.record(Span(span.trace_id, new_span_id(), span.span_id, f"bridge {command_type}", start, elapsed))
+    
+    def _connection_metrics(self):
+        """Collector reporting the Grasshopper client's connection stats"""
+        stats = self.grasshopper_client.stats()
+        labels = {"grasshopper": f"{self.grasshopper_client.host}:{self.grasshopper_client.port}"}
+        for key in self.CONNECTION_GAUGES:
+            if key in stats:
+                yield (f"grasshopper_pool_{key}", "gauge",
+                       f"Grasshopper connections: {key.replace('_', ' ')}", [(labels, stats[key])])
+        for key in self.CONNECTION_COUNTERS:
+            if key in stats:
+                yield (f"grasshopper_{key}_total", "counter",
+                       f"Grasshopper {key.replace('_', ' ')} since start", [(labels, stats[key])])
+    
+    def _flask_metrics_response(self):
+        """Serve every metric in the Prometheus text format"""
+        return Response(self.metrics.render(), status=200, content_type=CONTENT_TYPE)
+    
+    def _flask_response(self, operation: str):
+        """Run an operation for the current Flask request"""
+        data = request.get_json(silent=True)
+        if data is not None and not isinstance(data, dict):
+            return jsonify({"success": False, "error": BODY_NOT_OBJECT_ERROR}), 400
+        data = data or request.args.to_dict()
+        trace_id, parent_id = parse_trace_headers(request.headers.get(TRACE_HEADER), request.headers.get(PARENT_HEADER))
+        with self.tracer.span(f"http {operation}", trace_id, parent_id) as span:
+            payload, status = self.handle(operation, data, request.headers.get(IDEMPOTENCY_HEADER))
+            span.attributes["status"] = status
+        response = jsonify(payload)
+        response.headers[TRACE_HEADER] = span.trace_id
+        return response, status
+    
+    def _flask_catalog_response(self):
+        """Serve the pre-rendered catalog, honouring If-None-Match"""
+        body, etag = self.components_catalog()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=headers)
+        return Response(body, status=200, mimetype='application/json', headers=headers)
+    
+    def components_catalog(self) -> Tuple[bytes, str]:
+        """Serialized ``/components`` body and its ETag
+        
+        Rendering and serializing the catalog happens once per catalog
+        version; every other request reuses the cached bytes.
+        """
+        version = self.knowledge_base.catalog_version
+        cached = self._catalog_response
+        if cached is None or cached[0] != version:
+            payload = {
                 "components": self.knowledge_base.list_components(),
                 "info": self.knowledge_base.get_component_info_for_llm()
-            })
+            }
+            body = json.dumps(payload).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            cached = (version, payload, body, etag)
+            self._catalog_response = cached
+        return cached[2], cached[3]
+    
+    def handle(self, operation: str, data: Optional[Dict[str, Any]] = None,
+               idempotency_key: Optional[str] = None,
+               cancel: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], int]:
+        """Run an operation, blocking on Grasshopper; returns (payload, HTTP status)
         
-        @self.app.route('/create_component', methods=['POST'])
-        def create_component():
-            """Create a Grasshopper component"""
+        A POST operation sent with an idempotency key (the argument or the
+        body's ``idempotency_key``) runs once: repeats of the key get the
+        first response without another Grasshopper round trip. Setting
+        ``cancel`` stops the operation before its next Grasshopper command.
+        """
+        data = data or {}
+        with self.tracer.span(f"handle {operation}") as span:
+            claim = self._claim_idempotency_key(operation, data, idempotency_key)
+            if claim is None:
+                return self._run(operation, data, cancel)
+            if isinstance(claim[0], dict):
+                return claim
+            key, result, owner = claim
+            if not owner:
+                span.attributes["idempotent_replay"] = True
+                try:
+                    return self.idempotency.replay(result)
+                except Exception as e:
+                    return {"success": False, "error": str(e)}, 500
             try:
-                data = request.get_json()
-                component_name = data.get('component_name', '').lower()
-                parameters = data.get('parameters', {})
-                
-                # Get component info from knowledge base
+                payload, status = self._run(operation, data, cancel)
+            except BaseException as e:
+                self.idempotency.abandon(key, result, RuntimeError(f"{operation} did not complete: {e!r}"))
+                raise
+            self.idempotency.finish(key, result, payload, status)
+            return payload, status
+    
+    async def handle_async(self, operation: str, data: Optional[Dict[str, Any]] = None,
+                           grasshopper_client: Any = None,
+                           idempotency_key: Optional[str] = None,
+                           cancel: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], int]:
+        """Run an operation against an asyncio Grasshopper client"""
+        data = data or {}
+        grasshopper_client = grasshopper_client or self.grasshopper_client
+        with self.tracer.span(f"handle {operation}") as span:
+            claim = self._claim_idempotency_key(operation, data, idempotency_key)
+            if claim is None:
+                return await self._run_async(operation, data, grasshopper_client, cancel)
+            if isinstance(claim[0], dict):
+                return claim
+            key, result, owner = claim
+            if not owner:
+                span.attributes["idempotent_replay"] = True
+                try:
+                    await asyncio.wrap_future(result)
+                    return self.idempotency.replay(result)
+                except Exception as e:
+                    return {"success": False, "error": str(e)}, 500
+            try:
+                payload, status = await self._run_async(operation, data, grasshopper_client, cancel)
+            except BaseException as e:
+                self.idempotency.abandon(key, result, RuntimeError(f"{operation} did not complete: {e!r}"))
+                raise
+            self.idempotency.finish(key, result, payload, status)
+            return payload, status
+    
+    def _claim_idempotency_key(self, operation: str, data: Dict[str, Any], idempotency_key: Optional[str]):
+        """Claim the request's idempotency key
+        
+        Returns None when the request has no key or its operation is not a
+        POST, an error (payload, status) for a bad or reused key, and
+        otherwise (key, result future, whether this request owns the key).
+        """
+        if 'idempotency_key' in data:
+            data = dict(data)
+            idempotency_key = idempotency_key or data.pop('idempotency_key')
+        if idempotency_key is None or operation not in self._idempotent_operations:
+            return None
+        if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            return {
+                "success": False,
+                "error": f"Idempotency key must be a string of 1 to {MAX_KEY_LENGTH} characters"
+            }, 400
+        try:
+            result, owner = self.idempotency.claim(idempotency_key, IdempotencyStore.fingerprint(operation, data))
+        except IdempotencyKeyReused as e:
+            return {"success": False, "error": str(e)}, 422
+        if not owner:
+            self._idempotent_replays.inc(operation=operation)
+        return idempotency_key, result, owner
+    
+    def _run(self, operation: str, data: Dict[str, Any],
+             cancel: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], int]:
+        """Drive an operation's flow, blocking on Grasshopper"""
+        try:
+            flow = self._start_flow(operation, data)
+            if not inspect.isgenerator(flow):
+                return flow
+            try:
+                command = next(flow)
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        flow.close()
+                        return {"success": False, "error": "Cancelled"}, 409
+                    with self.tracer.span(f"grasshopper {command.get('command')}") as span:
+                        start = time.perf_counter()
+                        response = self.grasshopper_client.send_command(dict(command, trace_id=span.trace_id))
+                        self.observe_command(command, response, time.perf_counter() - start, span)
+                    command = flow.send(response)
+            except StopIteration as done:
+                return done.value
+        except Exception as e:
+            logger.error(f"Error handling {operation}: {e}")
+            return {"success": False, "error": str(e)}, 500
+    
+    async def _run_async(self, operation: str, data: Dict[str, Any], grasshopper_client: Any,
+                         cancel: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], int]:
+        """Drive an operation's flow, awaiting an asyncio Grasshopper client"""
+        try:
+            flow = self._start_flow(operation, data)
+            if not inspect.isgenerator(flow):
+                return flow
+            try:
+                command = next(flow)
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        flow.close()
+                        return {"success": False, "error": "Cancelled"}, 409
+                    with self.tracer.span(f"grasshopper {command.get('command')}") as span:
+                        start = time.perf_counter()
+                        response = await grasshopper_client.send_command(dict(command, trace_id=span.trace_id))
+                        self.observe_command(command, response, time.perf_counter() - start, span)
+                    command = flow.send(response)
+            except StopIteration as done:
+                return done.value
+        except Exception as e:
+            logger.error(f"Error handling {operation}: {e}")
+            return {"success": False, "error": str(e)}, 500
+    
+    def _start_flow(self, operation: str, data: Dict[str, Any]):
+        """Look up an operation handler and call it
+        
+        Handlers that talk to Grasshopper are generators: each ``yield``
+        hands a command to the driver and receives the response, and the
+        generator's return value is the (payload, status) result. This keeps
+        the request logic independent of whether the driver blocks on a
+        thread (``handle``) or awaits an asyncio client (``handle_async``).
+        Handlers that never talk to Grasshopper return the result directly.
+        """
+        handler = getattr(self, f"_{operation}_flow", None)
+        if handler is None:
+            return {"success": False, "error": f"Unknown operation: {operation}"}, 404
+        return handler(data)
+    
+    def _health_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Health check endpoint"""
+        canvas = self.canvas.snapshot()
+        return {
+            "status": "healthy",
+            "grasshopper_connected": self.grasshopper_client.connected,
+            "grasshopper_connection": self.grasshopper_client.stats(),
+            "components_loaded": len(self.knowledge_base.components),
+            "canvas": {"components": len(canvas), "connections": canvas.connection_count},
+            "idempotency": self.idempotency.stats(),
+            "jobs": self.jobs.stats()
+        }, 200
+    
+    def _metrics_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Metrics endpoint; the HTTP front ends serve the text format directly"""
+        return {"metrics": self.metrics.render()}, 200
+    
+    def _run_job(self, operation: str, data: Dict[str, Any], cancel: threading.Event) -> Tuple[Dict[str, Any], int]:
+        """Job queue runner; the ASGI front end replaces it to run jobs on its event loop"""
+        return self.handle(operation, data, cancel=cancel)
+    
+    def _submit_job_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Queue an operation and return its job at once; poll /job_status for the result"""
+        operation = data.get('operation')
+        job_data = data.get('data') or {}
+        if operation not in self._job_operations:
+            return {
+                "success": False,
+                "error": f"Operation cannot run as a job: {operation}"
+            }, 400
+        if not isinstance(job_data, dict):
+            return {"success": False, "error": "Job data must be an object"}, 400
+        
+        try:
+            job = self.jobs.submit(operation, job_data)
+        except JobQueueFull as e:
+            return {"success": False, "error": str(e)}, 503
+        return {"success": True, "job": job.to_dict()}, 202
+    
+    def _job_status_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """State of a job, and its response once finished"""
+        job = self.jobs.get(str(data.get('job_id', '')))
+        if job is None:
+            return {"success": False, "error": "Unknown or expired job"}, 404
+        return {"success": True, "job": job.to_dict()}, 200
+    
+    def _cancel_job_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Cancel a queued job, or stop a running one before its next Grasshopper command"""
+        job = self.jobs.cancel(str(data.get('job_id', '')))
+        if job is None:
+            return {"success": False, "error": "Unknown or expired job"}, 404
+        if job.state in FINISHED_STATES and not job.cancel.is_set():
+            return {"success": False, "error": f"Job already {job.state}", "job": job.to_dict()}, 409
+        return {"success": True, "job": job.to_dict()}, 200
+    
+    def _jobs_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Retained jobs, without their results"""
+        return {"success": True, "jobs": [job.to_dict(include_result=False) for job in self.jobs.jobs()]}, 200
+    
+    def _components_flow(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """List available components"""
+        self.components_catalog()
+        return self._catalog_response[1], 200
+    
+    def _create_component_flow(self, data: Dict[str, Any]):
+        """Create a Grasshopper component"""
+        component_name = str(data.get('component_name', '')).lower()
+        parameters = data.get('parameters', {})
+        alias = str(data.get('alias') or '').lower() or None
+        
+        # Get component info from knowledge base
+        comp_info = self.knowledge_base.get_component(component_name)
+        if not comp_info:
+            return {
+                "success": False,
+                "error": f"Unknown component: {component_name}"
+            }, 400
+        
+        # Validate parameters
+        with self.tracer.span("validate", component=component_name):
+            validated_params = self._validate_parameters(component_name, parameters)
+        if "error" in validated_params:
+            return {
+                "success": False,
+                "error": validated_params["error"]
+            }, 400
+        
+        # Send command to Grasshopper
+        response = yield {
+            "command": "create_component",
+            "component_name": comp_info.internal_name,
+            "parameters": validated_params
+        }
+        
+        if response.get("success"):
+            # Store component GUID for future reference
+            component_guid = response.get("component_guid")
+            if component_guid:
+                self.canvas.add(component_guid, component_name, alias, validated_params)
+        
+        return response, 200
+    
+    def _connect_components_flow(self, data: Dict[str, Any]):
+        """Connect two components"""
+        source_component = str(data.get('source_component', '')).lower()
+        source_param = data.get('source_param', '')
+        target_component = str(data.get('target_component', '')).lower()
+        target_param = data.get('target_param', '')
+        
+        # Get component GUIDs; each end is a GUID, an alias or a component name
+        canvas = self.canvas.snapshot()
+        source = canvas.resolve(source_component)
+        target = canvas.resolve(target_component)
+        
+        if not source or not target:
+            return {
+                "success": False,
+                "error": "One or both components not found"
+            }, 400
+        
+        # Send command to Grasshopper
+        response = yield {
+            "command": "connect_parameters",
+            "source_component_guid": source.guid,
+            "source_parameter_name": source_param,
+            "target_component_guid": target.guid,
+            "target_parameter_name": target_param
+        }
+        
+        if response.get("success"):
+            self.canvas.connect(source.guid, source_param, target.guid, target_param)
+        
+        return response, 200
+    
+    def _clear_canvas_flow(self, data: Dict[str, Any]):
+        """Clear the Grasshopper canvas"""
+        response = yield {"command": "clear_canvas"}
+        
+        if response.get("success"):
+            self.canvas.clear()
+        
+        return response, 200
+    
+    def _batch_flow(self, data: Dict[str, Any]):
+        """Execute an ordered list of operations in one Grasshopper round trip"""
+        with self.tracer.span("validate batch"):
+            plan, errors = self._plan_batch(data.get('operations', []))
+        if errors:
+            return {
+                "success": False,
+                "error": "; ".join(errors)
+            }, 400
+        
+        response = yield plan.command
+        return self._apply_batch_response(plan, response), 200
+    
+    def _build_graph_flow(self, data: Dict[str, Any]):
+        """Validate, order and build a whole definition from nodes and edges"""
+        with self.tracer.span("validate graph"):
+            plan, order, errors = self._plan_graph(data)
+        if errors:
+            return {
+                "success": False,
+                "error": "; ".join(errors)
+            }, 400
+        
+        response = yield plan.command
+        return dict(self._apply_batch_response(plan, response), order=order), 200
+    
+    def _sync_canvas_flow(self, data: Dict[str, Any]):
+        """Bring the canvas to a desired graph, sending only what differs"""
+        with self.tracer.span("diff canvas"):
+            plan, changes, errors = self._plan_sync(data)
+        if errors:
+            return {
+                "success": False,
+                "error": "; ".join(errors)
+            }, 400
+        
+        operations = plan.command["operations"]
+        if data.get("dry_run"):
+            return {"success": True, "changes": changes, "operations": operations}, 200
+        if not operations:
+            return {"success": True, "changes": changes, "refs": {}}, 200
+        
+        response = yield plan.command
+        return dict(self._apply_batch_response(plan, response), changes=changes), 200
+    
+    def _plan_graph(self, data: Dict[str, Any]) -> Tuple[Optional[BatchPlan], List[str], List[str]]:
+        """Validate and schedule a declarative graph as a single batch
+        
+        Returns the batch plan, the node execution order and any errors.
+        """
+        graph, errors = plan_graph(self.knowledge_base.factory, data)
+        if errors:
+            return None, [], errors
+        plan, errors = self._plan_batch(graph.to_operations(clear=bool(data.get("clear"))))
+        return plan, graph.order, errors
+    
+    def _plan_sync(self, data: Dict[str, Any]) -> Tuple[Optional[BatchPlan], Dict[str, int], List[str]]:
+        """Diff a desired graph against the canvas and plan the commands that reconcile them
+        
+        Nodes are matched to canvas components by alias (the node id, as
+        assigned by ``/build_graph`` and earlier syncs). A match of the same
+        component type is kept and updated only if its parameters changed;
+        everything else on the canvas is removed. Wires are compared between
+        kept components, so only added and dropped edges are sent. Commands
+        are ordered disconnect, remove, update, create, connect.
+        
+        Returns the batch plan, a count of each kind of change and any errors.
+        """
+        graph, errors = plan_graph(self.knowledge_base.factory, data)
+        if errors:
+            return None, {}, errors
+        
+        wired_inputs: Dict[str, Set[str]] = {}
+        for edge in graph.edges:
+            wired_inputs.setdefault(edge.target, set()).add(edge.target_param)
+        
+        canvas = self.canvas.snapshot()
+        kept: Dict[str, str] = {}  # node id -> guid
+        updates = []
+        creates = []
+        create_names = []
+        for node in graph.nodes:
+            validated_params = self._validate_parameters(node.component, node.parameters, wired_inputs.get(node.id))
+            if "error" in validated_params:
+                errors.append(f"node {node.id}: {validated_params['error']}")
+                continue
+            existing = canvas.by_alias_name(node.id)
+            if existing is not None and existing.component_type == node.component:
+                kept[node.id] = existing.guid
+                # The full set is sent so the bridge need not know the current values. Only
+                # desired keys are compared: set_parameters leaves other inputs as they are,
+                # so a value for an input that is now wired or omitted stays recorded
+                if any(existing.parameters.get(name, _MISSING) != value
+                       for name, value in validated_params.items()):
+                    updates.append({
+                        "command": "set_parameters",
+                        "component_guid": existing.guid,
+                        "parameters": validated_params
+                    })
+            else:
+                creates.append({
+                    "command": "create_component",
+                    "ref": node.id,
+                    "component_name": self.knowledge_base.get_component(node.component).internal_name,
+                    "parameters": validated_params
+                })
+                create_names.append(node.component)
+        if errors:
+            return None, {}, errors
+        
+        kept_guids = set(kept.values())
+        removes = [
+            {"command": "remove_component", "component_guid": guid}
+            for guid in canvas.objects if guid not in kept_guids
+        ]
+        
+        # Wires between kept components, keyed case-insensitively by parameter name
+        desired = {
+            (edge.source, edge.source_param.lower(), edge.target, edge.target_param.lower()): edge
+            for edge in graph.edges
+        }
+        node_ids = {guid: node_id for node_id, guid in kept.items()}
+        existing_wires = set()
+        disconnects = []
+        for guid in kept_guids:
+            for connection in canvas.connections_from(guid):
+                if connection.target_guid not in node_ids:
+                    continue
+                key = (node_ids[guid], connection.source_param.lower(),
+                       node_ids[connection.target_guid], connection.target_param.lower())
+                if key in desired:
+                    existing_wires.add(key)
+                else:
+                    disconnects.append({
+                        "command": "disconnect_parameters",
+                        "source_component_guid": connection.source_guid,
+                        "source_parameter_name": connection.source_param,
+                        "target_component_guid": connection.target_guid,
+                        "target_parameter_name": connection.target_param
+                    })
+        connects = []
+        for key, edge in desired.items():
+            if key in existing_wires:
+                continue
+            command = {
+                "command": "connect_parameters",
+                "source_parameter_name": edge.source_param,
+                "target_parameter_name": edge.target_param
+            }
+            for end, node_id in (("source", edge.source), ("target", edge.target)):
+                if node_id in kept:
+                    command[f"{end}_component_guid"] = kept[node_id]
+                else:
+                    command[f"{end}_ref"] = node_id
+            connects.append(command)
+        
+        commands = disconnects + removes + updates + creates + connects
+        component_names = [None] * (len(disconnects) + len(removes) + len(updates)) + create_names + [None] * len(connects)
+        aliases = [command.get("ref") for command in commands]
+        changes = {
+            "disconnected": len(disconnects),
+            "removed": len(removes),
+            "updated": len(updates),
+            "created": len(creates),
+            "connected": len(connects)
+        }
+        return BatchPlan({"command": "batch", "operations": commands}, component_names, aliases), changes, []
+    
+    def _plan_batch(self, operations: List[Dict[str, Any]]) -> Tuple[Optional[BatchPlan], List[str]]:
+        """Validate batch operations and translate them into one ``batch`` command
+        
+        Supported operations mirror the single-shot routes:
+        
+        - ``{"op": "create_component", "component_name", "parameters", "ref", "alias"}``
+        - ``{"op": "connect_components", "source_component", "source_param",
+          "target_component", "target_param"}``
+        - ``{"op": "clear_canvas"}``
+        
+        ``ref`` defaults to the component name. An explicit ``ref`` also
+        becomes the component's alias on the canvas unless ``alias`` is
+        given. Connection endpoints are looked up first among refs created
+        earlier in the same batch (resolved to GUIDs by the bridge) and then
+        on the canvas by GUID, alias or component name. Everything is
+        validated before anything is sent.
+        """
+        if not isinstance(operations, list) or not operations:
+            return None, ["'operations' must be a non-empty list"]
+        
+        errors = []
+        commands = []
+        component_names = []
+        aliases = []
+        batch_refs = set()
+        canvas = self.canvas.snapshot()
+        cleared = False  # later operations no longer see the existing canvas
+        
+        # Inputs that a connect in this batch will wire up need no value
+        wired_inputs: Dict[str, Set[str]] = {}
+        for operation in operations:
+            if isinstance(operation, dict) and operation.get("op") == "connect_components":
+                target = str(operation.get("target_component", "")).lower()
+                wired_inputs.setdefault(target, set()).add(operation.get("target_param", ""))
+        
+        for index, operation in enumerate(operations):
+            op = operation.get("op") if isinstance(operation, dict) else None
+            prefix = f"operation {index}"
+            
+            if op == "create_component":
+                component_name = str(operation.get("component_name", "")).lower()
                 comp_info = self.knowledge_base.get_component(component_name)
                 if not comp_info:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Unknown component: {component_name}"
-                    }), 400
-                
-                # Validate parameters
-                validated_params = self._validate_parameters(comp_info, parameters)
+                    errors.append(f"{prefix}: Unknown component: {component_name}")
+                    continue
+                ref = str(operation.get("ref") or component_name).lower()
+                validated_params = self._validate_parameters(
+                    component_name, operation.get("parameters", {}), wired_inputs.get(ref)
+                )
                 if "error" in validated_params:
-                    return jsonify({
-                        "success": False,
-                        "error": validated_params["error"]
-                    }), 400
-                
-                # Send command to Grasshopper
-                command = {
+                    errors.append(f"{prefix}: {validated_params['error']}")
+                    continue
+                batch_refs.add(ref)
+                commands.append({
                     "command": "create_component",
+                    "ref": ref,
                     "component_name": comp_info.internal_name,
                     "parameters": validated_params
-                }
-                
-                response = self.grasshopper_client.send_command(command)
-                
-                if response.get("success"):
-                    # Store component GUID for future reference
-                    component_guid = response.get("component_guid")
-                    if component_guid:
-                        self.created_components[component_name] = component_guid
-                
-                return jsonify(response)
-                
-            except Exception as e:
-                logger.error(f"Error creating component: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
-        
-        @self.app.route('/connect_components', methods=['POST'])
-        def connect_components():
-            """Connect two components"""
-            try:
-                data = request.get_json()
-                source_component = data.get('source_component', '').lower()
-                source_param = data.get('source_param', '')
-                target_component = data.get('target_component', '').lower()
-                target_param = data.get('target_param', '')
-                
-                # Get component GUIDs
-                source_guid = self.created_components.get(source_component)
-                target_guid = self.created_components.get(target_component)
-                
-                if not source_guid or not target_guid:
-                    return jsonify({
-                        "success": False,
-                        "error": "One or both components not found"
-                    }), 400
-                
-                # Send command to Grasshopper
+                })
+                component_names.append(component_name)
+                aliases.append(str(operation.get("alias") or operation.get("ref") or "").lower() or None)
+            
+            elif op == "connect_components":
                 command = {
                     "command": "connect_parameters",
-                    "source_component_guid": source_guid,
-                    "source_parameter_name": source_param,
-                    "target_component_guid": target_guid,
-                    "target_parameter_name": target_param
+                    "source_parameter_name": operation.get("source_param", ""),
+                    "target_parameter_name": operation.get("target_param", "")
                 }
-                
-                response = self.grasshopper_client.send_command(command)
-                return jsonify(response)
-                
-            except Exception as e:
-                logger.error(f"Error connecting components: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
-        
-        @self.app.route('/clear_canvas', methods=['POST'])
-        def clear_canvas():
-            """Clear the Grasshopper canvas"""
-            try:
-                command = {"command": "clear_canvas"}
-                response = self.grasshopper_client.send_command(command)
-                
-                if response.get("success"):
-                    self.created_components.clear()
-                
-                return jsonify(response)
-                
-            except Exception as e:
-                logger.error(f"Error clearing canvas: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+                for end in ("source", "target"):
+                    name = str(operation.get(f"{end}_component", "")).lower()
+                    existing = canvas.resolve(name) if not cleared else None
+                    if name in batch_refs:
+                        command[f"{end}_ref"] = name
+                    elif existing is not None:
+                        command[f"{end}_component_guid"] = existing.guid
+                    else:
+                        errors.append(f"{prefix}: Component not found: {name}")
+                commands.append(command)
+                component_names.append(None)
+                aliases.append(None)
+            
+            elif op == "clear_canvas":
+                batch_refs.clear()
+                cleared = True
+                commands.append({"command": "clear_canvas"})
+                component_names.append(None)
+                aliases.append(None)
+            
+            else:
+                errors.append(f"{prefix}: Unknown operation: {op}")
+        
+        if errors:
+            return None, errors
+        return BatchPlan({"command": "batch", "operations": commands}, component_names, aliases), []
     
-    def _validate_parameters(self, comp_info: Any, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    def _apply_batch_response(self, plan: BatchPlan, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Record created components and connections from a batch response; returns the HTTP payload"""
+        results = response.get("results")
+        if not isinstance(results, list):
+            return response
+        
+        refs = {}
+        with self.canvas.transaction() as canvas:
+            for operation, component_name, alias, result in zip(
+                plan.command["operations"], plan.component_names, plan.aliases, results
+            ):
+                if not result.get("success"):
+                    continue
+                if operation["command"] == "create_component":
+                    component_guid = result.get("component_guid")
+                    if component_guid:
+                        refs[operation["ref"]] = component_guid
+                        canvas.add(component_guid, component_name, alias, operation["parameters"])
+                elif operation["command"] == "connect_parameters":
+                    source_guid = operation.get("source_component_guid") or refs.get(operation.get("source_ref"))
+                    target_guid = operation.get("target_component_guid") or refs.get(operation.get("target_ref"))
+                    if source_guid and target_guid:
+                        canvas.connect(source_guid, operation["source_parameter_name"],
+                                       target_guid, operation["target_parameter_name"])
+                elif operation["command"] == "disconnect_parameters":
+                    canvas.disconnect(Connection(
+                        operation["source_component_guid"], operation["source_parameter_name"],
+                        operation["target_component_guid"], operation["target_parameter_name"]
+                    ))
+                elif operation["command"] == "remove_component":
+                    canvas.remove(operation["component_guid"])
+                elif operation["command"] == "set_parameters":
+                    canvas.set_parameters(operation["component_guid"], operation["parameters"])
+                elif operation["command"] == "clear_canvas":
+                    refs.clear()
+                    canvas.clear()
+        
+        return dict(response, refs=refs)
+    
+    def _validate_parameters(self, component_name: str, parameters: Dict[str, Any],
+                             connected_inputs: Optional[Set[str]] = None) -> Dict[str, Any]:
         """Validate component parameters using ComponentFactory"""
         return self.knowledge_base.factory.validate_component_parameters(
-            comp_info.name.lower(), parameters
+            component_name, parameters, connected_inputs
         )
     
     def run(self, host: str = "0.0.0.0", port: int = 5000, debug: bool = False):
-        """Run the MCP server"""
+        """Run the MCP server with the Flask development server"""
+        self._log_startup(host, port)
+        self.app.run(host=host, port=port, debug=debug)
+    
+    def serve(self, host: str = "0.0.0.0", port: int = 5000, threads: int = 16):
+        """Run the MCP server with a production WSGI server
+        
+        Uses waitress when it is installed and falls back to werkzeug's
+        threaded server. Neither runs the reloader or the debugger.
+        """
+        self._log_startup(host, port)
+        try:
+            from waitress import serve
+        except ImportError:
+            from werkzeug.serving import run_simple
+            logger.info("waitress not installed; using werkzeug's threaded server")
+            run_simple(host, port, self.app, threaded=True, use_reloader=False, use_debugger=False)
+        else:
+            serve(self.app, host=host, port=port, threads=threads)
+    
+    def _log_startup(self, host: str, port: int):
         logger.info(f"Starting MCP Server on {host}:{port}")
         logger.info(f"Grasshopper components loaded: {len(self.knowledge_base.components)}")
         
@@ -268,14 +1312,40 @@ class MCPServer:
             logger.info("Successfully connected to Grasshopper MCP Component")
         else:
             logger.warning("Could not connect to Grasshopper MCP Component. Will retry on first request.")
-        
-        self.app.run(host=host, port=port, debug=debug)
 
 def main():
     """Main entry point"""
-    server = MCPServer()
-    server.run(debug=True)
+    parser = argparse.ArgumentParser(description="Grasshopper MCP Server")
+    parser.add_argument("--mode", choices=["development", "wsgi", "asgi"], default="development",
+                        help="development: Flask dev server with debugger and reloader; "
+                             "wsgi: threaded production server; asgi: asyncio server (needs uvicorn)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--grasshopper-host", default="localhost")
+    parser.add_argument("--grasshopper-port", type=int, default=8888)
+    parser.add_argument("--pool-size", type=int, default=4, help="Grasshopper connections (wsgi mode)")
+    parser.add_argument("--multiplex", action="store_true",
+                        help="pipeline commands over one Grasshopper connection (wsgi mode)")
+    parser.add_argument("--threads", type=int, default=16, help="worker threads (wsgi mode)")
+    parser.add_argument("--catalog", action="append", default=[], metavar="PATH",
+                        help="extra component catalog (.json, .snapshot or a directory of them); repeatable")
+    parser.add_argument("--trace-log", metavar="PATH",
+                        help="append request spans to this span log (view with tracing.py)")
+    parser.add_argument("--job-workers", type=int, default=4, help="threads running submitted jobs")
+    args = parser.parse_args()
+    
+    server = MCPServer(args.grasshopper_host, args.grasshopper_port,
+                       pool_size=args.pool_size, multiplex=args.multiplex,
+                       catalog_paths=args.catalog,
+                       tracer=Tracer(args.trace_log) if args.trace_log else None,
+                       job_workers=args.job_workers)
+    if args.mode == "asgi":
+        from asgi_server import serve_asgi
+        serve_asgi(server, args.host, args.port)
+    elif args.mode == "wsgi":
+        server.serve(args.host, args.port, threads=args.threads)
+    else:
+        server.run(args.host, args.port, debug=True)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Metrics for Grasshopper MCP Server
+Counters and histograms rendered in the Prometheus text exposition format
+"""
+
+import inspect
+import math
+import threading
+import weakref
+from typing import Dict, Any, Callable, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond cache hits up to slow LLM completions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (metric name, type, help, [(labels, value), ...]) produced by a collector at render time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self, metric_type: str) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {metric_type}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header("counter")
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header("histogram")
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le='+Inf'))} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(series[-1])}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics plus collectors that report current values when rendered
+
+    Asking for a metric that already exists returns the existing one, so
+    several objects can share a registry and declare the metrics they use.
+    Collectors are keyed per owner; families of the same name reported by
+    several collectors are rendered together, with the values of identical
+    label sets added up. A bound method is held weakly, so registering one
+    does not keep its object alive.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}  # key -> reference to the collector
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def add_collector(self, key: str, collector: Callable[[], Iterable[Family]]):
+        """Register ``collector`` under ``key``, replacing any earlier one with that key"""
+        reference = weakref.WeakMethod(collector) if inspect.ismethod(collector) else (lambda: collector)
+        with self._lock:
+            self._collectors[key] = reference
+
+    def remove_collector(self, key: str):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            references = list(self._collectors.items())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        families: Dict[str, Tuple[str, str, Dict[Tuple[Tuple[str, str], ...], float]]] = {}
+        for key, reference in references:
+            collector = reference()
+            if collector is None:
+                self._drop_collector(key, reference)
+                continue
+            for name, metric_type, help_text, samples in collector():
+                series = families.setdefault(name, (metric_type, help_text, {}))[2]
+                for labels, value in samples:
+                    label_key = tuple(labels.items())
+                    series[label_key] = series.get(label_key, 0.0) + value
+        for name, (metric_type, help_text, series) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for label_key, value in series.items():
+                lines.append(f"{name}{_format_labels(dict(label_key))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _drop_collector(self, key: str, reference: Callable[[], Any]):
+        """Forget a collector whose owner has been garbage collected"""
+        with self._lock:
+            if self._collectors.get(key) is reference:
+                del self._collectors[key]
+
+    def _get_or_create(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+# Shared by MCPServer and LMStudioClient unless they are given their own
+REGISTRY = MetricsRegistry()
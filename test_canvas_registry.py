@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the canvas registry's copy-on-write snapshots
+"""
+
+from canvas_registry import CanvasRegistry
+
+def test_write_copies_only_the_indexes_it_touches():
+    registry = CanvasRegistry()
+    registry.add("a", "circle", alias="first")
+    registry.add("b", "line")
+    registry.connect("a", "Circle", "b", "Start")
+    before = registry.snapshot()
+
+    with registry.transaction() as canvas:
+        canvas.set_parameters("a", {"Radius": 2.0})
+    after = registry.snapshot()
+
+    assert after.objects is not before.objects
+    assert after.by_alias is before.by_alias
+    assert after.outgoing is before.outgoing and after.incoming is before.incoming
+    # Only the touched bucket is copied
+    assert after.by_type["line"] is before.by_type["line"]
+    assert after.by_type["circle"] is not before.by_type["circle"]
+
+def test_published_snapshots_are_not_modified():
+    registry = CanvasRegistry()
+    registry.add("a", "circle", alias="first")
+    registry.add("b", "line")
+    registry.connect("a", "Circle", "b", "Start")
+    before = registry.snapshot()
+
+    registry.remove("a")
+    registry.add("c", "circle", alias="first")
+
+    assert before.resolve("first").guid == "a"
+    assert before.connections_to("b")[0].source_guid == "a"
+    assert registry.resolve("first").guid == "c"
+    assert registry.connections_to("b") == ()
+    assert registry.version == before.version + 2
+
+def test_unchanged_transaction_publishes_nothing():
+    registry = CanvasRegistry()
+    registry.add("a", "circle")
+    before = registry.snapshot()
+
+    with registry.transaction() as canvas:
+        canvas.set_parameters("missing", {"Radius": 1.0})
+
+    assert registry.snapshot() is before
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the completion cache's expiry, eviction, persistence and bypass rules
+"""
+
+import pytest
+
+import completion_cache
+from completion_cache import CompletionCache
+
+def response(text):
+    return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable wall clock for the cache"""
+    now = [1000.0]
+    monkeypatch.setattr(completion_cache.time, "time", lambda: now[0])
+    return now
+
+def test_key_depends_only_on_completion_fields():
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+    
+    assert CompletionCache.key(payload) == CompletionCache.key(dict(payload, stream=True))
+    assert CompletionCache.key(payload) != CompletionCache.key(dict(payload, max_tokens=10))
+
+def test_entries_expire_after_ttl(clock):
+    cache = CompletionCache(ttl=60)
+    cache.put("k", response("circle"))
+    
+    clock[0] += 59
+    assert cache.get("k") == response("circle")
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["memory_entries"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CompletionCache(max_entries=2)
+    cache.put("a", response("a"))
+    cache.put("b", response("b"))
+    cache.get("a")  # b is now the least recently used
+    cache.put("c", response("c"))
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == response("a") and cache.get("c") == response("c")
+    assert cache.stats()["memory_entries"] == 2
+
+def test_cached_response_cannot_be_changed_by_callers():
+    cache = CompletionCache()
+    cached = response("circle")
+    cache.put("k", cached)
+    cached["choices"][0]["message"]["content"] = "changed"
+    cache.get("k")["choices"].clear()
+    
+    assert cache.get("k") == response("circle")
+
+def test_disk_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    first = CompletionCache(path=path)
+    first.put("k", response("circle"))
+    first.close()
+    
+    second = CompletionCache(path=path)
+    try:
+        assert second.get("k") == response("circle")
+        assert second.get("k") == response("circle")
+        assert second.stats()["disk_hits"] == 1 and second.stats()["memory_hits"] == 1
+    finally:
+        second.close()
+
+def test_disk_trim_drops_least_recently_used(tmp_path, clock):
+    path = str(tmp_path / "completions.sqlite")
+    cache = CompletionCache(max_entries=1, path=path, max_disk_entries=2)
+    cache.put("a", response("a"))
+    clock[0] += 1
+    cache.put("b", response("b"))
+    clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.put("c", response("c"))
+    cache.close()
+    
+    reopened = CompletionCache(path=path)
+    try:
+        assert reopened.get("b") is None
+        assert reopened.get("a") == response("a") and reopened.get("c") == response("c")
+    finally:
+        reopened.close()
+
+def test_expired_disk_entry_is_deleted(tmp_path, clock):
+    cache = CompletionCache(ttl=60, path=str(tmp_path / "completions.sqlite"))
+    try:
+        cache.put("k", response("circle"))
+        cache._memory.clear()
+        clock[0] += 61
+        
+        assert cache.get("k") is None
+        assert cache.stats()["disk_entries"] == 0
+    finally:
+        cache.close()
+
+@pytest.mark.parametrize("temperature, force, cacheable", [
+    (0, False, True),
+    (None, False, True),
+    (0.7, False, False),
+    (0.7, True, True),
+])
+def test_sampled_requests_bypass_unless_forced(temperature, force, cacheable):
+    cache = CompletionCache(force=force)
+    payload = {"model": "m", "messages": []}
+    if temperature is not None:
+        payload["temperature"] = temperature
+    
+    assert cache.cacheable(payload) is cacheable
+    assert cache.stats()["bypassed"] == (0 if cacheable else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for the component knowledge base: lazy catalogs, search and parameter validation
+"""
+
+import threading
+
+import pytest
+
+from component_factory import ComponentFactory, component_to_dict
+from component_index import component_fields, definition_fields
+
+@pytest.fixture
+def factory():
+    return ComponentFactory()
+
+@pytest.fixture(params=["catalog.json", "catalog.snapshot"])
+def catalog_path(request, tmp_path, factory):
+    path = str(tmp_path / request.param)
+    if path.endswith(".json"):
+        factory.export_knowledge_base(path)
+    else:
+        factory.export_snapshot(path)
+    return path
+
+def test_definition_fields_match_parsed_component(factory):
+    for name, comp in factory.components.items():
+        assert definition_fields(name, component_to_dict(comp)) == component_fields(name, comp)
+
+def test_search_keeps_catalog_definitions_unparsed(factory, catalog_path):
+    lazy = ComponentFactory([catalog_path], load_defaults=False)
+    assert lazy.components.unparsed_count == len(factory.components)
+    
+    names = lazy.select_components_for_llm("circle radius", 3)
+    
+    assert names == factory.select_components_for_llm("circle radius", 3)
+    assert lazy.components.unparsed_count == len(factory.components)
+    # Registering another definition after the index exists keeps it lazy as well
+    lazy.components.add_unparsed("ring", dict(component_to_dict(factory.components["circle"]), name="Ring"))
+    assert lazy.select_components_for_llm("ring", 1) == ["ring"]
+    assert lazy.components.unparsed_count == len(factory.components) + 1
+
+@pytest.mark.parametrize("export, file_name", [("export_knowledge_base", "catalog.json"),
+                                               ("export_snapshot", "catalog.snapshot")])
+def test_catalog_names_are_lowercased_in_both_formats(factory, tmp_path, export, file_name):
+    factory.components["Ring Circle"] = factory.components["circle"]
+    path = str(tmp_path / file_name)
+    getattr(factory, export)(path)
+    
+    lazy = ComponentFactory(load_defaults=False)
+    lazy.load_catalog(path)
+    
+    assert "ring circle" in lazy.components and "Ring Circle" not in lazy.components
+    assert lazy.get_component("ring circle").name == "Circle"
+
+def test_concurrent_reads_parse_an_entry_once(factory, catalog_path):
+    lazy = ComponentFactory([catalog_path], load_defaults=False)
+    start = threading.Barrier(8)
+    seen = []
+    
+    def read():
+        start.wait()
+        seen.append(lazy.components["circle"])
+    
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(seen) == 8
+    assert all(comp is seen[0] for comp in seen)
+    assert lazy.components.unparsed_count == len(factory.components) - 1
+
+def test_bulk_validation_of_unknown_component_gives_separate_results(factory):
+    results = factory.validate_component_parameters_bulk("no such component", [{}, {}])
+    
+    assert results == [{"error": "Unknown component: no such component"}] * 2
+    results[0]["error"] = "changed"
+    assert results[1]["error"] == "Unknown component: no such component"
+
+def test_value_that_does_not_compare_with_its_bounds_is_a_validation_error(factory):
+    definition = component_to_dict(factory.components["circle"])
+    definition["input_params"][0]["min_value"] = 0.0  # a bound on the Plane input, whose values are names
+    factory.components.add_unparsed("bounded circle", definition)
+    
+    result = factory.validate_component_parameters("bounded circle", {"Plane": "XY", "Radius": 2})
+    
+    assert result == {"error": "Plane must be a number >= 0.0"}
+
+def test_empty_search_returns_every_component(factory):
+    everything = list(factory.components.values())
+    
+    assert factory.search_components("") == everything
+    assert factory.search_components("  ", limit=2) == everything[:2]
+    # Prompt selection keeps its previous components instead of taking arbitrary ones
+    assert factory.select_components_for_llm("") == []
+
+@pytest.mark.parametrize("value, expected", [
+    (2, 2.0), ("2.5", 2.5), (" -1e2 ", -100.0),
+    ("abc", None), (None, None), ([1], None), (float("nan"), None), ("inf", None), (float("-inf"), None),
+])
+def test_number_coercion(factory, value, expected):
+    result = factory.validate_component_parameters("addition", {"A": value, "B": 1})
+    
+    if expected is None:
+        assert result == {"error": "A must be a number"}
+    else:
+        assert result == {"A": expected, "B": 1.0}
+        assert type(result["A"]) is float
+
+def test_number_bounds(factory):
+    assert factory.validate_component_parameters("circle", {"Radius": 0})["Radius"] == 0.0
+    assert factory.validate_component_parameters("circle", {"Radius": -1}) == {"error": "Radius must be >= 0.0"}
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), (1, True), (0.0, False), ("Yes", True), (" off ", False), ("0", False),
+    (2, None), ("maybe", None), (None, None), ([True], None),
+])
+def test_boolean_coercion(factory, value, expected):
+    result = factory.validate_component_parameters("polyline", {"Vertices": [[0, 0], [1, 1]], "Closed": value})
+    
+    if expected is None:
+        assert result == {"error": "Closed must be a boolean"}
+    else:
+        assert result["Closed"] is expected
+
+@pytest.mark.parametrize("value, expected", [
+    ([1, 2, 3], [1.0, 2.0, 3.0]),
+    ((1, "2"), [1.0, 2.0, 0.0]),
+    ({"x": 1, "y": 2, "z": 3}, [1.0, 2.0, 3.0]),
+    ({"X": 1, "Y": 2}, [1.0, 2.0, 0.0]),
+    ("Origin", "Origin"),
+    ([[0, 0], {"x": 1, "y": 1}, "Origin"], [[0.0, 0.0, 0.0], [1.0, 1.0, 0.0], "Origin"]),
+    ({}, None), ({"a": 1, "b": 2}, None), ({"x": 1}, None), ({"x": 1, "y": 2, "w": 3}, None),
+    ([1], None), ([1, 2, 3, 4], None), ([True, 0, 0], None), ([1, "a", 0], None),
+    ([float("nan"), 0, 0], None), ({"x": "inf", "y": 0}, None), (None, None), (5, None),
+])
+def test_point_coercion(factory, value, expected):
+    result = factory.validate_component_parameters("line", {"Start": value, "End": "Origin"})
+    
+    if expected is None:
+        assert result == {"error": "Start must be a point name or [x, y, z]"}
+    else:
+        assert result["Start"] == expected
+
+def test_vector_coercion_error_names_the_type(factory):
+    result = factory.validate_component_parameters("move", {"Geometry": "g", "Motion": {"dx": 1}})
+    
+    assert result == {"error": "Motion must be a vector name or [x, y, z]"}
+
+@pytest.mark.parametrize("value, valid", [
+    ("XY", True), ({"origin": [0, 0, 0]}, True), ([0, 0, 1], False), (None, False),
+])
+def test_plane_coercion(factory, value, valid):
+    result = factory.validate_component_parameters("circle", {"Plane": value, "Radius": 1})
+    
+    if valid:
+        assert result == {"Plane": value, "Radius": 1.0}
+    else:
+        assert result == {"error": "Plane must be a plane name or definition"}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the BM25 component search index
+"""
+
+import pytest
+
+from component_index import ComponentSearchIndex
+
+DOCUMENTS = {
+    "circle": {"name": "circle Circle Cir", "category": "Curve Primitive",
+               "description": "Create a circle defined by base plane and radius",
+               "params": "Plane Radius Circle", "examples": ""},
+    "arc": {"name": "arc Arc Arc", "category": "Curve Primitive",
+            "description": "Create an arc defined by base plane, radius and angle domain",
+            "params": "Plane Radius Angle Arc", "examples": ""},
+    "extrude": {"name": "extrude Extrude Extr", "category": "Surface Freeform",
+                "description": "Extrude curves and surfaces along a vector",
+                "params": "Base Direction Extrusion", "examples": "extrude a circle into a cylinder"},
+    "point": {"name": "point Construct Point Pt", "category": "Vector Point",
+              "description": "Construct a point from xyz coordinates",
+              "params": "X Y Z Point", "examples": ""},
+}
+
+def build(names=DOCUMENTS):
+    index = ComponentSearchIndex()
+    for name in names:
+        index.add_fields(name, DOCUMENTS[name])
+    return index
+
+def ranking(index, query):
+    return [name for name, _ in index.search(query)]
+
+def test_name_matches_outrank_description_matches():
+    index = build()
+
+    # "circle" is in circle's name and only in extrude's examples
+    assert ranking(index, "circle") == ["circle", "extrude"]
+    # Every term adds to the score: arc matches both
+    assert ranking(index, "radius angle")[0] == "arc"
+    scores = dict(index.search("circle"))
+    assert scores["circle"] > scores["extrude"] > 0
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = build()
+
+    # "curve" is shared by two components, "freeform" belongs to one
+    assert ranking(index, "curve freeform")[0] == "extrude"
+    assert ranking(index, "the a of") == []
+
+def test_prefix_matches_rank_below_exact_matches():
+    index = build()
+
+    assert ranking(index, "extru") == ["extrude"]
+    assert ranking(index, "coord") == ["point"]
+    # "radi" expands to "radius" alone, so only the match weight differs
+    assert dict(index.search("radi"))["circle"] < dict(index.search("radius"))["circle"]
+
+@pytest.mark.parametrize("typo, expected", [("circel", "circle"), ("extrued", "extrude"), ("pont", "point")])
+def test_typos_within_the_edit_distance_still_match(typo, expected):
+    index = build()
+
+    assert ranking(index, typo)[0] == expected
+    assert dict(index.search(typo))[expected] < dict(index.search(expected))[expected]
+
+def test_distant_terms_do_not_match():
+    assert build().search("teapot") == []
+
+def test_incremental_changes_match_a_fresh_build():
+    index = build()
+    index.search("circle")  # fill the result cache
+
+    ring = dict(DOCUMENTS["circle"], examples="a round ring")
+    index.remove("arc")
+    index.add_fields("circle", ring)
+    index.add_fields("arc", DOCUMENTS["arc"])
+    index.remove("point")
+
+    fresh = build(["extrude"])
+    fresh.add_fields("circle", ring)
+    fresh.add_fields("arc", DOCUMENTS["arc"])
+    assert len(index) == len(fresh) == 3
+    for query in ("circle", "ring", "radius plane", "point", "cirlce", "extr"):
+        assert index.search(query) == pytest.approx(fresh.search(query)), query
+
+def test_removed_terms_leave_the_vocabulary():
+    index = build()
+    index.remove("point")
+
+    assert index.search("coordinates") == []
+    assert index.search("coord") == []
+    assert index.search("coordinatse") == []
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for graph validation and execution ordering
+"""
+
+import pytest
+
+from component_factory import ComponentFactory
+from graph_builder import GraphEdge, GraphNode, _topological_sort, plan_graph
+
+@pytest.fixture(scope="module")
+def factory():
+    return ComponentFactory()
+
+def node(node_id, component, **parameters):
+    return {"id": node_id, "component": component, "parameters": parameters}
+
+def edge(source, source_param, target, target_param):
+    return {"source": source, "source_param": source_param, "target": target, "target_param": target_param}
+
+def test_nodes_follow_their_dependencies(factory):
+    plan, errors = plan_graph(factory, {
+        "nodes": [node("l", "line"), node("e", "extrude"), node("b", "point", X=1), node("a", "point")],
+        "edges": [edge("l", "Line", "e", "Base"), edge("b", "Point", "l", "End"), edge("a", "Point", "l", "A")],
+    })
+
+    assert errors == []
+    # Independent nodes keep their declared order
+    assert plan.order == ["b", "a", "l", "e"]
+    assert plan.nodes[0].parameters == {"X": 1}
+    # Nicknames resolve to canonical names; edges follow their target's position
+    assert plan.edges == [
+        GraphEdge("b", "Point", "l", "End"),
+        GraphEdge("a", "Point", "l", "Start"),
+        GraphEdge("l", "Line", "e", "Base"),
+    ]
+
+def test_ids_and_components_are_case_insensitive(factory):
+    plan, errors = plan_graph(factory, {
+        "nodes": [node("P1", "Point"), node("L1", "LINE")],
+        "edges": [edge("p1", "point", "l1", "start")],
+    })
+
+    assert errors == []
+    assert [(n.id, n.component) for n in plan.nodes] == [("p1", "point"), ("l1", "line")]
+
+def test_cycle_is_rejected(factory):
+    plan, errors = plan_graph(factory, {
+        "nodes": [node("p", "point"), node("m1", "move"), node("m2", "move")],
+        "edges": [edge("p", "Point", "m1", "Geometry"),
+                  edge("m1", "Geometry", "m2", "Geometry"), edge("m2", "Geometry", "m1", "Motion")],
+    })
+
+    assert plan is None
+    assert errors == ["Graph contains a cycle through: m1, m2"]
+
+def test_cycle_lists_only_nodes_on_it():
+    nodes = [GraphNode(node_id, "move", {}) for node_id in ("a", "b", "c", "d")]
+    edges = [GraphEdge("a", "Geometry", "b", "Geometry"), GraphEdge("b", "Geometry", "a", "Geometry"),
+             GraphEdge("c", "Geometry", "d", "Geometry")]
+
+    assert _topological_sort(nodes, edges) == ([], ["Graph contains a cycle through: a, b"])
+
+def test_duplicate_ids_and_unknown_components(factory):
+    plan, errors = plan_graph(factory, {
+        "nodes": [node("p", "point"), node("P", "circle"), node("x", "teapot")],
+    })
+
+    assert plan is None
+    assert errors == ["node p: duplicate id", "node x: Unknown component: teapot"]
+
+def test_unknown_nodes_and_parameters_are_all_reported(factory):
+    plan, errors = plan_graph(factory, {
+        "nodes": [node("p", "point"), node("c", "circle")],
+        "edges": [edge("p", "Point", "missing", "Plane"),
+                  edge("p", "Curve", "c", "Height"),
+                  edge("p", "Point", "c", "Plane")],
+    })
+
+    assert plan is None
+    assert errors == [
+        "edge p.Point -> missing.Plane: unknown node",
+        "edge p.Curve -> c.Height: Point has no output 'Curve'",
+        "edge p.Curve -> c.Height: Circle has no input 'Height'",
+    ]
+
+@pytest.mark.parametrize("data, error", [
+    ({}, "'nodes' must be a non-empty list"),
+    ({"nodes": [node("p", "point")], "edges": {}}, "'edges' must be a list"),
+    ({"nodes": [{"id": "p"}]}, "node 0: 'id' and 'component' are required"),
+    ({"nodes": [{"id": "p", "component": "point", "parameters": [1]}]}, "node p: 'parameters' must be an object"),
+    ({"nodes": [node("p", "point")], "edges": [{"source": "p"}]},
+     "edge 0: 'source', 'source_param', 'target', 'target_param' are required"),
+])
+def test_malformed_definitions(factory, data, error):
+    assert plan_graph(factory, data) == (None, [error])
+
+def test_plan_as_batch_operations(factory):
+    plan, _ = plan_graph(factory, {
+        "nodes": [node("l", "line"), node("p", "point", X=2)],
+        "edges": [edge("p", "Point", "l", "Start")],
+    })
+
+    assert plan.to_operations(clear=True) == [
+        {"op": "clear_canvas"},
+        {"op": "create_component", "ref": "p", "component_name": "point", "parameters": {"X": 2}},
+        {"op": "create_component", "ref": "l", "component_name": "line", "parameters": {}},
+        {"op": "connect_components", "source_component": "p", "source_param": "Point",
+         "target_component": "l", "target_param": "Start"},
+    ]
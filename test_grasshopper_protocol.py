@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the frame reader and the stand-in's handling of bad frames
+"""
+
+import socket
+
+import pytest
+
+from grasshopper_protocol import FrameReader, ProtocolError, encode_frame
+from grasshopper_standin import GrasshopperStandIn
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+def test_reader_shrinks_buffer_after_large_frame(pair):
+    left, right = pair
+    reader = FrameReader(right, read_size=1024)
+    left.sendall(encode_frame({"data": "x" * 100_000}) + encode_frame({"data": "small"}))
+    
+    assert len(reader.read_message()["data"]) == 100_000
+    # The next frame is already buffered, so the large buffer is kept until it is consumed
+    assert reader.read_message() == {"data": "small"}
+    assert reader.buffered == 0
+    assert len(reader._buffer) == 1024
+
+def test_reader_rejects_oversized_frame(pair):
+    left, right = pair
+    reader = FrameReader(right, max_frame_size=1024, read_size=512)
+    left.sendall(b"x" * 4096)
+    
+    with pytest.raises(ProtocolError):
+        reader.read_frame()
+
+def test_reader_rejects_oversized_frame_received_whole(pair):
+    left, right = pair
+    reader = FrameReader(right, max_frame_size=1024)
+    left.sendall(b"x" * 4096 + b"\n")
+    
+    with pytest.raises(ProtocolError):
+        reader.read_frame()
+
+@pytest.fixture
+def small_frame_standin():
+    standin = GrasshopperStandIn("localhost", 0, supported_components=None, max_frame_size=1024)
+    standin.start()
+    yield standin
+    standin.stop()
+
+def connect(standin):
+    sock = socket.create_connection(standin.address, timeout=5)
+    return sock, FrameReader(sock)
+
+def test_standin_closes_connection_on_oversized_frame(small_frame_standin):
+    sock, reader = connect(small_frame_standin)
+    with sock:
+        sock.sendall(encode_frame({"command": "ping", "padding": "x" * 4096}))
+        
+        with pytest.raises(ConnectionError):
+            reader.read_frame()
+
+def test_standin_answers_invalid_json_and_keeps_the_connection(small_frame_standin):
+    sock, reader = connect(small_frame_standin)
+    with sock:
+        sock.sendall(b"not json\n\n" + encode_frame({"command": "ping"}))
+        
+        assert reader.read_message()["success"] is False
+        # The blank line is skipped, as the bridge does, and the connection stays usable
+        assert reader.read_message()["success"] is True
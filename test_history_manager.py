@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the canvas notes kept when old turns are compacted away
+"""
+
+import json
+
+from history_manager import HistoryManager
+
+def turn(text, *calls):
+    """A user turn whose tool calls all succeeded"""
+    messages = [{"role": "user", "content": text}]
+    if calls:
+        messages.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": f"{text}-{index}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(arguments)}}
+                for index, (name, arguments) in enumerate(calls)
+            ]
+        })
+        messages.extend(
+            {"role": "tool", "tool_call_id": f"{text}-{index}", "content": json.dumps({"success": True})}
+            for index in range(len(calls))
+        )
+    return messages
+
+def compacted_notes(*turns):
+    messages = [{"role": "system", "content": "prompt"}]
+    for messages_of_turn in turns:
+        messages.extend(messages_of_turn)
+    manager = HistoryManager(max_tokens=1, keep_turns=1)
+    manager.compact(messages)
+    return manager.canvas_notes, messages
+
+def test_notes_keep_aliases():
+    notes, messages = compacted_notes(
+        turn("first", ("create_grasshopper_component",
+                       {"component_name": "circle", "alias": "c1", "parameters": {"Radius": 5}}),
+             ("connect_grasshopper_components",
+              {"source_component": "c1", "source_param": "Circle", "target_component": "e1", "target_param": "Base"})),
+        turn("latest"),
+    )
+
+    assert notes == ["- created circle as c1 (Radius=5)", "- connected c1.Circle -> e1.Base"]
+    assert messages[1]["role"] == "system" and "created circle as c1" in messages[1]["content"]
+
+def test_sync_replaces_earlier_notes():
+    notes, _ = compacted_notes(
+        turn("first", ("create_grasshopper_component", {"component_name": "point"})),
+        turn("second", ("sync_grasshopper_canvas", {
+            "nodes": [{"id": "p1", "component": "point", "parameters": {"X": 1}},
+                      {"id": "l1", "component": "line"}],
+            "edges": [{"source": "p1", "source_param": "Point", "target": "l1", "target_param": "Start"}]
+        })),
+        turn("latest"),
+    )
+
+    assert notes == [
+        "- synced the canvas to this definition:",
+        "  - point as p1 (X=1)",
+        "  - line as l1",
+        "  - p1.Point -> l1.Start",
+    ]
+
+def test_failed_calls_leave_no_note():
+    failed = turn("first", ("sync_grasshopper_canvas", {"nodes": [{"id": "c1", "component": "circle"}]}))
+    failed[-1]["content"] = json.dumps({"success": False, "error": "unknown component"})
+
+    notes, _ = compacted_notes(turn("zero", ("clear_grasshopper_canvas", {})), failed, turn("latest"))
+
+    assert notes == ["- cleared the canvas"]
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM interface's tool call scheduling, driven against the Grasshopper stand-in
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from urllib3.util.retry import Retry
+
+from grasshopper_standin import CommandProfile
+from lm_studio_client import (
+    GrasshopperLLMInterface, HTTPTransport, InProcessTransport, LMStudioClient, ToolCallScheduler, create_session
+)
+
+def tool_call(call_id: str, name: str, **arguments):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+def create(call_id: str, component_name: str, **parameters):
+    return tool_call(call_id, "create_grasshopper_component", component_name=component_name, parameters=parameters)
+
+def connect(call_id: str, source: str, source_param: str, target: str, target_param: str):
+    return tool_call(call_id, "connect_grasshopper_components", source_component=source, source_param=source_param,
+                     target_component=target, target_param=target_param)
+
+@pytest.fixture
+def interface(server):
+    interface = GrasshopperLLMInterface(LMStudioClient(), transport=InProcessTransport(server))
+    yield interface
+    interface.close()
+    interface.lm_client.close()
+
+def test_create_waits_for_earlier_connect_of_same_name(interface, standin):
+    """A second ``create circle`` must not move the name before the connect that reads it"""
+    def execute(call):
+        # Hold up the line so the connect is still waiting when the second circle is submitted
+        if '"line"' in call["function"]["arguments"]:
+            time.sleep(0.2)
+        return interface._execute_tool_call(call)
+    
+    calls = [
+        create("1", "circle", Radius=1.0),
+        create("2", "line", Start=[0, 0, 0], End=[1, 0, 0]),
+        connect("3", "circle", "Circle", "line", "Start"),
+        create("4", "circle", Radius=2.0),
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        scheduler = ToolCallScheduler(executor, execute)
+        results = [future.result(5) for future in [scheduler.submit(call) for call in calls]]
+    
+    assert all(result["success"] for result in results)
+    first_circle, line = results[0]["component_guid"], results[1]["component_guid"]
+    assert standin.connections == [(first_circle, "Circle", line, "Start")]
+
+def test_independent_creates_run_concurrently(interface):
+    """Creates of different components do not wait for each other"""
+    running = []
+    peak = [0]
+    
+    def execute(call):
+        running.append(call["id"])
+        peak[0] = max(peak[0], len(running))
+        time.sleep(0.1)
+        running.remove(call["id"])
+        return interface._execute_tool_call(call)
+    
+    calls = [create("1", "circle", Radius=1.0), create("2", "point", X=0, Y=0, Z=0)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        scheduler = ToolCallScheduler(executor, execute)
+        for future in [scheduler.submit(call) for call in calls]:
+            assert future.result(5)["success"]
+    assert peak[0] == 2
+
+def test_clear_waits_for_everything_before_it(interface, standin):
+    calls = [
+        create("1", "circle", Radius=1.0),
+        create("2", "point", X=0, Y=0, Z=0),
+        tool_call("3", "clear_grasshopper_canvas"),
+        create("4", "circle", Radius=3.0),
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        scheduler = ToolCallScheduler(executor, interface._execute_tool_call)
+        results = [future.result(5) for future in [scheduler.submit(call) for call in calls]]
+    
+    assert all(result["success"] for result in results)
+    assert list(standin.components) == [results[3]["component_guid"]]
+
+def chunk(content=None, tool_calls=None, finish_reason=None):
+    delta = {}
+    if content is not None:
+        delta["content"] = content
+    if tool_calls is not None:
+        delta["tool_calls"] = tool_calls
+    return {"choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+def tool_call_delta(index: int, call: dict):
+    return dict(call, index=index)
+
+class ScriptedLMClient:
+    """Answers each streamed completion with the next scripted list of chunks"""
+    
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.requests = []
+    
+    def stream_chat_completion(self, messages, model="gpt-oss-20b"):
+        self.requests.append([dict(message) for message in messages])
+        yield from self.streams.pop(0)
+
+@pytest.fixture
+def scripted_interface(server):
+    interfaces = []
+    
+    def build(*streams):
+        interface = GrasshopperLLMInterface(ScriptedLMClient(*streams), transport=InProcessTransport(server))
+        interfaces.append(interface)
+        return interface
+    
+    yield build
+    for interface in interfaces:
+        interface.close()
+
+def test_stream_error_records_dispatched_tool_calls(scripted_interface, standin):
+    """Tool calls sent before the stream failed are waited for and kept in the history"""
+    circle = create("call-1", "circle", Radius=1.0)
+    partial = {"id": "call-2", "type": "function",
+               "function": {"name": "create_grasshopper_component", "arguments": '{"component_na'}}
+    interface = scripted_interface([
+        chunk("Creating a circle. "),
+        chunk(tool_calls=[tool_call_delta(0, circle)]),
+        chunk(tool_calls=[tool_call_delta(1, partial)]),
+        {"error": "connection reset"},
+    ])
+    
+    output = "".join(interface.process_user_input_stream("make a circle"))
+    
+    assert output.endswith("Error communicating with LM Studio: connection reset")
+    assert len(standin.components) == 1
+    assistant, tool = interface.conversation_history[-2:]
+    assert assistant["role"] == "assistant"
+    assert [call["id"] for call in assistant["tool_calls"]] == ["call-1"]
+    assert tool["tool_call_id"] == "call-1"
+    assert json.loads(tool["content"])["component_guid"] in standin.components
+
+def test_final_stream_error_keeps_tool_results(scripted_interface, standin):
+    interface = scripted_interface(
+        [chunk(tool_calls=[tool_call_delta(0, create("call-1", "circle", Radius=1.0))], finish_reason="tool_calls")],
+        [chunk("Done so "), {"error": "timed out"}],
+    )
+    
+    output = "".join(interface.process_user_input_stream("make a circle"))
+    
+    assert output == "Done so Error communicating with LM Studio: timed out"
+    roles = [message["role"] for message in interface.conversation_history]
+    assert roles[-3:] == ["assistant", "tool", "assistant"]
+    assert interface.conversation_history[-1]["content"] == "Done so "
+    assert len(standin.components) == 1
+
+class FakeStreamResponse:
+    def __init__(self, chunks):
+        self.lines = [b"data: " + json.dumps(c).encode() for c in chunks] + [b"data: [DONE]"]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_lines(self):
+        return iter(self.lines)
+
+class FakeSession:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.posts = 0
+    
+    def post(self, url, json=None, stream=False, timeout=None):
+        self.posts += 1
+        return FakeStreamResponse(self.chunks)
+    
+    def close(self):
+        pass
+
+def test_stream_uses_completion_cache():
+    from completion_cache import CompletionCache
+    
+    client = LMStudioClient(temperature=0, cache=CompletionCache())
+    call = create("call-1", "circle", Radius=1.0)
+    client.session = FakeSession([chunk("Sure. "), chunk(tool_calls=[tool_call_delta(0, call)], finish_reason="tool_calls")])
+    messages = [{"role": "user", "content": "make a circle"}]
+    
+    first = list(client.stream_chat_completion(messages))
+    replayed = list(client.stream_chat_completion(messages))
+    
+    assert client.session.posts == 1
+    assert len(first) == 2 and len(replayed) == 1
+    delta = replayed[0]["choices"][0]["delta"]
+    assert delta["content"] == "Sure. "
+    assert delta["tool_calls"][0]["function"] == call["function"]
+    # The non-streaming path answers from the same entry
+    assert client.chat_completion(messages)["choices"][0]["message"]["tool_calls"][0]["id"] == "call-1"
+    assert client.session.posts == 1
+
+def test_http_transport_runs_only_whole_definitions_as_jobs(server, base_url):
+    transport = HTTPTransport(base_url)
+    
+    created = transport.call("create_component", {"component_name": "circle", "parameters": {"Radius": 1.0}})
+    assert created["success"]
+    assert server.jobs.stats()["submitted"] == 0
+    
+    built = transport.call("build_graph", {"nodes": [{"id": "p1", "component": "point",
+                                                      "parameters": {"X": 0, "Y": 0, "Z": 0}}]})
+    assert built["success"] and "p1" in built["refs"]
+    assert server.jobs.stats()["submitted"] == 1
+    transport.session.close()
+
+@pytest.mark.parametrize("retry_posts", [False, True])
+def test_timed_out_create_continues_as_a_job(server, base_url, standin, retry_posts):
+    """A slow create is waited for as a job under the same key instead of failing or running twice"""
+    standin.command_profiles["create_component"] = CommandProfile(latency=0.6)
+    methods = Retry.DEFAULT_ALLOWED_METHODS | {"POST"} if retry_posts else None
+    transport = HTTPTransport(base_url, create_session(max_retries=1, backoff_factor=0, retry_methods=methods),
+                              timeout=0.2)
+    
+    result = transport.call("create_component", {"component_name": "circle", "parameters": {"Radius": 1.0}})
+    transport.session.close()
+    
+    assert result["success"]
+    assert list(standin.components) == [result["component_guid"]]
+    assert server.jobs.stats()["submitted"] == 1
+    assert server.idempotency.stats()["replays"] >= 1
+
+# (operation, data) pairs covering successes, validation errors and lookups that fail
+PARITY_SCRIPT = [
+    ("clear_canvas", {}),
+    ("create_component", {"component_name": "point", "alias": "p", "parameters": {"X": 1, "Y": 2, "Z": 0}}),
+    ("create_component", {"component_name": "line", "alias": "l", "parameters": {"Start": [0, 0, 0], "End": [1, 1, 0]}}),
+    ("connect_components", {"source_component": "p", "source_param": "Point",
+                            "target_component": "l", "target_param": "Start"}),
+    ("create_component", {"component_name": "circle", "parameters": {"Radius": -1}}),
+    ("create_component", {"component_name": "no such component"}),
+    ("connect_components", {"source_component": "missing", "source_param": "Point",
+                            "target_component": "l", "target_param": "Start"}),
+    ("build_graph", {"nodes": [{"id": "c1", "component": "circle", "parameters": {"Radius": "wide"}}]}),
+    ("clear_canvas", {}),
+]
+
+def without_guids(value, guids):
+    """``value`` with every component GUID replaced by its order of appearance"""
+    if isinstance(value, dict):
+        return {key: without_guids(item, guids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [without_guids(item, guids) for item in value]
+    if isinstance(value, str) and len(value) == 36 and value.count("-") == 4:
+        return f"guid-{guids.setdefault(value, len(guids))}"
+    return value
+
+def test_in_process_transport_matches_http(server, base_url, standin):
+    results = {}
+    http = HTTPTransport(base_url)
+    for name, transport in (("http", http), ("in-process", InProcessTransport(server))):
+        guids = {}
+        results[name] = [without_guids(transport.call(operation, json.loads(json.dumps(data))), guids)
+                         for operation, data in PARITY_SCRIPT]
+    http.session.close()
+    
+    assert results["in-process"] == results["http"]
+    assert [result["success"] for result in results["http"]] == [True, True, True, True, False, False, False, False, True]
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Answers POSTs from a script of (delay, status) steps and counts them"""
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        delay, status = self.server.script[min(self.server.posts, len(self.server.script) - 1)]
+        self.server.posts += 1
+        time.sleep(delay)
+        body = b'{"choices": []}'
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def scripted_http():
+    def serve(*script):
+        http = ThreadingHTTPServer(("localhost", 0), CountingHandler)
+        http.script = script
+        http.posts = 0
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        servers.append(http)
+        return http
+    servers = []
+    yield serve
+    for http in servers:
+        http.shutdown()
+        http.server_close()
+
+def test_lm_studio_post_is_retried_on_unavailable(scripted_http):
+    http = scripted_http((0, 503), (0, 503), (0, 200))
+    client = LMStudioClient(f"http://localhost:{http.server_port}", backoff_factor=0)
+    
+    assert client.chat_completion([{"role": "user", "content": "hi"}]) == {"choices": []}
+    assert http.posts == 3
+    client.close()
+
+def test_lm_studio_post_is_not_retried_on_read_timeout(scripted_http):
+    http = scripted_http((0.5, 200))
+    client = LMStudioClient(f"http://localhost:{http.server_port}", backoff_factor=0)
+    
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.session.post(f"http://localhost:{http.server_port}/v1/chat/completions", json={}, timeout=0.1)
+    time.sleep(0.6)
+    assert http.posts == 1
+    client.close()
+
+def test_component_context_keeps_the_prompt_prefix(scripted_interface):
+    """One component snippet follows the latest user message; the system prompt never changes"""
+    interface = scripted_interface(*[[chunk("Sure.", finish_reason="stop")]] * 3)
+    
+    list(interface.process_user_input_stream("draw a circle"))
+    list(interface.process_user_input_stream("now a line between two points"))
+    list(interface.process_user_input_stream("another line between two points"))
+    
+    first, second, third = interface.lm_client.requests
+    assert first[0] == {"role": "system", "content": GrasshopperLLMInterface.SYSTEM_PROMPT}
+    snippets = [
+        [index for index, message in enumerate(request)
+         if message["role"] == "system" and message["content"].startswith("Relevant Grasshopper Components")]
+        for request in (first, second, third)
+    ]
+    # A new selection replaces the old snippet after the latest user message...
+    assert snippets[:2] == [[2], [4]]
+    assert first[1]["role"] == second[3]["role"] == "user"
+    assert "Line" not in first[2]["content"] and "Line" in second[4]["content"]
+    assert second[:2] == first[:2]
+    # ...and an unchanged one stays put, so the next request extends the previous one
+    assert snippets[2] == [4]
+    assert third[:len(second)] == second
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Tests for the MCP server's HTTP front ends and operations, driven against the Grasshopper stand-in
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from asgi_server import MCPAsgiApp
+from grasshopper_standin import CommandProfile
+from mcp_server import BODY_NOT_OBJECT_ERROR, MCPServer, MultiplexedGrasshopperClient
+from metrics import MetricsRegistry
+
+def asgi_exchange(app, method: str, path: str, body: bytes = b"", headers=()):
+    """Send one request through an ASGI app; returns (status, response headers, raw body)"""
+    messages = []
+    
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": [(b"content-type", b"application/json")] + list(headers)}
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], dict(messages[0]["headers"]), messages[1]["body"]
+
+def asgi_request(app, method: str, path: str, body: bytes = b""):
+    """Send one request through an ASGI app; returns (status, decoded JSON body)"""
+    status, _, response_body = asgi_exchange(app, method, path, body)
+    return status, json.loads(response_body)
+
+@pytest.fixture
+def asgi_app(standin):
+    app = MCPAsgiApp(MCPServer(*standin.address, metrics=MetricsRegistry()))
+    yield app
+    app.server.jobs.close()
+
+def test_asgi_app_releases_the_threaded_pool(standin):
+    server = MCPServer(*standin.address, metrics=MetricsRegistry())
+    assert server.handle("create_component", {"component_name": "circle", "parameters": {"Radius": 1}})[1] == 200
+    pool = server.grasshopper_client
+    assert pool.stats()["idle"] == 1
+    
+    app = MCPAsgiApp(server)
+    server.jobs.close()
+    
+    assert server.grasshopper_client is app.grasshopper_client
+    assert pool.stats()["size"] == 0
+
+def test_flask_catalog_honours_etag(server):
+    client = server.app.test_client()
+    
+    response = client.get("/components")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and "circle" in response.get_json()["components"]
+    
+    cached = client.get("/components", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.data == b""
+    assert cached.headers["ETag"] == etag
+    
+    del server.knowledge_base.factory.components["circle"]
+    changed = client.get("/components", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and "circle" not in changed.get_json()["components"]
+    assert changed.headers["ETag"] != etag
+
+def test_asgi_catalog_honours_etag(asgi_app):
+    status, headers, body = asgi_exchange(asgi_app, "GET", "/components")
+    etag = headers[b"etag"]
+    assert status == 200 and "circle" in json.loads(body)["components"]
+    
+    status, headers, body = asgi_exchange(asgi_app, "GET", "/components", headers=[(b"if-none-match", etag)])
+    assert (status, body) == (304, b"")
+    assert headers[b"etag"] == etag
+    
+    del asgi_app.server.knowledge_base.factory.components["circle"]
+    status, headers, body = asgi_exchange(asgi_app, "GET", "/components", headers=[(b"if-none-match", etag)])
+    assert status == 200 and "circle" not in json.loads(body)["components"]
+    assert headers[b"etag"] != etag
+
+@pytest.mark.parametrize("body", [[1, 2], "circle", 3])
+def test_non_object_json_body_is_rejected(server, asgi_app, body):
+    expected = {"success": False, "error": BODY_NOT_OBJECT_ERROR}
+    
+    response = server.app.test_client().post("/create_component", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == expected
+    
+    assert asgi_request(asgi_app, "POST", "/create_component", json.dumps(body).encode()) == (400, expected)
+
+def test_empty_body_falls_back_to_query_string(server):
+    response = server.app.test_client().get("/job_status?job_id=missing")
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "Unknown or expired job"
+
+@pytest.fixture
+def multiplexed(standin):
+    client = MultiplexedGrasshopperClient(*standin.address, timeout=5)
+    yield client
+    client.disconnect()
+
+def test_multiplexed_responses_match_their_commands(multiplexed, standin):
+    """Pipelined commands complete out of order but each gets its own response"""
+    standin.profile = CommandProfile(jitter=0.02)
+    names = ["GH_Circle", "GH_Point", "GH_Line"] * 10
+    
+    responses = multiplexed.send_many([{"command": "create_component", "component_name": name} for name in names])
+    
+    assert [response["component_name"] for response in responses] == names
+    assert multiplexed.stats()["in_flight"] == 0
+
+def test_multiplexed_submit_fails_at_once_without_a_socket(multiplexed):
+    """A connection that dropped before the send fails the command instead of leaving it pending"""
+    multiplexed.connect = lambda: True  # reports connected, but the socket is already gone
+    
+    future = multiplexed.submit({"command": "ping"})
+    
+    assert future.done()
+    assert future.result() == {"success": False, "error": "Not connected to Grasshopper"}
+    assert multiplexed.stats()["in_flight"] == 0
+
+def test_multiplexed_send_failure_fails_the_command(multiplexed, monkeypatch):
+    assert multiplexed.connect()
+    
+    def broken_pipe(command):
+        raise BrokenPipeError("Broken pipe")
+    monkeypatch.setattr("mcp_server.encode_frame", broken_pipe)
+    
+    future = multiplexed.submit({"command": "ping"})
+    
+    assert future.done()
+    assert future.result() == {"success": False, "error": "Broken pipe"}
+    assert multiplexed.stats()["in_flight"] == 0
+    assert not multiplexed.connected
+
+def test_multiplexed_disconnect_fails_pending_commands(multiplexed, standin):
+    standin.command_profiles["create_component"] = CommandProfile(latency=0.2, disconnect_rate=1.0)
+    
+    started = time.monotonic()
+    responses = multiplexed.send_many([{"command": "create_component", "component_name": "GH_Circle"}] * 3)
+    
+    assert all(response["success"] is False for response in responses)
+    assert time.monotonic() - started < 2
+
+def test_pool_reuses_a_bounded_set_of_connections(base_url, server, standin):
+    """Concurrent HTTP requests share at most ``max_size`` persistent connections"""
+    standin.profile = CommandProfile(latency=0.02)
+    
+    def create(radius):
+        response = requests.post(f"{base_url}/create_component",
+                                 json={"component_name": "circle", "parameters": {"Radius": radius}}, timeout=10)
+        return response.json()
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(create, range(1, 25)))
+    
+    assert all(result["success"] for result in results)
+    stats = server.grasshopper_client.stats()
+    assert stats["connects"] <= stats["max_size"] == 4
+    assert stats["in_use"] == 0
+    assert len(standin.components) == 24
+
+def test_pool_replaces_a_dropped_connection(server, standin):
+    assert server.handle("create_component", {"component_name": "circle", "parameters": {"Radius": 1}})[0]["success"]
+    standin.command_profiles["create_component"] = CommandProfile(disconnect_rate=1.0)
+    assert not server.handle("create_component", {"component_name": "circle", "parameters": {"Radius": 2}})[0]["success"]
+    del standin.command_profiles["create_component"]
+    
+    assert server.handle("create_component", {"component_name": "circle", "parameters": {"Radius": 3}})[0]["success"]
+    assert server.grasshopper_client.stats()["reconnects"] >= 1
+
+def test_batch_builds_and_wires_in_one_round_trip(server, standin):
+    payload, status = server.handle("batch", {"operations": [
+        {"op": "create_component", "component_name": "point", "ref": "p", "parameters": {"X": 1, "Y": 0, "Z": 0}},
+        {"op": "create_component", "component_name": "line", "ref": "l", "parameters": {"End": [1, 1, 0]}},
+        {"op": "connect_components", "source_component": "p", "source_param": "Point",
+         "target_component": "l", "target_param": "Start"},
+    ]})
+    
+    assert status == 200 and payload["success"]
+    assert standin.stats()["commands"] == 1
+    point, line = payload["refs"]["p"], payload["refs"]["l"]
+    assert standin.connections == [(point, "Point", line, "Start")]
+    assert server.canvas.resolve("p").guid == point
+    assert server.canvas.connections_to(line)[0].source_guid == point
+
+def test_invalid_batch_sends_nothing(server, standin):
+    payload, status = server.handle("batch", {"operations": [
+        {"op": "create_component", "component_name": "circle", "parameters": {"Radius": 1}},
+        {"op": "create_component", "component_name": "circle", "parameters": {"Radius": -1}},
+    ]})
+    
+    assert status == 400 and "operation 1" in payload["error"]
+    assert standin.stats()["commands"] == 0
+
+GRAPH = {
+    "nodes": [{"id": "c1", "component": "circle", "parameters": {"Radius": 2}},
+              {"id": "e1", "component": "extrude", "parameters": {"Direction": [0, 0, 1]}}],
+    "edges": [{"source": "c1", "source_param": "Circle", "target": "e1", "target_param": "Base"}]
+}
+
+def test_sync_sends_only_the_differences(server, standin):
+    payload, _ = server.handle("sync_canvas", json.loads(json.dumps(GRAPH)))
+    assert payload["changes"] == {"disconnected": 0, "removed": 0, "updated": 0, "created": 2, "connected": 1}
+    circle = payload["refs"]["c1"]
+    
+    # The same definition again needs no Grasshopper command at all
+    payload, _ = server.handle("sync_canvas", json.loads(json.dumps(GRAPH)))
+    assert payload["changes"] == {"disconnected": 0, "removed": 0, "updated": 0, "created": 0, "connected": 0}
+    assert standin.stats()["commands"] == 1
+    
+    changed = json.loads(json.dumps(GRAPH))
+    changed["nodes"][0]["parameters"]["Radius"] = 3
+    payload, _ = server.handle("sync_canvas", changed)
+    assert payload["changes"] == {"disconnected": 0, "removed": 0, "updated": 1, "created": 0, "connected": 0}
+    assert standin.components[circle]["parameters"]["Radius"] == 3
+    assert len(standin.components) == 2 and len(standin.connections) == 1
+
+def test_sync_ignores_values_of_inputs_that_became_wired(server, standin):
+    """A value recorded for an input that is now wired does not make each re-sync an update"""
+    server.handle("sync_canvas", {"nodes": [{"id": "p", "component": "point", "parameters": {"X": 1, "Y": 0, "Z": 0}}]})
+    wired = {
+        "nodes": [{"id": "p", "component": "point", "parameters": {"Y": 0, "Z": 0}},
+                  {"id": "s", "component": "slider", "parameters": {}}],
+        "edges": [{"source": "s", "source_param": "Number", "target": "p", "target_param": "X"}]
+    }
+    payload, _ = server.handle("sync_canvas", wired)
+    assert payload["changes"] == {"disconnected": 0, "removed": 0, "updated": 0, "created": 1, "connected": 1}
+    commands = standin.stats()["commands"]
+    
+    for _ in range(3):
+        payload, _ = server.handle("sync_canvas", wired)
+        assert payload["changes"] == {"disconnected": 0, "removed": 0, "updated": 0, "created": 0, "connected": 0}
+    assert standin.stats()["commands"] == commands
+
+def test_idempotency_key_runs_a_create_once(base_url, standin):
+    body = {"component_name": "circle", "parameters": {"Radius": 1}}
+    headers = {"Idempotency-Key": "create-circle-1"}
+    
+    first = requests.post(f"{base_url}/create_component", json=body, headers=headers, timeout=10)
+    again = requests.post(f"{base_url}/create_component", json=body, headers=headers, timeout=10)
+    reused = requests.post(f"{base_url}/create_component", json=dict(body, parameters={"Radius": 2}),
+                           headers=headers, timeout=10)
+    
+    assert first.json()["success"]
+    assert again.json() == first.json()
+    assert reused.status_code == 422
+    assert len(standin.components) == 1
+
+def test_job_runs_a_graph_in_the_background(base_url, standin):
+    submitted = requests.post(f"{base_url}/submit_job",
+                              json={"operation": "build_graph", "data": GRAPH}, timeout=10)
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job"]["job_id"]
+    
+    deadline = time.monotonic() + 5
+    while True:
+        job = requests.get(f"{base_url}/job_status", params={"job_id": job_id}, timeout=10).json()["job"]
+        if job["state"] not in ("queued", "running") or time.monotonic() > deadline:
+            break
+        time.sleep(0.02)
+    
+    assert job["state"] == "succeeded"
+    assert job["result"]["success"] and job["http_status"] == 200
+    assert len(standin.components) == 2
+
+def test_cancelled_job_stops_before_its_command(server, standin):
+    standin.profile = CommandProfile(latency=0.3)
+    # One more job than there are workers, so the last one is still queued
+    jobs = [server.jobs.submit("create_component", {"component_name": "circle", "parameters": {"Radius": 1}})
+            for _ in range(server.jobs.workers + 1)]
+    
+    cancelled = server.jobs.cancel(jobs[-1].job_id)
+    for job in jobs[:-1]:
+        job.future.result(5)
+    
+    assert cancelled.state == "cancelled"
+    assert cancelled.result == {"success": False, "error": "Cancelled"}
+    assert len(standin.components) == server.jobs.workers
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for metrics collectors shared between several servers
+"""
+
+import gc
+
+from mcp_server import MCPServer
+from metrics import MetricsRegistry
+
+def samples(text, name):
+    return sorted(line for line in text.splitlines() if line.startswith(name + "{") or line.startswith(name + " "))
+
+def test_servers_sharing_a_registry_both_report_connections(standin):
+    registry = MetricsRegistry()
+    host, port = standin.address
+    first = MCPServer(host, port, pool_size=2, metrics=registry)
+    second = MCPServer(host, port + 1, pool_size=5, metrics=registry)
+    try:
+        text = registry.render()
+    finally:
+        first.jobs.close()
+        second.jobs.close()
+    
+    assert samples(text, "grasshopper_pool_max_size") == [
+        f'grasshopper_pool_max_size{{grasshopper="{host}:{port}"}} 2',
+        f'grasshopper_pool_max_size{{grasshopper="{host}:{port + 1}"}} 5',
+    ]
+    assert text.count("# TYPE grasshopper_pool_max_size gauge") == 1
+
+def test_same_family_from_several_collectors_is_added_up():
+    registry = MetricsRegistry()
+    registry.add_collector("a", lambda: [("open_things", "gauge", "Things", [({}, 2)])])
+    registry.add_collector("b", lambda: [("open_things", "gauge", "Things", [({}, 3)])])
+    
+    assert samples(registry.render(), "open_things") == ["open_things 5"]
+
+def test_collector_of_a_discarded_server_is_dropped(standin):
+    registry = MetricsRegistry()
+    server = MCPServer(*standin.address, metrics=registry)
+    server.jobs.close()
+    assert samples(registry.render(), "grasshopper_pool_max_size")
+    
+    del server
+    gc.collect()
+    
+    assert samples(registry.render(), "grasshopper_pool_max_size") == []
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing: span nesting, propagation over HTTP to the
+stand-in and back, and the waterfall and Chrome trace renderings
+"""
+
+import json
+
+import pytest
+
+from lm_studio_client import HTTPTransport
+from tracing import (
+    PARENT_HEADER, TRACE_HEADER, TRACER, Span, Tracer, chrome_trace, load_spans, render_waterfall
+)
+
+def test_nested_spans_form_a_tree():
+    tracer = Tracer()
+    with tracer.span("turn") as turn:
+        with tracer.span("tool") as tool:
+            with tracer.span("http") as http:
+                pass
+    with tracer.span("next turn") as other:
+        pass
+
+    assert tool.trace_id == http.trace_id == turn.trace_id
+    assert (turn.parent_id, tool.parent_id, http.parent_id) == (None, turn.span_id, tool.span_id)
+    assert other.trace_id != turn.trace_id and other.parent_id is None
+    # Spans are recorded as they finish, innermost first
+    assert [span.name for span in tracer.spans(turn.trace_id)] == ["http", "tool", "turn"]
+
+def test_span_records_error_and_continues_remote_trace():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("http create", "a" * 32, "b" * 16):
+            raise ValueError("bad radius")
+
+    span, = tracer.spans()
+    assert (span.trace_id, span.parent_id) == ("a" * 32, "b" * 16)
+    assert span.attributes["error"] == "bad radius"
+
+def test_server_continues_and_echoes_the_callers_trace(server):
+    headers = {TRACE_HEADER: "c" * 32, PARENT_HEADER: "d" * 16}
+    response = server.app.test_client().post(
+        "/create_component", json={"component_name": "circle", "parameters": {"Radius": 1}}, headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.headers[TRACE_HEADER] == "c" * 32
+    # The bridge's own timing fields are turned into a span, not passed on
+    assert "elapsed_ms" not in response.get_json() and "trace_id" not in response.get_json()
+    spans = {span.name: span for span in TRACER.spans("c" * 32)}
+    assert spans["http create_component"].parent_id == "d" * 16
+    assert spans["handle create_component"].parent_id == spans["http create_component"].span_id
+
+def test_malformed_trace_header_starts_a_new_trace(server):
+    response = server.app.test_client().post(
+        "/clear_canvas", json={}, headers={TRACE_HEADER: "not a trace id!", PARENT_HEADER: "d" * 16}
+    )
+
+    trace_id = response.headers[TRACE_HEADER]
+    assert trace_id != "not a trace id!"
+    http, = [span for span in TRACER.spans(trace_id) if span.name == "http clear_canvas"]
+    assert http.parent_id is None
+
+def test_bridge_elapsed_time_becomes_a_child_span(server):
+    with TRACER.span("turn") as turn:
+        payload, status = server.handle("create_component", {"component_name": "circle", "parameters": {"Radius": 1}})
+
+    assert status == 200 and "elapsed_ms" not in payload
+    spans = TRACER.spans(turn.trace_id)
+    bridge, = [span for span in spans if span.name == "bridge create_component"]
+    parent, = [span for span in spans if span.span_id == bridge.parent_id]
+    assert parent.attributes["bridge_seconds"] == bridge.duration
+    assert 0 <= bridge.duration <= parent.duration
+    assert parent.start <= bridge.start <= parent.start + parent.duration
+
+def test_http_transport_carries_the_trace_to_the_server(base_url):
+    transport = HTTPTransport(base_url)
+    with TRACER.span("turn") as turn:
+        result = transport.call("create_component", {"component_name": "circle", "parameters": {"Radius": 1}})
+    transport.session.close()
+
+    assert result["success"]
+    spans = {span.name: span for span in TRACER.spans(turn.trace_id)}
+    assert spans["mcp create_component"].parent_id == turn.span_id
+    assert spans["http create_component"].parent_id == spans["mcp create_component"].span_id
+    assert "bridge create_component" in spans
+
+def trace_spans():
+    """A fixed trace: a turn with one tool call that failed on the server"""
+    return [
+        Span("t1", "root", None, "turn", 100.0, 0.5),
+        Span("t1", "tool", "root", "tool create", 100.125, 0.25),
+        Span("t1", "http", "tool", "http create_component", 100.1875, 0.125, {"error": "boom"}),
+    ]
+
+def test_waterfall_indents_children_and_marks_errors():
+    lines = render_waterfall(trace_spans(), width=40).splitlines()
+
+    assert lines[0] == "trace t1  500.0 ms"
+    assert lines[1].startswith("  turn ")
+    assert lines[2].startswith("    tool create ")
+    assert lines[3].startswith("      http create_component ")
+    assert lines[3].endswith("|  !boom")
+    bars = [line[line.index("|") + 1:line.rindex("|")] for line in lines[1:4]]
+    assert bars[0] == "#" * 40
+    assert bars[1] == " " * 10 + "#" * 20 + " " * 10
+    assert bars[2].index("#") == 15
+
+def test_chrome_trace_events():
+    events = chrome_trace(trace_spans())["traceEvents"]
+
+    assert [event["name"] for event in events] == ["turn", "tool create", "http create_component"]
+    http = events[2]
+    assert http["ph"] == "X"
+    assert http["ts"] == pytest.approx(100.1875e6) and http["dur"] == pytest.approx(0.125e6)
+    assert http["args"] == {"error": "boom", "span_id": "http", "parent_id": "tool"}
+
+def test_span_log_round_trips(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = Tracer(path)
+    for span in trace_spans():
+        tracer.record(span)
+    tracer.close()
+
+    assert load_spans([path]) == trace_spans()
+    with open(path, encoding="utf-8") as f:
+        assert json.loads(f.readline())["name"] == "turn"
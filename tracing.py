@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Tracing for Grasshopper MCP Server
+Timed spans that follow one LLM turn from LM Studio through the MCP server
+to the Grasshopper MCP Component, exported as a JSON-lines span log
+"""
+
+import argparse
+import json
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+# HTTP headers carrying the trace to the MCP server
+TRACE_HEADER = "X-Trace-Id"
+PARENT_HEADER = "X-Parent-Span-Id"
+
+# Accepted form of IDs received from other processes
+_ID_PATTERN = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+
+@dataclass
+class Span:
+    """One timed stage of a trace"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float            # wall clock, seconds since the epoch
+    duration: float = 0.0   # seconds
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+def current_span() -> Optional[Span]:
+    """The innermost open span in this context, if any"""
+    return _current_span.get()
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+def parse_trace_headers(trace_id: Optional[str], parent_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Incoming trace and parent span IDs, dropping malformed values"""
+    if not trace_id or not _ID_PATTERN.match(trace_id):
+        return None, None
+    if not parent_id or not _ID_PATTERN.match(parent_id):
+        parent_id = None
+    return trace_id, parent_id
+
+def trace_headers() -> Dict[str, str]:
+    """HTTP headers that continue the current trace in another process"""
+    span = _current_span.get()
+    if span is None:
+        return {}
+    return {TRACE_HEADER: span.trace_id, PARENT_HEADER: span.span_id}
+
+class Tracer:
+    """Records finished spans in memory and, optionally, to a span log file
+
+    The current span is kept in a context variable, so nested ``span``
+    blocks form a tree without passing anything around, and asyncio tasks
+    inherit the trace of the request that started them. Threads do not;
+    copy the context (``contextvars.copy_context().run``) when handing
+    work to an executor.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_spans: int = 10000):
+        self.path = path
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+             **attributes) -> Iterator[Span]:
+        """Time a block as a child of the current span
+
+        Without a current span the block starts a new trace, unless
+        ``trace_id`` (and ``parent_id``) continue one from another process.
+        """
+        parent = _current_span.get()
+        span = self.start_span(name, trace_id, parent_id, **attributes)
+        started = time.perf_counter()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                span.attributes["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # A generator resumed from another context; restore the parent there
+                _current_span.set(parent)
+            self.record(span)
+
+    def start_span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                   **attributes) -> Span:
+        """Open a span without making it current, e.g. for work spread over a generator's yields
+
+        Finish it with ``end_span``.
+        """
+        parent = _current_span.get()
+        if trace_id is None:
+            if parent is not None:
+                trace_id, parent_id = parent.trace_id, parent.span_id
+            else:
+                trace_id = new_trace_id()
+        return Span(trace_id, new_span_id(), parent_id, name, time.time(), attributes=attributes)
+
+    def end_span(self, span: Span):
+        span.duration = time.time() - span.start
+        self.record(span)
+
+    def record(self, span: Span):
+        """Store a finished span"""
+        with self._lock:
+            self._spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                self._file.flush()
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """Recorded spans, oldest first, optionally for one trace"""
+        with self._lock:
+            return [span for span in self._spans if trace_id is None or span.trace_id == trace_id]
+
+    def export(self, path: str, trace_id: Optional[str] = None):
+        """Write recorded spans to a span log file"""
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans(trace_id):
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+# Shared by MCPServer, LMStudioClient and GrasshopperLLMInterface unless they are given their own
+TRACER = Tracer()
+
+def load_spans(paths: Iterable[str]) -> List[Span]:
+    """Read spans from one or more span log files, e.g. the client's and the server's"""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    spans.append(Span(**json.loads(line)))
+    return spans
+
+def render_waterfall(spans: Iterable[Span], width: int = 50) -> str:
+    """Text waterfall of each trace: one row per span, indented by depth"""
+    traces: Dict[str, List[Span]] = {}
+    for span in spans:
+        traces.setdefault(span.trace_id, []).append(span)
+
+    lines = []
+    for trace_id, trace in sorted(traces.items(), key=lambda item: min(s.start for s in item[1])):
+        begin = min(span.start for span in trace)
+        total = max(span.start + span.duration for span in trace) - begin or 1e-9
+        ids = {span.span_id for span in trace}
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in trace:
+            parent = span.parent_id if span.parent_id in ids else None
+            children.setdefault(parent, []).append(span)
+
+        lines.append(f"trace {trace_id}  {total * 1000:.1f} ms")
+        rows = []
+
+        def walk(parent: Optional[str], depth: int):
+            for span in sorted(children.get(parent, []), key=lambda s: s.start):
+                rows.append((depth, span))
+                walk(span.span_id, depth + 1)
+
+        walk(None, 0)
+        label_width = max(2 * depth + len(span.name) for depth, span in rows)
+        for depth, span in rows:
+            offset = min(int((span.start - begin) / total * width), width - 1)
+            length = max(1, int(round(span.duration / total * width)))
+            bar = (" " * offset + "#" * length)[:width]
+            label = ("  " * depth + span.name).ljust(label_width)
+            error = "  !" + span.attributes["error"] if "error" in span.attributes else ""
+            lines.append(f"  {label}  {(span.start - begin) * 1000:8.1f} {span.duration * 1000:8.1f} ms  |{bar.ljust(width)}|{error}")
+        lines.append("")
+    return "\n".join(lines)
+
+def chrome_trace(spans: Iterable[Span]) -> Dict[str, Any]:
+    """Spans in the Trace Event format, viewable in chrome://tracing or Perfetto"""
+    events = []
+    for span in spans:
+        events.append({
+            "name": span.name,
+            "ph": "X",
+            "ts": span.start * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": 1,
+            "tid": span.trace_id[:8],
+            "args": dict(span.attributes, span_id=span.span_id, parent_id=span.parent_id)
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Show span logs as a waterfall")
+    parser.add_argument("logs", nargs="+", metavar="SPAN_LOG", help="span log files to merge")
+    parser.add_argument("--trace", help="only this trace ID")
+    parser.add_argument("--width", type=int, default=50, help="waterfall width in characters")
+    parser.add_argument("--chrome", metavar="PATH", help="write a chrome://tracing / Perfetto file instead")
+    args = parser.parse_args()
+
+    spans = [span for span in load_spans(args.logs) if args.trace is None or span.trace_id == args.trace]
+    if args.chrome:
+        with open(args.chrome, "w", encoding="utf-8") as f:
+            json.dump(chrome_trace(spans), f)
+    else:
+        print(render_waterfall(spans, args.width))
+
+if __name__ == "__main__":
+    main()